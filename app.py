@@ -1,12 +1,26 @@
-from flask import Flask, render_template, url_for, request, redirect, flash, session, jsonify
+from flask import Flask, Blueprint, render_template, url_for, request, redirect, flash, session, jsonify, Response, stream_with_context
 from models import db, User, Trip, TripDestination, WishlistItem, Notification, TripExpense
-from routes.budget_routes import budget_routes
-from routes.cities_routes import cities_routes
 from forms import LoginForm, SignupForm
-from flask_dance.contrib.google import make_google_blueprint, google
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content
+from itinerary_service import save_itinerary_sections
+from route_service import resolve_coordinates, optimize_route, distance_matrix, path_length
+from geo_service import catalog_stamp, city_filter, find_cities
+from cluster_service import viewport_features
+from recommendation_service import recommendations_for, refresh_user as refresh_recommendations
+from popularity_service import entry as popularity_entry, top_destinations
+from place_service import places_visited
+from session_store import revoke_user_sessions
+from fragment_cache import trips_stamp, site_stamp
+from export_service import export_stream, trips_query, expenses_query
+from notification_stream import notification_streams, parse_last_event_id
+from notification_service import (
+	unread_count as unread_notifications, mark_read as mark_notifications_read, invalidate_unread,
+)
+from expense_service import (
+	parse_expense, bulk_insert_expenses, iter_csv_rows, expense_summary, expenses_changed, expense_to_dict,
+)
+from sqlalchemy.orm.exc import StaleDataError
 import os
+import csv
 import json
 import time
 import secrets
@@ -15,10 +29,6 @@ from datetime import date, datetime, timedelta
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 
-# Register blueprints
-app.register_blueprint(budget_routes)
-app.register_blueprint(cities_routes)
-
 # Production-ready configuration with environment variables
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
@@ -28,23 +38,66 @@ if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
 # Determine if we're in production
 IS_PRODUCTION = os.environ.get('FLASK_ENV') == 'production'
 
-app.config.update(
-	SECRET_KEY=os.environ.get("SECRET_KEY", "dev-secret-change-me-in-production"),
-	SQLALCHEMY_DATABASE_URI=DATABASE_URL or "sqlite:///instance/globetrotter.db",
-	SQLALCHEMY_TRACK_MODIFICATIONS=False,
-	SQLALCHEMY_ENGINE_OPTIONS={
-		"pool_pre_ping": True,  # Verify connections before using
-		"pool_recycle": 300,  # Recycle connections after 5 minutes
-	} if IS_PRODUCTION else {},
-	# Flask-Dance config
-	OAUTHLIB_INSECURE_TRANSPORT=not IS_PRODUCTION,  # Only for local dev
-	# Session cookie settings
-	SESSION_COOKIE_SAMESITE="Lax",
-	SESSION_COOKIE_SECURE=IS_PRODUCTION,  # Only use secure cookies in production
-	SESSION_COOKIE_HTTPONLY=True,
-	SERVER_NAME=None if IS_PRODUCTION else "localhost:5000",  # Don't set SERVER_NAME in production
-)
-db.init_app(app)
+def create_app():
+	"""Configure the application and return it.
+	
+	Routes in this module are bound to the module-level ``app``, so there is one
+	instance per process: the first call applies the settings, initializes the
+	database and registers blueprints; later calls return it unchanged. Nothing
+	is configured on import: gunicorn loads ``app:create_app()`` and scripts,
+	CLIs and tests call ``create_app()`` themselves. Heavy optional dependencies
+	(SendGrid, aiohttp, Flask-Dance) are imported where they are used rather
+	than at boot.
+	"""
+	if "sqlalchemy" in app.extensions:
+		return app
+	
+	app.config.update(
+		SECRET_KEY=os.environ.get("SECRET_KEY", "dev-secret-change-me-in-production"),
+		SQLALCHEMY_DATABASE_URI=DATABASE_URL or "sqlite:///instance/globetrotter.db",
+		SQLALCHEMY_TRACK_MODIFICATIONS=False,
+		SQLALCHEMY_ENGINE_OPTIONS={
+			"pool_pre_ping": True,  # Verify connections before using
+			"pool_recycle": 300,  # Recycle connections after 5 minutes
+		} if IS_PRODUCTION else {},
+		# Flask-Dance config
+		OAUTHLIB_INSECURE_TRANSPORT=not IS_PRODUCTION,  # Only for local dev
+		# Session cookie settings
+		SESSION_COOKIE_SAMESITE="Lax",
+		SESSION_COOKIE_SECURE=IS_PRODUCTION,  # Only use secure cookies in production
+		SESSION_COOKIE_HTTPONLY=True,
+		SERVER_NAME=None if IS_PRODUCTION else "localhost:5000",  # Don't set SERVER_NAME in production
+		# Rendered template fragments, shared by the workers on this host
+		FRAGMENT_CACHE_DIR=os.environ.get("FRAGMENT_CACHE_DIR"),
+		# "database" keeps sessions server-side; the cookie then holds only an id
+		SESSION_BACKEND=os.environ.get("SESSION_BACKEND", "cookie"),
+	)
+	db.init_app(app)
+	
+	# Register blueprints
+	from routes.budget_routes import budget_routes
+	from routes.cities_routes import cities_routes
+	app.register_blueprint(budget_routes)
+	app.register_blueprint(cities_routes)
+	app.register_blueprint(google_oauth)
+	if not all(google_credentials()):
+		print("WARNING: GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET environment variables not set.")
+		print("Google OAuth login will not work until these are configured.")
+	from assets import init_assets
+	from fragment_cache import init_fragment_cache
+	from perf import init_perf
+	from metrics import init_metrics
+	from notification_stream import init_notification_stream
+	from session_store import init_session_store
+	init_assets(app)
+	init_fragment_cache(app)
+	init_perf(app)
+	init_metrics(app)
+	init_notification_stream(app)
+	init_session_store(app)
+	from compression import init_compression
+	init_compression(app)
+	return app
 
 # SendGrid Email Configuration
 SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
@@ -62,6 +115,9 @@ def send_otp_email(user, otp_code):
 		return False
 	
 	try:
+		from sendgrid import SendGridAPIClient
+		from sendgrid.helpers.mail import Mail, Email, To, Content
+		
 		message = Mail(
 			from_email=Email(SENDGRID_FROM_EMAIL, "GlobeTrotter"),
 			to_emails=To(user.email),
@@ -95,8 +151,10 @@ def send_otp_email(user, otp_code):
 			''')
 		)
 		
+		from metrics import track_email
 		sg = SendGridAPIClient(SENDGRID_API_KEY)
-		response = sg.send(message)
+		with track_email("otp"):
+			response = sg.send(message)
 		print(f"SendGrid response status: {response.status_code}")
 		return True
 	except Exception as e:
@@ -109,9 +167,9 @@ def fromjson_filter(value):
 	if not value:
 		return []
 	try:
-		import json
 		return json.loads(value)
-	except:
+	except (ValueError, TypeError):
+		app.logger.warning("fromjson: value is not valid JSON")
 		return []
 
 # Helper function for user authentication
@@ -120,7 +178,9 @@ def get_current_user():
 	if "user_email" not in session:
 		return None
 	
-	user = User.query.filter_by(email=session["user_email"]).first()
+	# Sessions from before user_id was stored only carry the email
+	user_id = session.get("user_id")
+	user = db.session.get(User, user_id) if user_id else User.query.filter_by(email=session["user_email"]).first()
 	if not user:
 		# User not found, clear session
 		session.clear()
@@ -128,6 +188,15 @@ def get_current_user():
 	
 	return user
 
+def log_in(user):
+	"""Start a logged-in session for ``user``"""
+	session["user_email"] = user.email
+	session["user_id"] = user.id
+
+def log_out():
+	session.pop("user_email", None)
+	session.pop("user_id", None)
+
 def get_verified_user():
 	"""Get the current logged-in and email-verified user"""
 	user = get_current_user()
@@ -144,7 +213,7 @@ def require_email_verification(user):
 		
 		if send_otp_email(user, otp_code):
 			session['verification_email'] = user.email
-			session.pop('user_email', None)  # Clear login session
+			log_out()  # Clear login session
 			return redirect(url_for("verify_email"))
 		else:
 			flash("Failed to send verification email. Please contact support.", "error")
@@ -159,6 +228,47 @@ def require_user():
 		return redirect(url_for("login"))
 	return user
 
+# --- Conditional requests for trip resources ---
+# Trip.version is bumped on every write (see Trip.__mapper_args__), so it doubles
+# as the ETag for the trip and everything hanging off it (destinations, itinerary).
+# Reads answer If-None-Match with 304; writes honor If-Match and return 412 when
+# another tab or device saved first.
+
+def trip_not_modified(trip, etag=None):
+	"""Return a 304 response if the client's cached copy is current, else None"""
+	if request.if_none_match.contains(etag or trip.etag):
+		return with_trip_etag(app.response_class(status=304), trip, etag)
+	return None
+
+def trip_precondition_failed(trip):
+	"""Return a 412 response if If-Match names a stale version, else None"""
+	if request.if_match and not request.if_match.contains(trip.etag):
+		return trip_conflict(trip)
+	return None
+
+def trip_conflict(trip):
+	"""412 body telling the client to reload before writing again"""
+	return {
+		"ok": False,
+		"error": "conflict",
+		"message": "This trip was changed elsewhere. Reload to get the latest version.",
+		"version": trip.version,
+	}, 412
+
+def with_trip_etag(response, trip, etag=None):
+	"""Attach the trip's ETag; private/no-cache makes browsers revalidate every time"""
+	if isinstance(response, dict):
+		response = jsonify(response)
+	response.set_etag(etag or trip.etag)
+	response.headers["Cache-Control"] = "private, no-cache"
+	return response
+
+def trip_catalog_etag(trip):
+	"""ETag for trip reads that include catalog coordinates: an admin editing
+	a city changes the response without touching the trip's version"""
+	stamp = hashlib.sha1(repr(catalog_stamp()).encode()).hexdigest()[:12]
+	return f"{trip.etag}-{stamp}"
+
 # Context processor to make current_user available in all templates
 @app.context_processor
 def inject_user():
@@ -171,35 +281,61 @@ if not IS_PRODUCTION:
 	os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 	os.environ['OAUTHLIB_RELAX_TOKEN_SCOPE'] = '1'
 
-# Google OAuth setup with environment variables
-# Get credentials from environment - NO DEFAULTS for security
-google_client_id = os.environ.get('GOOGLE_CLIENT_ID')
-google_client_secret = os.environ.get('GOOGLE_CLIENT_SECRET')
-
-if not google_client_id or not google_client_secret:
-	print("WARNING: GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET environment variables not set.")
-	print("Google OAuth login will not work until these are configured.")
-	# Use dummy values to prevent blueprint creation errors, but OAuth won't work
-	google_client_id = google_client_id or 'GOOGLE_CLIENT_ID_NOT_SET'
-	google_client_secret = google_client_secret or 'GOOGLE_CLIENT_SECRET_NOT_SET'
-
-google_bp = make_google_blueprint(
-	client_id=google_client_id,
-	client_secret=google_client_secret,
-	# Use Google's recommended OpenID Connect scopes to avoid scope-change warnings
-	scope=[
-		"openid",
-		"https://www.googleapis.com/auth/userinfo.profile",
-		"https://www.googleapis.com/auth/userinfo.email",
-	],
-	# After token exchange, redirect here to finalize login
-	redirect_to="google_post_login",
-)
-app.register_blueprint(google_bp, url_prefix="/login")
+def google_credentials():
+	"""Client id and secret from the environment - NO DEFAULTS for security"""
+	return os.environ.get('GOOGLE_CLIENT_ID'), os.environ.get('GOOGLE_CLIENT_SECRET')
+
+# Google OAuth login. Only these two routes are registered at boot; the
+# Flask-Dance consumer behind them (and flask_dance itself) is built on the
+# first login, so workers, CLIs and tests never import it just to start.
+google_oauth = Blueprint("google", __name__, url_prefix="/login/google")
+_google_consumer = None
+
+def google_consumer():
+	"""Flask-Dance consumer for Google, created on first use and never registered"""
+	global _google_consumer
+	if _google_consumer is None:
+		from flask_dance.contrib.google import make_google_blueprint
+		google_client_id, google_client_secret = google_credentials()
+		_google_consumer = make_google_blueprint(
+			# Dummy values keep the consumer constructible; OAuth won't work with them
+			client_id=google_client_id or 'GOOGLE_CLIENT_ID_NOT_SET',
+			client_secret=google_client_secret or 'GOOGLE_CLIENT_SECRET_NOT_SET',
+			# Use Google's recommended OpenID Connect scopes to avoid scope-change warnings
+			scope=[
+				"openid",
+				"https://www.googleapis.com/auth/userinfo.profile",
+				"https://www.googleapis.com/auth/userinfo.email",
+			],
+			# After token exchange, redirect here to finalize login
+			redirect_to="google_post_login",
+		)
+	return _google_consumer
+
+def with_google_consumer(view):
+	"""Run view(consumer) with the per-request setup Flask-Dance's app hooks would do"""
+	consumer = google_consumer()
+	consumer.load_config()
+	try:
+		return view(consumer)
+	finally:
+		consumer.teardown_session()
+
+@google_oauth.route("", endpoint="login")
+def google_login():
+	return with_google_consumer(lambda consumer: consumer.login())
+
+@google_oauth.route("/authorized", endpoint="authorized")
+def google_authorized():
+	return with_google_consumer(lambda consumer: consumer.authorized())
 
 @app.route("/google/post-login")
 def google_post_login():
 	# This is called after Flask-Dance's authorized view completes token exchange
+	return with_google_consumer(finish_google_login)
+
+def finish_google_login(consumer):
+	google = consumer.session
 	if not google.authorized:
 		flash("Google login failed or was cancelled.", "error")
 		return redirect(url_for("login"))
@@ -253,7 +389,7 @@ def google_post_login():
 			flash("Failed to send verification email. Please try again.", "error")
 			return redirect(url_for("login"))
 	# Log in the user (session-based, minimal)
-	session["user_email"] = user.email
+	log_in(user)
 	return redirect(url_for("dashboard"))
 
 
@@ -285,7 +421,7 @@ def login():
 			# Email is verified, proceed with login
 			flash("Logged in successfully.", "success")
 			# set session for logged in user
-			session["user_email"] = user.email
+			log_in(user)
 			# Update last login
 			user.last_login = datetime.utcnow()
 			db.session.commit()
@@ -385,6 +521,8 @@ def forgot_password():
 				# Create email message using SendGrid
 				if not SENDGRID_API_KEY:
 					raise Exception("SENDGRID_API_KEY not configured")
+				from sendgrid import SendGridAPIClient
+				from sendgrid.helpers.mail import Mail, Email, To, Content
 				
 				message_sg = Mail(
 					from_email=Email(SENDGRID_FROM_EMAIL, "GlobeTrotter"),
@@ -428,8 +566,10 @@ def forgot_password():
 				)
 				
 				# Try to send email via SendGrid
+				from metrics import track_email
 				sg = SendGridAPIClient(SENDGRID_API_KEY)
-				response = sg.send(message_sg)
+				with track_email("password_reset"):
+					response = sg.send(message_sg)
 				print(f"SendGrid password reset email sent. Status: {response.status_code}")
 				
 				message = f"Password reset link sent to {email}. Please check your email and follow the instructions."
@@ -602,7 +742,7 @@ def verify_email():
 			session.pop('verification_email', None)
 			
 			# Log the user in
-			session["user_email"] = user.email
+			log_in(user)
 			user.last_login = datetime.utcnow()
 			db.session.commit()
 			
@@ -686,7 +826,7 @@ def trip_view(trip_id):
         flash("Please log in to access this page.", "error")
         return redirect(url_for("login"))
 
-    user = User.query.filter_by(email=session["user_email"]).first()
+    user = get_current_user()
     trip = Trip.query.filter_by(id=trip_id, user_id=user.id).first()
     
     if not trip:
@@ -697,16 +837,13 @@ def trip_view(trip_id):
     formatted_destinations = []
     for dest in trip.destinations:
         try:
-            # Parse date range if available
+            # Dates were parsed from the date range string when it was saved
             date_range = None
-            if ' to ' in (dest.date_range or ''):
-                start_str, end_str = dest.date_range.split(' to ')
-                start_date = datetime.strptime(start_str, '%Y-%m-%d')
-                end_date = datetime.strptime(end_str, '%Y-%m-%d')
+            if dest.start_date and dest.end_date:
                 date_range = {
-                    'start': start_date,
-                    'end': end_date,
-                    'duration': (end_date - start_date).days + 1
+                    'start': dest.start_date,
+                    'end': dest.end_date,
+                    'duration': dest.duration_days
                 }
 
             # Format activities with suggested timings
@@ -718,11 +855,12 @@ def trip_view(trip_id):
             activities = []
             for idx, activity in enumerate(dest.activities or []):
                 activity_data = {
-                    'name': activity.name if hasattr(activity, 'name') else str(activity),
-                    'time': suggested_timings[idx % len(suggested_timings)],
+                    'name': activity.get('name', ''),
+                    'location': activity.get('location'),
+                    'time': activity.get('time') or suggested_timings[idx % len(suggested_timings)],
                     'duration': '1.5 hours',  # Default duration
-                    'category': activity.category if hasattr(activity, 'category') else 'Sightseeing',
-                    'cost': activity.cost if hasattr(activity, 'cost') else None,
+                    'category': activity.get('category') or 'Sightseeing',
+                    'cost': activity.get('cost'),
                     'status': 'planned'
                 }
                 activities.append(activity_data)
@@ -751,7 +889,7 @@ def trip_view(trip_id):
             day_activities = []
             for dest in formatted_destinations:
                 if dest.get('date_range'):
-                    if dest['date_range']['start'].date() <= current_date <= dest['date_range']['end'].date():
+                    if dest['date_range']['start'] <= current_date <= dest['date_range']['end']:
                         day_activities.extend(dest['activities'])
             
             calendar_days.append({
@@ -759,7 +897,7 @@ def trip_view(trip_id):
                 'activities': day_activities,
                 'destination': next((d for d in formatted_destinations 
                                    if d.get('date_range') and 
-                                   d['date_range']['start'].date() <= current_date <= d['date_range']['end'].date()), None)
+                                   d['date_range']['start'] <= current_date <= d['date_range']['end']), None)
             })
             current_date += timedelta(days=1)
 
@@ -963,6 +1101,79 @@ def get_city_data():
     
     return jsonify(city_data)
 
+@app.route("/api/search/cities")
+def api_search_cities():
+    """City catalog search backing the city search page and its map.
+
+    Text filters: q (or query), country, cost_filter (or cost).
+    Spatial: lat + lng with radius_km for everything within the circle, or
+    without it for the k nearest (default: limit). Results come from the
+    in-memory city index, closest first when located.
+    """
+    limit = max(1, min(request.args.get("limit", 50, type=int), 200))
+    match = city_filter(
+        request.args.get("q") or request.args.get("query"),
+        request.args.get("country"),
+        request.args.get("cost_filter") or request.args.get("cost"),
+    )
+    lat = request.args.get("lat", type=float)
+    lng = request.args.get("lng", type=float)
+    radius_km = request.args.get("radius_km", type=float)
+    k = request.args.get("k", type=int)
+    if (lat is None) != (lng is None):
+        return {"ok": False, "error": "lat and lng must be given together"}, 400
+    if lat is not None and not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return {"ok": False, "error": "lat/lng out of range"}, 400
+    if radius_km is not None and (lat is None or radius_km <= 0):
+        return {"ok": False, "error": "radius_km needs lat/lng and must be positive"}, 400
+    if k is not None and k < 1:
+        return {"ok": False, "error": "k must be positive"}, 400
+
+    cities = find_cities(lat, lng, radius_km, k, match, limit)
+    return {"ok": True, "cities": cities, "count": len(cities)}
+
+@app.route("/api/map/clusters")
+def api_map_clusters():
+    """Clustered city markers for a map viewport.
+
+    Query params: bbox=west,south,east,north (degrees; west > east crosses
+    the antimeridian) and zoom. Single cities come back as the same payload
+    as /api/search/cities, everything else as count clusters.
+    """
+    try:
+        west, south, east, north = (float(v) for v in request.args.get("bbox", "").split(","))
+    except ValueError:
+        return {"ok": False, "error": "bbox must be west,south,east,north"}, 400
+    zoom = request.args.get("zoom", type=int)
+    if zoom is None or zoom < 0:
+        return {"ok": False, "error": "zoom is required"}, 400
+    if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= north <= 90):
+        return {"ok": False, "error": "bbox out of range"}, 400
+
+    result = viewport_features(west, south, east, north, zoom)
+    if result is None:
+        return {"ok": False, "error": "Map clustering unavailable"}, 503
+    # Large viewports are clustered at a coarser zoom than asked for
+    served_zoom, features = result
+    response = jsonify({"ok": True, "zoom": served_zoom, "features": features})
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return response
+
+@app.route("/api/destinations/popular")
+def api_popular_destinations():
+    """Trending destinations: trip stops and wishlist cities, recent ones weighted up.
+
+    Query params: limit (default 10, at most 100) and country.
+    """
+    limit = request.args.get("limit", 10, type=int)
+    if not 1 <= limit <= 100:
+        return {"ok": False, "error": "limit must be between 1 and 100"}, 400
+    country = request.args.get("country", "").strip() or None
+    destinations = [popularity_entry(row) for row in top_destinations(limit, country)]
+    response = jsonify({"ok": True, "destinations": destinations})
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return response
+
 @app.route("/api/cities/search")
 def search_cities():
     """Search cities with filters"""
@@ -1059,7 +1270,7 @@ def trip_calendar_view(trip_id):
 		flash("Please log in to access this page.", "error")
 		return redirect(url_for("login"))
 	
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	trip = Trip.query.filter_by(id=trip_id, user_id=user.id).first()
 	
 	if not trip:
@@ -1098,14 +1309,8 @@ def dashboard():
 	completed_trips = trips_q.filter(Trip.status == "completed").count()
 	upcoming_trips = trips_q.filter(Trip.start_date != None, Trip.start_date >= date.today()).count()
 	
-	# Places visited from trip destinations
-	dest_rows = (
-		db.session.query(TripDestination.name, TripDestination.city, TripDestination.country)
-		.join(Trip, Trip.id == TripDestination.trip_id)
-		.filter(Trip.user_id == user.id)
-		.all()
-	)
-	places_visited = len(list({(n or "", c or "", co or "") for (n, c, co) in dest_rows}))
+	# Places visited: distinct canonical places across the user's trips
+	places_visited_count = places_visited(user.id)
 	
 	# Budget calculations
 	total_budget = db.session.query(db.func.sum(Trip.budget)).filter_by(user_id=user.id).scalar() or 0
@@ -1127,6 +1332,9 @@ def dashboard():
 		.first()
 	)
 	
+	# Suggestions precomputed by recommendation_service
+	suggested_destinations = recommendations_for(user.id)
+	
 	# Popular destinations from wishlist
 	recommended_destinations = (
 		WishlistItem.query.filter_by(user_id=user.id)
@@ -1152,17 +1360,19 @@ def dashboard():
 		"total_trips": total_trips,
 		"completed_trips": completed_trips,
 		"upcoming_trips": upcoming_trips,
-		"places_visited": places_visited,
+		"places_visited": places_visited_count,
 		"total_budget": total_budget,
 		"avg_budget": avg_budget,
 	}
 
 	return render_template(
 		"dashboard.html",
+		trips_stamp=trips_stamp(user.id),
 		stats=stats,
 		recent_trips=recent_trips,
 		next_trip=next_trip,
 		recommended_destinations=recommended_destinations,
+		suggested_destinations=suggested_destinations,
 		user=user,
 	)
 
@@ -1173,7 +1383,7 @@ def dashboard_stats_api():
 	if not session.get("user_email"):
 		return jsonify({"error": "Unauthorized"}), 401
 	
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	if not user:
 		return jsonify({"error": "User not found"}), 404
 	
@@ -1183,14 +1393,8 @@ def dashboard_stats_api():
 	completed_trips = trips_q.filter(Trip.status == "completed").count()
 	upcoming_trips = trips_q.filter(Trip.start_date != None, Trip.start_date >= date.today()).count()
 	
-	# Places visited calculation
-	dest_rows = (
-		db.session.query(TripDestination.name, TripDestination.city, TripDestination.country)
-		.join(Trip, Trip.id == TripDestination.trip_id)
-		.filter(Trip.user_id == user.id)
-		.all()
-	)
-	places_visited = len(list({(n or "", c or "", co or "") for (n, c, co) in dest_rows}))
+	# Places visited: distinct canonical places across the user's trips
+	places_visited_count = places_visited(user.id)
 	
 	# Budget calculations
 	total_budget = db.session.query(db.func.sum(Trip.budget)).filter_by(user_id=user.id).scalar() or 0
@@ -1201,7 +1405,7 @@ def dashboard_stats_api():
 			"total_trips": total_trips,
 			"completed_trips": completed_trips,
 			"upcoming_trips": upcoming_trips,
-			"places_visited": places_visited,
+			"places_visited": places_visited_count,
 			"total_budget": float(total_budget),
 			"avg_budget": float(avg_budget)
 		}
@@ -1213,7 +1417,7 @@ def dashboard_recent_trips_api():
 	if not session.get("user_email"):
 		return jsonify({"error": "Unauthorized"}), 401
 	
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	if not user:
 		return jsonify({"error": "User not found"}), 404
 	
@@ -1243,7 +1447,7 @@ def create_trip():
 	if not session.get("user_email"):
 		flash("Please log in to access this page.", "error")
 		return redirect(url_for("login"))
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	if request.method == "POST":
 		title = (request.form.get("tripName") or "").strip()
 		start_date = request.form.get("startDate") or None
@@ -1271,6 +1475,8 @@ def create_trip():
 				continue
 			# Store as itinerary entries (names only for now)
 			db.session.add(TripDestination(trip_id=trip.id, name=dest_name, order_index=idx, sequence=idx+1))
+		if ordered_dests:
+			refresh_recommendations(user.id)
 		db.session.commit()
 		flash("Trip created.", "success")
 		return redirect(url_for("itinerary", trip_id=trip.id))
@@ -1291,16 +1497,11 @@ def my_trips():
 	ongoing_count = len(trips_ongoing)
 	upcoming_count = len(trips_upcoming)
 	completed_count = len(trips_completed)
-	# Places visited = distinct TripDestination across user's trips
-	place_rows = (
-		db.session.query(TripDestination.name)
-		.join(Trip, Trip.id == TripDestination.trip_id)
-		.filter(Trip.user_id == user.id)
-		.all()
-	)
-	places_visited_count = len({(n[0] or "").strip().lower() for n in place_rows})
+	# Places visited: distinct canonical places across the user's trips
+	places_visited_count = places_visited(user.id)
 	return render_template(
 		"dashboard/my_trips.html",
+		trips_stamp=trips_stamp(user.id),
 		trips_ongoing=trips_ongoing,
 		trips_upcoming=trips_upcoming,
 		trips_completed=trips_completed,
@@ -1316,15 +1517,12 @@ def my_trips():
 
 @app.context_processor
 def inject_current_user():
-	email = session.get("user_email")
-	user = None
-	if email:
-		user = User.query.filter_by(email=email).first()
+	user = get_current_user()
 	# Provide unread notifications count globally where possible
 	unread_count = 0
 	if user:
 		try:
-			unread_count = Notification.query.filter_by(user_id=user.id, is_read=False).count()
+			unread_count = unread_notifications(user.id)
 		except Exception as e:
 			print(f"Warning: Could not fetch notification count: {e}")
 			unread_count = 0
@@ -1334,7 +1532,7 @@ def inject_current_user():
 @app.route("/logout")
 def logout():
 	# Remove app session info
-	session.pop("user_email", None)
+	log_out()
 	# Remove Google OAuth token if present
 	session.pop("google_oauth_token", None)
 	flash("You have been logged out.", "success")
@@ -1360,72 +1558,76 @@ def itinerary(trip_id: int):
 		.order_by(TripDestination.order_index.asc(), TripDestination.id.asc())
 		.all()
 	)
-	print(f"DEBUG - Found {len(sections)} sections for trip {trip_id}")
-	for s in sections:
-		print(f"DEBUG - Section: {s.name}, city: {s.city}, date_range: {s.date_range}")
+	app.logger.debug("Itinerary for trip %s: %d sections", trip_id, len(sections))
 	return render_template("trip/itinerary_builder.html", trip=trip, sections=sections)
 
 
+@app.route("/api/trips/<int:trip_id>/itinerary", methods=["GET"])
+def get_itinerary(trip_id: int):
+	"""Itinerary sections in the shape the builder posts them, with the trip ETag"""
+	if not session.get("user_email"):
+		return {"ok": False, "error": "auth"}, 401
+	
+	user = get_current_user()
+	trip = Trip.query.filter_by(id=trip_id, user_id=user.id).first() if user else None
+	if not trip:
+		return {"ok": False, "error": "not_found"}, 404
+	
+	not_modified = trip_not_modified(trip)
+	if not_modified:
+		return not_modified
+	
+	rows = (
+		TripDestination.query.filter_by(trip_id=trip.id)
+		.order_by(TripDestination.order_index.asc(), TripDestination.id.asc())
+		.all()
+	)
+	sections = []
+	for row in rows:
+		sections.append({
+			"id": row.id,
+			"city": row.city or row.name,
+			"order": row.sequence or row.order_index + 1,
+			"dateRange": row.date_range or "",
+			"startDate": row.start_date.isoformat() if row.start_date else None,
+			"endDate": row.end_date.isoformat() if row.end_date else None,
+			"budget": row.budget or 0,
+			"activities": row.activities or [],
+		})
+	return with_trip_etag({
+		"ok": True,
+		"version": trip.version,
+		"totalBudget": trip.budget or 0,
+		"sections": sections,
+	}, trip)
+
+
 @app.route("/api/trips/<int:trip_id>/itinerary", methods=["POST"])
 def save_itinerary(trip_id: int):
     """Save itinerary sections with proper data structure and ordering"""
     if not session.get("user_email"):
         return {"ok": False, "error": "auth"}, 401
     
-    user = User.query.filter_by(email=session["user_email"]).first()
+    user = get_current_user()
     trip = Trip.query.filter_by(id=trip_id, user_id=user.id).first()
     if not trip:
         return {"ok": False, "error": "not_found"}, 404
     
+    precondition_failed = trip_precondition_failed(trip)
+    if precondition_failed:
+        return precondition_failed
+    
     data = request.get_json(silent=True) or {}
     sections = data.get("sections", [])
+    if not isinstance(sections, list):
+        sections = []
     total_budget = data.get("totalBudget", 0)
     
-    print(f"DEBUG - Save itinerary called for trip {trip_id}")
-    print(f"DEBUG - Received sections: {sections}")
-    print(f"DEBUG - Total budget: {total_budget}")
+    app.logger.debug("Saving itinerary for trip %s: %d sections, total budget %s", trip_id, len(sections), total_budget)
     
     try:
-        # Clear existing destinations to prevent duplicates
-        TripDestination.query.filter_by(trip_id=trip.id).delete()
-        
-        # Add new sections with proper ordering
-        for section_data in sections:
-            if not isinstance(section_data, dict):
-                continue
-            
-            # Handle city data - could be string or object
-            city_data = section_data.get("city", "")
-            if isinstance(city_data, dict):
-                city_name = city_data.get("name", "").strip()
-                city_place_id = city_data.get("placeId", "")
-            else:
-                city_name = str(city_data).strip()
-                city_place_id = ""
-            
-            if not city_name:
-                continue
-            
-            # Get and validate budget
-            section_budget = section_data.get("budget", 0)
-            try:
-                section_budget = float(section_budget) if section_budget else 0
-                if section_budget < 0:
-                    section_budget = 0  # Prevent negative budgets
-            except (ValueError, TypeError):
-                section_budget = 0
-            
-            destination = TripDestination(
-                trip_id=trip.id,
-                name=city_name,
-                city=city_name,  # Store city name in city field too
-                order_index=section_data.get("order", 1) - 1,  # 0-based index
-                sequence=section_data.get("order", 1),  # 1-based sequence
-                date_range=section_data.get("dateRange", ""),
-                budget=section_budget,
-                notes=json.dumps(section_data.get("activities", []))
-            )
-            db.session.add(destination)
+        # Write only what changed; unchanged saves are detected by content hash
+        ids, stats = save_itinerary_sections(trip, sections)
         
         # Update trip budget if provided (validate non-negative)
         try:
@@ -1435,12 +1637,28 @@ def save_itinerary(trip_id: int):
         except (ValueError, TypeError):
             total_budget = 0
             
-        if total_budget > 0:
+        if total_budget > 0 and trip.budget != total_budget:
             trip.budget = total_budget
+        elif not stats["unchanged"]:
+            trip.touch()  # Destinations changed, so cached copies of the trip are stale
+        if not stats["unchanged"]:
+            refresh_recommendations(user.id)  # Suggestions follow the new destinations
         
+        # The trip UPDATE is guarded by its version; a concurrent save makes it
+        # match no row and the whole itinerary diff is rolled back
         db.session.commit()
-        return {"ok": True, "count": len(sections), "totalBudget": total_budget}
+        return with_trip_etag({
+            "ok": True,
+            "count": len(sections),
+            "totalBudget": total_budget,
+            "ids": ids,
+            "version": trip.version,
+            **stats,
+        }, trip)
         
+    except StaleDataError:
+        db.session.rollback()
+        return trip_conflict(trip)  # rollback expired it, so this reloads the winning version
     except Exception as e:
         db.session.rollback()
         print(f"Error saving itinerary: {e}")
@@ -1451,21 +1669,15 @@ def profile_settings():
 	if not session.get("user_email"):
 		flash("Please log in to access this page.", "error")
 		return redirect(url_for("login"))
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	# Build stats and trip groupings for the profile page
 	today = date.today()
 	trips_all = Trip.query.filter_by(user_id=user.id).order_by(Trip.created_at.desc()).all()
 	trips_ongoing = [t for t in trips_all if t.status in ("in_progress", "ongoing") or (t.start_date and t.end_date and t.start_date <= today <= t.end_date)]
 	trips_upcoming = [t for t in trips_all if (t.start_date and t.start_date > today) and t.status not in ("completed",)]
 	trips_completed = [t for t in trips_all if t.status == "completed" or (t.end_date and t.end_date < today)]
-	# Places visited = distinct TripDestination across user's trips
-	place_rows = (
-		db.session.query(TripDestination.name)
-		.join(Trip, Trip.id == TripDestination.trip_id)
-		.filter(Trip.user_id == user.id)
-		.all()
-	)
-	places_visited_count = len({(n[0] or "").strip().lower() for n in place_rows})
+	# Places visited: distinct canonical places across the user's trips
+	places_visited_count = places_visited(user.id)
 	stats = {
 		"trips_completed": len(trips_completed),
 		"places": places_visited_count,
@@ -1474,6 +1686,7 @@ def profile_settings():
 	}
 	return render_template(
 		"user/profile_settings.html",
+		trips_stamp=trips_stamp(user.id),
 		stats=stats,
 		trips_upcoming=trips_upcoming,
 		trips_completed=trips_completed,
@@ -1486,7 +1699,7 @@ def profile_settings():
 def api_notifications():
 	if not session.get("user_email"):
 		return {"ok": False, "error": "auth"}, 401
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	items = (
 		Notification.query.filter_by(user_id=user.id)
 		.order_by(Notification.created_at.desc())
@@ -1508,21 +1721,46 @@ def api_notifications():
 	}
 
 
+@app.route("/api/notifications/stream")
+def api_notifications_stream():
+	"""Server-sent events: ``ready`` with the unread count, then one
+	``notification`` event per new row (see notification_stream.py)"""
+	if not session.get("user_email"):
+		return {"ok": False, "error": "auth"}, 401
+	user = get_current_user()
+	if not user:
+		return {"ok": False, "error": "User not found"}, 404
+	headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # Don't let nginx hold events back
+	if request.method == "HEAD":
+		# No body will be read, so don't take a stream slot for it
+		return Response(mimetype="text/event-stream", headers=headers)
+	last_event_id = parse_last_event_id(
+		request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+	)
+	stream = notification_streams(app).open(user.id, last_event_id)
+	if stream is None:
+		# Worker is at its stream limit; the page falls back to fetching on demand
+		return {"ok": False, "error": "Too many open streams"}, 503, {"Retry-After": "30"}
+	response = Response(stream, mimetype="text/event-stream", headers=headers)
+	# Frees the slot even if the body is never iterated (client gone before the first byte)
+	response.call_on_close(stream.release)
+	return response
+
+
 @app.route("/api/notifications/mark-read", methods=["POST"])
 def api_notifications_mark_read():
 	if not session.get("user_email"):
 		return {"ok": False, "error": "auth"}, 401
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
+	if not user:  # Session outlived its account
+		return {"ok": False, "error": "auth"}, 401
 	ids = (request.get_json(silent=True) or {}).get("ids") or []
 	if not isinstance(ids, list):
 		ids = []
-	q = Notification.query.filter(Notification.user_id == user.id)
-	if ids:
-		q = q.filter(Notification.id.in_(ids))
-	for n in q.all():
-		n.is_read = True
+	ids = [i for i in ids if isinstance(i, int) and not isinstance(i, bool)]
+	updated = mark_notifications_read(user.id, ids)
 	db.session.commit()
-	return {"ok": True}
+	return {"ok": True, "updated": updated}
 
 
 # Seed a notification (dev/testing)
@@ -1530,9 +1768,10 @@ def api_notifications_mark_read():
 def dev_notify():
 	if not session.get("user_email"):
 		return redirect(url_for("login"))
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	db.session.add(Notification(user_id=user.id, message="New destination deals available!", kind="info"))
 	db.session.commit()
+	invalidate_unread(user.id)
 	flash("Test notification created.", "success")
 	return redirect(url_for("dashboard"))
 
@@ -1545,7 +1784,7 @@ def add_suggestion_to_trip():
 	if not session.get("user_email"):
 		return {"ok": False, "error": "Not logged in"}, 401
 	
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	if not user:
 		return {"ok": False, "error": "User not found"}, 404
 	
@@ -1606,6 +1845,8 @@ def add_suggestion_to_trip():
 		)
 		
 		db.session.add(new_destination)
+		target_trip.touch()
+		refresh_recommendations(user.id)
 		db.session.commit()
 		
 		return {
@@ -1625,7 +1866,7 @@ def add_suggestion_to_wishlist():
 	if not session.get("user_email"):
 		return {"ok": False, "error": "Not logged in"}, 401
 	
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	if not user:
 		return {"ok": False, "error": "User not found"}, 404
 	
@@ -1676,7 +1917,7 @@ def delete_trip(trip_id):
 	if not session.get("user_email"):
 		return {"ok": False, "error": "Not logged in"}, 401
 	
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	if not user:
 		return {"ok": False, "error": "User not found"}, 404
 	
@@ -1708,7 +1949,7 @@ def update_trip(trip_id):
 	if not session.get("user_email"):
 		return {"ok": False, "error": "Not logged in"}, 401
 	
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	if not user:
 		return {"ok": False, "error": "User not found"}, 404
 	
@@ -1722,6 +1963,10 @@ def update_trip(trip_id):
 		if not trip:
 			return {"ok": False, "error": "Trip not found"}, 404
 		
+		precondition_failed = trip_precondition_failed(trip)
+		if precondition_failed:
+			return precondition_failed
+		
 		field = data.get("field")
 		value = data.get("value")
 		
@@ -1744,11 +1989,15 @@ def update_trip(trip_id):
 		
 		db.session.commit()
 		
-		return {
+		return with_trip_etag({
 			"ok": True,
-			"message": f"Trip {field.replace('_', ' ')} updated successfully"
-		}
+			"message": f"Trip {field.replace('_', ' ')} updated successfully",
+			"version": trip.version,
+		}, trip)
 		
+	except StaleDataError:
+		db.session.rollback()
+		return trip_conflict(trip)  # rollback expired it, so this reloads the winning version
 	except Exception as e:
 		db.session.rollback()
 		print(f"Error updating trip: {str(e)}")
@@ -1768,7 +2017,7 @@ def update_profile():
 	if not session.get("user_email"):
 		flash("Please log in to update your profile.", "error")
 		return redirect(url_for("login"))
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	if not user:
 		flash("User not found.", "error")
 		return redirect(url_for("login"))
@@ -1861,6 +2110,7 @@ def update_profile():
 		user.bio = bio
 		user.date_of_birth = date_of_birth
 		user.travel_preferences = preferences_json
+		refresh_recommendations(user.id)
 		
 		print(f"Debug - Saving preferences to DB: {preferences_json}")
 		
@@ -1884,7 +2134,7 @@ def debug_uploads():
 	upload_folder = os.path.join(app.static_folder, 'uploads', 'profiles')
 	try:
 		files = os.listdir(upload_folder)
-		user = User.query.filter_by(email=session["user_email"]).first()
+		user = get_current_user()
 		return f"""
 		<h3>Upload Debug Info</h3>
 		<p><strong>Upload folder:</strong> {upload_folder}</p>
@@ -1905,7 +2155,7 @@ def fast_trip_search():
 	if not session.get("user_email"):
 		return {"ok": False, "error": "Not logged in"}, 401
 	
-	user = User.query.filter_by(email=session["user_email"]).first()
+	user = get_current_user()
 	if not user:
 		return {"ok": False, "error": "User not found"}, 404
 	
@@ -1997,7 +2247,7 @@ def rate_recommendation(item_id):
     if not session.get("user_email"):
         return {"ok": False, "error": "Not logged in"}, 401
     
-    user = User.query.filter_by(email=session["user_email"]).first()
+    user = get_current_user()
     if not user:
         return {"ok": False, "error": "User not found"}, 404
         
@@ -2094,7 +2344,7 @@ def get_user_trips():
     if not session.get("user_email"):
         return {"ok": False, "error": "Not logged in"}, 401
 
-    user = User.query.filter_by(email=session["user_email"]).first()
+    user = get_current_user()
     if not user:
         return {"ok": False, "error": "User not found"}, 404
 
@@ -2342,7 +2592,7 @@ def refresh_cache():
 		return {"ok": False, "error": "Not logged in"}, 401
 	
 	try:
-		user = User.query.filter_by(email=session["user_email"]).first()
+		user = get_current_user()
 		if not user:
 			return {"ok": False, "error": "User not found"}, 404
 		
@@ -2380,7 +2630,7 @@ def get_trip_details(trip_id):
 		return {"ok": False, "error": "Not logged in"}, 401
 	
 	try:
-		user = User.query.filter_by(email=session["user_email"]).first()
+		user = get_current_user()
 		if not user:
 			return {"ok": False, "error": "User not found"}, 404
 		
@@ -2389,6 +2639,10 @@ def get_trip_details(trip_id):
 		if not trip:
 			return {"ok": False, "error": "Trip not found"}, 404
 		
+		not_modified = trip_not_modified(trip)
+		if not_modified:
+			return not_modified
+		
 		trip_data = {
 			'id': trip.id,
 			'title': trip.title,
@@ -2396,10 +2650,11 @@ def get_trip_details(trip_id):
 			'end_date': trip.end_date.isoformat() if trip.end_date else None,
 			'budget': trip.budget,
 			'status': trip.status,
-			'created_at': trip.created_at.isoformat() if trip.created_at else None
+			'created_at': trip.created_at.isoformat() if trip.created_at else None,
+			'version': trip.version
 		}
 		
-		return {"ok": True, "trip": trip_data}
+		return with_trip_etag({"ok": True, "trip": trip_data}, trip)
 		
 	except Exception as e:
 		print(f"Error getting trip details: {str(e)}")
@@ -2412,7 +2667,7 @@ def get_trip_cities(trip_id):
 		return {"ok": False, "error": "Not logged in"}, 401
 	
 	try:
-		user = User.query.filter_by(email=session["user_email"]).first()
+		user = get_current_user()
 		if not user:
 			return {"ok": False, "error": "User not found"}, 404
 		
@@ -2421,13 +2676,19 @@ def get_trip_cities(trip_id):
 		if not trip:
 			return {"ok": False, "error": "Trip not found"}, 404
 		
+		# Destination writes bump the trip version; the catalog stamp covers coordinates
+		etag = trip_catalog_etag(trip)
+		not_modified = trip_not_modified(trip, etag)
+		if not_modified:
+			return not_modified
+		
 		# Get all destinations for this trip
 		destinations = TripDestination.query.filter_by(trip_id=trip_id).order_by(
 			TripDestination.order_index.asc()
 		).all()
 		
 		cities = []
-		for dest in destinations:
+		for dest, coordinates in zip(destinations, resolve_coordinates(destinations)):
 			cities.append({
 				'id': dest.id,
 				'name': dest.name,
@@ -2435,25 +2696,101 @@ def get_trip_cities(trip_id):
 				'country': dest.country,
 				'order_index': dest.order_index,
 				'budget': dest.budget,
-				'date_range': dest.date_range
+				'date_range': dest.date_range,
+				'coordinates': {'lat': coordinates[0], 'lng': coordinates[1]} if coordinates else None
 			})
 		
-		return {"ok": True, "cities": cities}
+		return with_trip_etag({"ok": True, "cities": cities}, trip, etag)
 		
 	except Exception as e:
 		print(f"Error getting trip cities: {str(e)}")
 		return {"ok": False, "error": "Failed to get cities"}, 500
 
+@app.route('/api/trips/<int:trip_id>/route/optimize', methods=['GET'])
+def optimize_trip_route(trip_id):
+	"""Propose the visiting order with the shortest total distance.
+	
+	Query params: start / end (destination ids that must stay first / last).
+	Nothing is saved; the builder saves the proposed order like any other edit.
+	Destinations whose city has no coordinates keep their relative order
+	after the optimized stops.
+	"""
+	if "user_email" not in session:
+		return {"ok": False, "error": "Not logged in"}, 401
+	
+	user = get_current_user()
+	if not user:
+		return {"ok": False, "error": "User not found"}, 404
+	
+	trip = Trip.query.filter_by(id=trip_id, user_id=user.id).first()
+	if not trip:
+		return {"ok": False, "error": "Trip not found"}, 404
+	
+	etag = trip_catalog_etag(trip)
+	not_modified = trip_not_modified(trip, etag)
+	if not_modified:
+		return not_modified
+	
+	destinations = TripDestination.query.filter_by(trip_id=trip_id).order_by(
+		TripDestination.order_index.asc(), TripDestination.id.asc()
+	).all()
+	coordinates = resolve_coordinates(destinations)
+	located = [i for i, c in enumerate(coordinates) if c is not None]
+	unresolved = [i for i, c in enumerate(coordinates) if c is None]
+	
+	fixed = {}
+	for param in ("start", "end"):
+		dest_id = request.args.get(param, type=int)
+		if dest_id is None:
+			continue
+		position = next((p for p, i in enumerate(located) if destinations[i].id == dest_id), None)
+		if position is None:
+			return {"ok": False, "error": f"{param} must be a destination with known coordinates"}, 400
+		fixed[param] = position
+	
+	points = [coordinates[i] for i in located]
+	try:
+		order, optimized_km, method = optimize_route(points, fixed.get("start"), fixed.get("end"))
+	except ValueError as e:
+		return {"ok": False, "error": str(e)}, 400
+	current_km = path_length(distance_matrix(points), list(range(len(points)))) if len(points) > 1 else 0.0
+	
+	proposed = [located[p] for p in order] + unresolved
+	return with_trip_etag({
+		"ok": True,
+		"method": method,
+		"order": [
+			{
+				"id": destinations[i].id,
+				"name": destinations[i].name,
+				"order_index": position,
+				"previous_order_index": destinations[i].order_index,
+				"coordinates": {"lat": coordinates[i][0], "lng": coordinates[i][1]} if coordinates[i] else None,
+			}
+			for position, i in enumerate(proposed)
+		],
+		"unresolved": [destinations[i].name for i in unresolved],
+		"current_distance_km": round(current_km, 1),
+		"optimized_distance_km": round(optimized_km, 1),
+		"saved_km": round(current_km - optimized_km, 1),
+	}, trip, etag)
+
 # ========== EXPENSE MANAGEMENT ROUTES ==========
 
+EXPENSES_PER_PAGE = 50
+MAX_EXPENSES_PER_PAGE = 200
+
 @app.route('/api/trips/<int:trip_id>/expenses', methods=['GET'])
 def get_trip_expenses(trip_id):
-	"""Get all expenses for a specific trip with category breakdown"""
+	"""Get one page of a trip's expenses (newest first) with the category breakdown.
+	
+	Query params: page (1-based, default 1) and per_page (default 50, max 200).
+	"""
 	if "user_email" not in session:
 		return {"ok": False, "error": "Not logged in"}, 401
 	
 	try:
-		user = User.query.filter_by(email=session["user_email"]).first()
+		user = get_current_user()
 		if not user:
 			return {"ok": False, "error": "User not found"}, 404
 		
@@ -2462,64 +2799,48 @@ def get_trip_expenses(trip_id):
 		if not trip:
 			return {"ok": False, "error": "Trip not found"}, 404
 		
-		# Get all expenses for this trip
-		expenses = TripExpense.query.filter_by(trip_id=trip_id).order_by(
-			TripExpense.expense_date.desc()
-		).all()
-		
-		# Calculate category breakdown
-		category_totals = {}
-		daily_totals = {}
-		total_amount = 0
+		page = max(request.args.get("page", 1, type=int), 1)
+		per_page = min(max(request.args.get("per_page", EXPENSES_PER_PAGE, type=int), 1), MAX_EXPENSES_PER_PAGE)
 		
-		for expense in expenses:
-			# Category totals
-			if expense.category not in category_totals:
-				category_totals[expense.category] = 0
-			category_totals[expense.category] += expense.amount
-			
-			# Daily totals
-			date_str = expense.expense_date.strftime('%Y-%m-%d')
-			if date_str not in daily_totals:
-				daily_totals[date_str] = 0
-			daily_totals[date_str] += expense.amount
-			
-			total_amount += expense.amount
-		
-		# Format expenses for response
-		expense_list = []
-		for expense in expenses:
-			expense_list.append({
-				'id': expense.id,
-				'category': expense.category,
-				'amount': expense.amount,
-				'description': expense.description,
-				'expense_date': expense.expense_date.strftime('%Y-%m-%d'),
-				'created_at': expense.created_at.strftime('%Y-%m-%d %H:%M'),
-				'destination_id': expense.destination_id
-			})
-		
-		# Calculate average daily spending
-		num_days = len(daily_totals) if daily_totals else 1
-		avg_daily_spend = total_amount / num_days
+		# The summary already knows the row count, so the page needs no COUNT query
+		summary = expense_summary(trip)
+		expenses = TripExpense.query.filter_by(trip_id=trip_id).order_by(
+			TripExpense.expense_date.desc(), TripExpense.id.desc()
+		).offset((page - 1) * per_page).limit(per_page).all()
 		
+		total = summary["num_expenses"]
 		return {
 			"ok": True,
-			"expenses": expense_list,
-			"summary": {
-				"total_amount": total_amount,
-				"category_breakdown": category_totals,
-				"daily_totals": daily_totals,
-				"avg_daily_spend": round(avg_daily_spend, 2),
-				"num_expenses": len(expenses),
-				"num_days": num_days
-			}
+			"expenses": [expense_to_dict(expense) for expense in expenses],
+			"pagination": {
+				"page": page,
+				"per_page": per_page,
+				"total": total,
+				"pages": (total + per_page - 1) // per_page
+			},
+			"summary": summary
 		}
 		
 	except Exception as e:
 		print(f"Error getting trip expenses: {str(e)}")
 		return {"ok": False, "error": "Failed to get expenses"}, 500
 
+@app.route('/api/trips/<int:trip_id>/expenses/summary', methods=['GET'])
+def get_trip_expense_summary(trip_id):
+	"""Category and daily totals for a trip without the itemized list"""
+	if "user_email" not in session:
+		return {"ok": False, "error": "Not logged in"}, 401
+	
+	user = get_current_user()
+	if not user:
+		return {"ok": False, "error": "User not found"}, 404
+	
+	trip = Trip.query.filter_by(id=trip_id, user_id=user.id).first()
+	if not trip:
+		return {"ok": False, "error": "Trip not found"}, 404
+	
+	return {"ok": True, "summary": expense_summary(trip)}
+
 @app.route('/api/trips/<int:trip_id>/expenses', methods=['POST'])
 def add_trip_expense(trip_id):
 	"""Add a new expense to a trip"""
@@ -2527,7 +2848,7 @@ def add_trip_expense(trip_id):
 		return {"ok": False, "error": "Not logged in"}, 401
 	
 	try:
-		user = User.query.filter_by(email=session["user_email"]).first()
+		user = get_current_user()
 		if not user:
 			return {"ok": False, "error": "User not found"}, 404
 		
@@ -2540,55 +2861,92 @@ def add_trip_expense(trip_id):
 		if not data:
 			return {"ok": False, "error": "No data provided"}, 400
 		
-		# Validate required fields
-		required_fields = ['category', 'amount', 'expense_date']
-		for field in required_fields:
-			if field not in data or not data[field]:
-				return {"ok": False, "error": f"Missing required field: {field}"}, 400
-		
-		# Validate category
-		valid_categories = ['accommodation', 'meals', 'transport', 'activities', 'shopping', 'other']
-		if data['category'] not in valid_categories:
-			return {"ok": False, "error": "Invalid category"}, 400
-		
-		# Parse date
-		try:
-			expense_date = datetime.strptime(data['expense_date'], '%Y-%m-%d').date()
-		except ValueError:
-			return {"ok": False, "error": "Invalid date format. Use YYYY-MM-DD"}, 400
+		values, error = parse_expense(data)
+		if error:
+			return {"ok": False, "error": error}, 400
 		
 		# Create new expense
-		expense = TripExpense(
-			trip_id=trip_id,
-			category=data['category'],
-			amount=float(data['amount']),
-			description=data.get('description', ''),
-			expense_date=expense_date,
-			destination_id=data.get('destination_id')
-		)
+		expense = TripExpense(trip_id=trip_id, **values)
 		
 		db.session.add(expense)
+		expenses_changed(trip)
 		db.session.commit()
 		
 		return {
 			"ok": True,
-			"expense": {
-				'id': expense.id,
-				'category': expense.category,
-				'amount': expense.amount,
-				'description': expense.description,
-				'expense_date': expense.expense_date.strftime('%Y-%m-%d'),
-				'created_at': expense.created_at.strftime('%Y-%m-%d %H:%M'),
-				'destination_id': expense.destination_id
-			}
+			"expense": expense_to_dict(expense)
 		}
 		
-	except ValueError as e:
-		return {"ok": False, "error": "Invalid amount format"}, 400
 	except Exception as e:
+		db.session.rollback()
 		print(f"Error adding expense: {str(e)}")
 		return {"ok": False, "error": "Failed to add expense"}, 500
 
+@app.route('/api/trips/<int:trip_id>/expenses/bulk', methods=['POST'])
+def bulk_add_trip_expenses(trip_id):
+	"""Import many expenses at once from a JSON array or a CSV upload.
+	
+	JSON: a list of expense objects, or {"expenses": [...]}. CSV: a text/csv body
+	or a multipart "file" field with a header row. By default the import is
+	all-or-nothing; pass ?skip_invalid=1 to keep the valid rows when some fail.
+	"""
+	if "user_email" not in session:
+		return {"ok": False, "error": "Not logged in"}, 401
+	
+	user = get_current_user()
+	if not user:
+		return {"ok": False, "error": "User not found"}, 404
+	
+	trip = Trip.query.filter_by(id=trip_id, user_id=user.id).first()
+	if not trip:
+		return {"ok": False, "error": "Trip not found"}, 404
+	
+	if "file" in request.files:
+		rows = iter_csv_rows(request.files["file"].stream)
+	elif request.mimetype in ("text/csv", "application/csv"):
+		rows = iter_csv_rows(request.stream)
+	else:
+		data = request.get_json(silent=True)
+		if isinstance(data, dict):
+			data = data.get("expenses")
+		if not isinstance(data, list):
+			return {"ok": False, "error": "Expected a JSON array of expenses or a CSV upload"}, 400
+		rows = data
+	
+	skip_invalid = request.args.get("skip_invalid", "").lower() in ("1", "true", "yes")
+	
+	try:
+		inserted, errors, error_count = bulk_insert_expenses(trip, rows)
+		
+		if error_count and not skip_invalid:
+			db.session.rollback()
+			return {
+				"ok": False,
+				"error": "Some rows are invalid; nothing was imported",
+				"inserted": 0,
+				"error_count": error_count,
+				"errors": errors
+			}, 400
+		
+		if inserted:
+			expenses_changed(trip)
+		db.session.commit()
+		return {
+			"ok": True,
+			"inserted": inserted,
+			"error_count": error_count,
+			"errors": errors,
+			"summary": expense_summary(trip)
+		}
+		
+	except (UnicodeDecodeError, csv.Error) as e:
+		db.session.rollback()
+		return {"ok": False, "error": f"Could not read CSV: {e}"}, 400
+	except Exception as e:
+		db.session.rollback()
+		print(f"Error importing expenses: {str(e)}")
+		return {"ok": False, "error": "Failed to import expenses"}, 500
+
 @app.route('/api/trips/<int:trip_id>/expenses/<int:expense_id>', methods=['DELETE'])
 def delete_trip_expense(trip_id, expense_id):
 	"""Delete a specific expense"""
@@ -2596,7 +2954,7 @@ def delete_trip_expense(trip_id, expense_id):
 		return {"ok": False, "error": "Not logged in"}, 401
 	
 	try:
-		user = User.query.filter_by(email=session["user_email"]).first()
+		user = get_current_user()
 		if not user:
 			return {"ok": False, "error": "User not found"}, 404
 		
@@ -2611,14 +2969,59 @@ def delete_trip_expense(trip_id, expense_id):
 			return {"ok": False, "error": "Expense not found"}, 404
 		
 		db.session.delete(expense)
+		expenses_changed(trip)
 		db.session.commit()
 		
 		return {"ok": True, "message": "Expense deleted successfully"}
 		
 	except Exception as e:
+		db.session.rollback()
 		print(f"Error deleting expense: {str(e)}")
 		return {"ok": False, "error": "Failed to delete expense"}, 500
 
+# ========== EXPORT ROUTES ==========
+
+def export_response(query, name):
+	"""Stream ``query`` as CSV (default) or NDJSON (?format=ndjson); ?gzip=1 for a .gz file"""
+	try:
+		chunks, mimetype, extension = export_stream(
+			query, request.args.get("format", "csv"), compress=request.args.get("gzip") in ("1", "true")
+		)
+	except ValueError as e:
+		return {"ok": False, "error": str(e)}, 400
+	response = Response(stream_with_context(chunks), mimetype=mimetype)
+	response.headers["Content-Disposition"] = f'attachment; filename="{name}-{date.today().isoformat()}.{extension}"'
+	response.headers["Cache-Control"] = "no-store"
+	return response
+
+@app.route('/api/export/trips', methods=['GET'])
+def export_trips():
+	"""Download all of the current user's trips"""
+	if "user_email" not in session:
+		return {"ok": False, "error": "Not logged in"}, 401
+	
+	user = get_current_user()
+	if not user:
+		return {"ok": False, "error": "User not found"}, 404
+	
+	return export_response(trips_query(user.id), "trips")
+
+@app.route('/api/trips/<int:trip_id>/expenses/export', methods=['GET'])
+def export_trip_expenses(trip_id):
+	"""Download every expense of a trip"""
+	if "user_email" not in session:
+		return {"ok": False, "error": "Not logged in"}, 401
+	
+	user = get_current_user()
+	if not user:
+		return {"ok": False, "error": "User not found"}, 404
+	
+	trip = Trip.query.filter_by(id=trip_id, user_id=user.id).first()
+	if not trip:
+		return {"ok": False, "error": "Trip not found"}, 404
+	
+	return export_response(expenses_query(trip.id), f"trip-{trip.id}-expenses")
+
 @app.route('/trip/<int:trip_id>/budget')
 def trip_budget_detailed(trip_id):
 	"""Budget breakdown page for a specific trip"""
@@ -2627,7 +3030,7 @@ def trip_budget_detailed(trip_id):
 		return redirect(url_for("login"))
 	
 	try:
-		user = User.query.filter_by(email=session["user_email"]).first()
+		user = get_current_user()
 		if not user:
 			flash("User not found.", "error")
 			return redirect(url_for("login"))
@@ -2661,8 +3064,7 @@ def admin_login():
 		user = User.query.filter_by(email=email).first()
 		
 		if user and user.check_password(password) and user.is_admin:
-			session['user_email'] = email
-			session['user_id'] = user.id
+			log_in(user)
 			flash('Admin login successful!', 'success')
 			return redirect(url_for('admin_dashboard'))
 		else:
@@ -2711,7 +3113,7 @@ def admin_required(f):
 			flash("Please log in to access admin panel.", "error")
 			return redirect(url_for("admin_login"))
 		
-		user = User.query.filter_by(email=session["user_email"]).first()
+		user = get_current_user()
 		if not user or not getattr(user, 'is_admin', False):
 			flash("Admin access required.", "error")
 			return redirect(url_for("admin_login"))
@@ -2768,23 +3170,8 @@ def admin_dashboard():
 			'completed': older_trips_count
 		}
 		
-		# Popular destinations (top 10)
-		popular_destinations_query = db.session.query(
-			TripDestination.name,
-			db.func.count(TripDestination.id).label('count')
-		).filter(
-			TripDestination.name.isnot(None)
-		).group_by(
-			TripDestination.name
-		).order_by(
-			db.func.count(TripDestination.id).desc()
-		).limit(10).all()
-		
-		# Convert to dictionaries to avoid JSON serialization issues
-		popular_destinations = [
-			{'name': dest.name, 'count': dest.count} 
-			for dest in popular_destinations_query
-		]
+		# Popular destinations (top 10, trending first)
+		popular_destinations = [popularity_entry(row) for row in top_destinations(10)]
 		
 		# Budget analytics
 		budget_by_month_query = db.session.query(
@@ -2927,7 +3314,7 @@ def admin_dashboard():
 			'recent_activity': recent_activity
 		}
 		
-		return render_template('admin/admin_dashboard.html', analytics=analytics_data)
+		return render_template('admin/admin_dashboard.html', analytics=analytics_data, analytics_stamp=site_stamp())
 		
 	except Exception as e:
 		print(f"Error loading admin dashboard: {str(e)}")
@@ -2936,7 +3323,9 @@ def admin_dashboard():
 		return render_template('admin/admin_dashboard.html', analytics={
 			'overview': {'total_users': 0, 'active_users': 0, 'total_trips': 0, 'total_expenses': 0, 'recent_users': 0, 'recent_trips': 0},
 			'user_growth': [], 'trip_stats': {}, 'popular_destinations': [], 
-			'budget_analytics': [], 'expense_categories': [], 'recent_activity': []
+			'budget_analytics': [], 'expense_categories': [], 'recent_activity': [],
+			'expense_trends': {'months': [], 'amounts': [], 'data': []},
+			'budget_comparison': {'trip_names': [], 'budgets': [], 'actual': []}
 		})
 
 @app.route('/admin/users')
@@ -3017,6 +3406,26 @@ def admin_trips():
 		flash("Error loading trips.", "error")
 		return redirect(url_for("admin_dashboard"))
 
+@app.route('/admin/export/trips')
+@admin_required
+def admin_export_trips():
+	"""Download every trip with its owner"""
+	return export_response(trips_query(), "all-trips")
+
+@app.route('/admin/export/expenses')
+@admin_required
+def admin_export_expenses():
+	"""Download every expense with its trip owner"""
+	return export_response(expenses_query(), "all-expenses")
+
+@app.route('/admin/perf')
+@admin_required
+def admin_perf():
+	"""Slowest endpoints by p95 latency, with their query/upstream/template cost"""
+	from perf import endpoint_stats
+	limit = min(request.args.get('limit', 25, type=int), 200)
+	return render_template('admin/perf.html', endpoints=endpoint_stats.slowest(limit), worker_pid=os.getpid())
+
 @app.route('/admin/api/user/<int:user_id>/toggle-status', methods=['POST'])
 @admin_required
 def admin_toggle_user_status(user_id):
@@ -3024,6 +3433,9 @@ def admin_toggle_user_status(user_id):
 	try:
 		user = User.query.get_or_404(user_id)
 		user.is_active = not user.is_active
+		if not user.is_active:
+			# Sign them out everywhere (server-side sessions only)
+			revoke_user_sessions(user.id)
 		db.session.commit()
 		
 		status = "activated" if user.is_active else "deactivated"
@@ -3153,17 +3565,8 @@ def admin_analytics_data():
 		new_users_week = User.query.filter(User.created_at >= week_ago).count()
 		new_trips_week = Trip.query.filter(Trip.created_at >= week_ago).count()
 		
-		# Popular destinations this month
-		month_ago = datetime.utcnow() - timedelta(days=30)
-		popular_destinations = db.session.query(
-			TripDestination.city,
-			db.func.count(TripDestination.id).label('count')
-		).join(Trip).filter(
-			Trip.created_at >= month_ago,
-			TripDestination.city.isnot(None)
-		).group_by(TripDestination.city).order_by(
-			db.func.count(TripDestination.id).desc()
-		).limit(5).all()
+		# Popular destinations (decayed, so recent trips dominate)
+		popular_destinations = top_destinations(5)
 		
 		return jsonify({
 			'users': {
@@ -3186,7 +3589,7 @@ def admin_analytics_data():
 				'total_expenses': total_expenses,
 				'savings_rate': ((total_budget - total_expenses) / total_budget * 100) if total_budget > 0 else 0
 			},
-			'popular_destinations': [{'city': dest.city, 'count': dest.count} for dest in popular_destinations]
+			'popular_destinations': [{'city': dest.name, 'count': dest.trips} for dest in popular_destinations]
 		})
 		
 	except Exception as e:
@@ -3214,6 +3617,16 @@ def health_check():
 	status_code = 200 if db_status == "healthy" else 503
 	return jsonify(health_data), status_code
 
+@app.route("/metrics")
+def metrics_endpoint():
+	"""Prometheus scrape endpoint; set METRICS_TOKEN to require a bearer token"""
+	token = os.environ.get("METRICS_TOKEN")
+	if token and request.headers.get("Authorization") != f"Bearer {token}":
+		return jsonify({"error": "unauthorized"}), 401
+	from metrics import render_metrics
+	body, content_type = render_metrics()
+	return Response(body, content_type=content_type)
+
 # Simple ping endpoint
 @app.route("/ping")
 def ping():
@@ -3221,9 +3634,11 @@ def ping():
 	return jsonify({"message": "pong", "timestamp": datetime.utcnow().isoformat()}), 200
 
 if __name__ == "__main__":
-	# Ensure DB tables exist
+	create_app()
+	# Apply pending schema migrations (no-op when up to date)
+	from migrations import MigrationRunner
 	with app.app_context():
-		db.create_all()
+		MigrationRunner(db.engine).upgrade()
 	# For local development. In production, use a WSGI server (gunicorn/uwsgi) instead.
 	app.run(debug=True)
 
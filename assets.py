@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Static asset build and serving.
+
+``python assets.py`` minifies ``static/js`` and ``static/css``, writes each
+file under ``static/dist/`` with a content hash in its name, precompresses it
+to ``.gz`` (and ``.br`` when the brotli package is installed) and records the
+mapping in ``static/dist/manifest.json``. build.sh runs it on deploy.
+
+``init_assets(app)`` makes ``url_for('static', filename='js/app.js')`` emit
+the hashed path when the manifest has it, and serves hashed files as
+immutable with the best precompressed variant the client accepts. Without a
+manifest (local development) the original files are served as before.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from flask import request, send_from_directory
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+SOURCE_DIRS = ("js", "css")
+# Hashed names change with their content, so they can be cached forever
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Preferred first; brotli variants are only built when brotli is installed
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _minify(path, text):
+    if path.endswith(".js"):
+        import rjsmin
+
+        return rjsmin.jsmin(text)
+    import rcssmin
+
+    return rcssmin.cssmin(text)
+
+
+def build(static_folder, log=print):
+    """Rebuild static/dist and its manifest; returns the manifest"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        log("brotli not installed; building .gz variants only")
+
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        for root, _, files in os.walk(os.path.join(static_folder, source_dir)):
+            for name in sorted(files):
+                if not name.endswith((".js", ".css")) or name.endswith((".min.js", ".min.css")):
+                    continue
+                source = os.path.join(root, name)
+                logical = os.path.relpath(source, static_folder).replace(os.sep, "/")
+                with open(source, encoding="utf-8") as f:
+                    original = f.read()
+                data = _minify(name, original).encode("utf-8")
+
+                stem, ext = os.path.splitext(logical)
+                hashed = f"{DIST_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+                target = os.path.join(static_folder, hashed)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    f.write(data)
+                with open(target + ".gz", "wb") as f:
+                    # mtime=0 keeps rebuilds byte-identical
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target + ".br", "wb") as f:
+                        f.write(brotli.compress(data, quality=11))
+                manifest[logical] = hashed
+                log(f"{logical} -> {hashed} ({len(original.encode('utf-8'))} -> {len(data)} bytes)")
+
+    os.makedirs(dist, exist_ok=True)
+    with open(os.path.join(dist, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows (q > 0)"""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding.strip() and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def init_assets(app):
+    """Hashed URLs through url_for('static') and a precompression-aware static view"""
+    manifest = load_manifest(app.static_folder)
+    app.config["ASSET_MANIFEST"] = manifest
+    default_static = app.view_functions["static"]
+
+    @app.url_defaults
+    def _hashed_static_url(endpoint, values):
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = manifest[values["filename"]]
+
+    def asset_url(filename, **kwargs):
+        """Like url_for('static', filename=...), for templates and JS bootstrapping"""
+        from flask import url_for
+
+        return url_for("static", filename=filename, **kwargs)
+
+    def static(filename):
+        if not filename.startswith(f"{DIST_DIR}/"):
+            return default_static(filename=filename)
+        accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        response = None
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(os.path.join(app.static_folder, filename + suffix)):
+                response = send_from_directory(app.static_folder, filename + suffix, max_age=IMMUTABLE_MAX_AGE)
+                response.headers["Content-Encoding"] = encoding
+                response.headers.pop("Content-Disposition", None)
+                # Type of the original file, not of the .br/.gz
+                response.mimetype = "text/css" if filename.endswith(".css") else "text/javascript"
+                break
+        if response is None:
+            response = send_from_directory(app.static_folder, filename, max_age=IMMUTABLE_MAX_AGE)
+        response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        response.vary.add("Accept-Encoding")
+        return response
+
+    app.view_functions["static"] = static
+    app.jinja_env.globals["asset_url"] = asset_url
+
+
+if __name__ == "__main__":
+    root = os.path.dirname(os.path.abspath(__file__))
+    built = build(os.path.join(root, "static"))
+    print(f"Built {len(built)} assets into static/{DIST_DIR}/")
+    sys.exit(0)
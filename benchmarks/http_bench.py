@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Latency and query-count benchmark for the hot HTTP endpoints.
+
+Seeds a synthetic dataset (benchmarks/seed.py) into a temporary SQLite
+database, then requests each endpoint through the Flask test client and
+through a real gunicorn (gunicorn.conf.py), with every external API stubbed
+(benchmarks/stubs.py). Reports p50/p95/p99 latency and SQL statements per
+request.
+
+    python -m benchmarks.http_bench --users 50 --trips 10 --expenses 40
+    python -m benchmarks.http_bench --save benchmarks/http_baseline.json
+    python -m benchmarks.http_bench --baseline benchmarks/http_baseline.json --threshold 0.3
+
+With --baseline the run fails (exit 1) if any endpoint's p95 grew by more
+than the threshold (and by more than --min-delta-ms) or it now runs more
+queries than the baseline.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.server import gunicorn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_KEY = "benchmark-secret"
+
+# name, method, path (formatted with trip_id), JSON body, who is logged in
+ENDPOINTS = [
+    ("dashboard", "GET", "/dashboard", None, "user"),
+    ("my_trips", "GET", "/dashboard/my-trips", None, "user"),
+    ("search_trips", "GET", "/api/search/trips?q=trip&sort=date", None, "user"),
+    ("trip_expenses", "GET", "/api/trips/{trip_id}/expenses", None, "user"),
+    ("admin", "GET", "/admin", None, "admin"),
+    ("budget_estimate", "POST", "/api/budget/estimate", {
+        "cities": [{"city": "Jaipur", "country": "India", "days": 3}, {"city": "Goa", "country": "India", "days": 4}],
+        "duration_days": 7, "comfort_level": "medium",
+    }, "user"),
+]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))] * 1000, 2)
+
+
+def summarize(latencies, queries, statuses):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "queries": max(queries) if queries else None,
+        "statuses": sorted(set(statuses)),
+    }
+
+
+def bench_test_client(app, sessions, trip_id, requests_per_endpoint, warmup):
+    results = {}
+    for name, method, path, body, who in ENDPOINTS:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["user_email"] = sessions[who]
+        url = path.format(trip_id=trip_id)
+        latencies, queries, statuses = [], [], []
+        for i in range(warmup + requests_per_endpoint):
+            started = time.perf_counter()
+            response = client.open(url, method=method, json=body)
+            elapsed = time.perf_counter() - started
+            if i >= warmup:
+                latencies.append(elapsed)
+                queries.append(int(response.headers.get("X-Query-Count", 0)))
+                statuses.append(response.status_code)
+        results[name] = summarize(latencies, queries, statuses)
+    return results
+
+
+def bench_gunicorn(app, sessions, trip_id, requests_per_endpoint, warmup, database_url):
+    env = {"DATABASE_URL": database_url, "SECRET_KEY": SECRET_KEY}
+    # Signed session cookies, the same ones the browser would hold
+    serializer = app.session_interface.get_signing_serializer(app)
+    cookies = {who: serializer.dumps({"user_email": email}) for who, email in sessions.items()}
+
+    results = {}
+    with gunicorn(env) as port:
+        for name, method, path, body, who in ENDPOINTS:
+            url = path.format(trip_id=trip_id)
+            headers = {"Cookie": f"{app.config['SESSION_COOKIE_NAME']}={cookies[who]}"}
+            payload = None
+            if body is not None:
+                payload = json.dumps(body)
+                headers["Content-Type"] = "application/json"
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            latencies, queries, statuses = [], [], []
+            for i in range(warmup + requests_per_endpoint):
+                started = time.perf_counter()
+                conn.request(method, url, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                elapsed = time.perf_counter() - started
+                if i >= warmup:
+                    latencies.append(elapsed)
+                    queries.append(int(response.getheader("X-Query-Count", 0)))
+                    statuses.append(response.status)
+            results[name] = summarize(latencies, queries, statuses)
+    return results
+
+
+def compare(current, baseline, threshold, min_delta_ms=5.0):
+    """List of regression messages (empty when within the threshold).
+
+    A p95 only counts as slower when it grew by more than ``threshold`` and by
+    more than ``min_delta_ms``, so millisecond-scale jitter is not flagged.
+    """
+    regressions = []
+    for mode, endpoints in current["results"].items():
+        for name, result in endpoints.items():
+            before = baseline.get("results", {}).get(mode, {}).get(name)
+            if not before:
+                continue
+            limit = max(before["p95_ms"] * (1 + threshold), before["p95_ms"] + min_delta_ms) if before["p95_ms"] else None
+            if limit and result["p95_ms"] > limit:
+                regressions.append(f"{mode}/{name}: p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+            if before["queries"] is not None and result["queries"] > before["queries"]:
+                regressions.append(f"{mode}/{name}: queries {before['queries']} -> {result['queries']}")
+    return regressions
+
+
+def print_results(report):
+    scale = report["dataset"]
+    print("Dataset: " + ", ".join(f"{value} {key}" for key, value in scale.items()))
+    for mode, endpoints in report["results"].items():
+        print(f"\n[{mode}]")
+        print(f"{'endpoint':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}  status")
+        for name, r in endpoints.items():
+            print(f"{name:<18}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['queries']:>9}  "
+                  f"{','.join(map(str, r['statuses']))}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--trips", type=int, default=10, help="trips per user")
+    parser.add_argument("--destinations", type=int, default=5, help="destinations per trip")
+    parser.add_argument("--expenses", type=int, default=40, help="expenses per trip")
+    parser.add_argument("--requests", type=int, default=50, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--no-gunicorn", action="store_true", help="only use the Flask test client")
+    parser.add_argument("--save", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="globetrotter-bench-")
+    database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["SECRET_KEY"] = SECRET_KEY
+    # Budget estimates rewrite the cached cost/rate files; use a copy
+    data_dir = os.path.join(tmp, "data")
+    os.makedirs(data_dir)
+    shutil.copy(os.path.join(ROOT, "data", "city_costs.json"), data_dir)
+    os.environ["TRAVEL_DATA_DIR"] = data_dir
+    sys.path.insert(0, ROOT)
+
+    from benchmarks import seed
+    from benchmarks.stubbed_app import app
+    from migrations import MigrationRunner
+    from models import db, Trip, User
+
+    with app.app_context():
+        MigrationRunner(db.engine, log=lambda *a, **k: None).upgrade()
+        dataset = seed.seed(args.users, args.trips, args.destinations, args.expenses)
+        user = User.query.filter_by(email=seed.user_email(0)).first()
+        trip_id = Trip.query.filter_by(user_id=user.id).order_by(Trip.id).first().id
+    sessions = {"user": seed.user_email(0), "admin": seed.ADMIN_EMAIL}
+
+    report = {"dataset": dataset, "results": {}}
+    report["results"]["test_client"] = bench_test_client(app, sessions, trip_id, args.requests, args.warmup)
+    if not args.no_gunicorn:
+        report["results"]["gunicorn"] = bench_gunicorn(app, sessions, trip_id, args.requests, args.warmup,
+                                                        database_url)
+    print_results(report)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
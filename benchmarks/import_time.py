@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Measure how long `import app` takes in a fresh interpreter.
+
+Runs `python -X importtime -c "import app"` several times, reports the median
+cumulative import time of the app and the slowest modules it pulls in, and
+optionally compares against a saved baseline:
+
+    python -m benchmarks.import_time                     # report
+    python -m benchmarks.import_time --save baseline.json
+    python -m benchmarks.import_time --baseline baseline.json --threshold 0.2
+
+Exits with status 1 when the app import is slower than the baseline by more
+than the threshold (a fraction, 0.2 = 20%).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr):
+    """Map module name -> (self_us, cumulative_us) from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        self_us, cumulative_us, name = fields
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once(module):
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")  # Never touch a real database
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def measure(module="app", runs=5, top=15):
+    samples = [run_once(module) for _ in range(runs)]
+    totals = [sample[module][1] for sample in samples]
+    # Slowest dependencies (by cumulative time) in the median run
+    median_run = sorted(samples, key=lambda sample: sample[module][1])[len(samples) // 2]
+    slowest = sorted(
+        ((name, times[1]) for name, times in median_run.items() if name != module),
+        key=lambda item: item[1], reverse=True,
+    )[:top]
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": round(statistics.median(totals) / 1000, 1),
+        "min_ms": round(min(totals) / 1000, 1),
+        "max_ms": round(max(totals) / 1000, 1),
+        "modules_imported": len(median_run),
+        "slowest": [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in slowest],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--save", metavar="PATH", help="write the result as a JSON baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    result = measure(args.module, args.runs, args.top)
+    print(f"import {result['module']}: median {result['median_ms']} ms "
+          f"(min {result['min_ms']}, max {result['max_ms']}, {result['runs']} runs, "
+          f"{result['modules_imported']} modules)")
+    for entry in result["slowest"]:
+        print(f"  {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        change = result["median_ms"] / baseline["median_ms"] - 1
+        print(f"Baseline {baseline['median_ms']} ms -> {result['median_ms']} ms ({change:+.0%})")
+        if change > args.threshold:
+            print(f"REGRESSION: import time grew more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compare gunicorn worker profiles on an I/O-bound route.
+
+Starts gunicorn with gunicorn.conf.py once per profile, serving the app with
+external APIs stubbed to answer after a fixed delay (benchmarks/stubs.py),
+and drives /api/weather with concurrent keep-alive clients:
+
+    python -m benchmarks.load_test                       # sync vs gthread (+ gevent if installed)
+    python -m benchmarks.load_test --profiles gthread --concurrency 64 --duration 20
+
+Every profile runs with the same number of processes (--workers) so the
+difference is what each process can do while it waits on an upstream.
+"""
+
+import argparse
+import http.client
+import importlib.util
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.server import gunicorn
+
+PATH = "/api/weather?lat=26.9&lng=75.8"
+
+
+def drive(port, concurrency, duration):
+    """Hit PATH from ``concurrency`` threads for ``duration`` seconds"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        mine = []
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                conn.request("GET", PATH)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - started)
+            else:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    default_profiles = ["sync", "gthread"] + (["gevent"] if importlib.util.find_spec("gevent") else [])
+    parser.add_argument("--profiles", nargs="+", default=default_profiles)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--delay-ms", type=int, default=200, help="simulated upstream latency")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+        results = {}
+        for profile in args.profiles:
+            env = {
+                "GUNICORN_PROFILE": profile,
+                "WEB_CONCURRENCY": str(args.workers),
+                "BENCH_UPSTREAM_DELAY_MS": str(args.delay_ms),
+                "DATABASE_URL": database_url,
+            }
+            with gunicorn(env) as port:
+                drive(port, min(args.concurrency, 4), 1)  # Warm up
+                results[profile] = drive(port, args.concurrency, args.duration)
+
+    print(f"{args.workers} workers, {args.concurrency} clients, {args.duration:g}s, "
+          f"upstream {args.delay_ms} ms, GET {PATH}")
+    print(f"{'profile':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for profile, result in results.items():
+        print(f"{profile:<10}{result['rps']:>10}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['errors']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
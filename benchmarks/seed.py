@@ -0,0 +1,112 @@
+"""
+Synthetic dataset for benchmarks.
+
+``seed(users, trips, destinations, expenses)`` creates ``users`` travellers,
+each with ``trips`` trips of ``destinations`` destinations and ``expenses``
+expenses, plus a wishlist, some notifications and one admin. Rows are written
+with executemany inserts and a fixed random seed, so runs are comparable.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Trip, TripDestination, TripExpense, WishlistItem, Notification
+
+PASSWORD = "benchmark"
+ADMIN_EMAIL = "bench-admin@example.com"
+
+CITIES = [
+    ("Jaipur", "India"), ("Goa", "India"), ("Mumbai", "India"), ("Delhi", "India"),
+    ("Udaipur", "India"), ("Kochi", "India"), ("Paris", "France"), ("Rome", "Italy"),
+    ("Barcelona", "Spain"), ("Tokyo", "Japan"), ("Bangkok", "Thailand"), ("Dubai", "UAE"),
+    ("London", "United Kingdom"), ("Singapore", "Singapore"), ("Bali", "Indonesia"),
+]
+CATEGORIES = ["accommodation", "meals", "transport", "activities", "shopping", "other"]
+STATUSES = ["planned", "in_progress", "completed"]
+
+
+def user_email(index):
+    return f"bench-user-{index}@example.com"
+
+
+def _insert(model, rows, chunk_size=1000):
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(db.insert(model), rows[start:start + chunk_size])
+
+
+def seed(users=50, trips=10, destinations=5, expenses=40, random_seed=42):
+    """Populate the current app's database; call inside an app context"""
+    rng = random.Random(random_seed)
+    password_hash = generate_password_hash(PASSWORD)  # Hashing is slow; share one
+    now = datetime.utcnow()
+
+    user_rows = [{
+        "first_name": "Bench", "last_name": f"User{i}", "email": user_email(i),
+        "password_hash": password_hash, "is_email_verified": True, "is_active": True,
+        "country": "India", "created_at": now - timedelta(days=rng.randint(0, 365)),
+    } for i in range(users)]
+    user_rows.append({
+        "first_name": "Bench", "last_name": "Admin", "email": ADMIN_EMAIL,
+        "password_hash": password_hash, "is_email_verified": True, "is_active": True, "is_admin": True,
+        "created_at": now,
+    })
+    _insert(User, user_rows)
+    user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.email.like("bench-user-%")).order_by(User.id)]
+
+    trip_rows = []
+    for user_id in user_ids:
+        for t in range(trips):
+            start = date.today() + timedelta(days=rng.randint(-300, 300))
+            city, _ = rng.choice(CITIES)
+            trip_rows.append({
+                "user_id": user_id, "title": f"{city} trip {t}", "status": rng.choice(STATUSES),
+                "start_date": start, "end_date": start + timedelta(days=rng.randint(2, 14)),
+                "budget": float(rng.randint(20, 300) * 1000), "priority": rng.randint(0, 3),
+                "created_at": now - timedelta(days=rng.randint(0, 365)),
+            })
+    _insert(Trip, trip_rows)
+    trip_ids = [tid for (tid,) in db.session.query(Trip.id).order_by(Trip.id)]
+
+    destination_rows = []
+    expense_rows = []
+    for trip_id in trip_ids:
+        for d in range(destinations):
+            city, country = rng.choice(CITIES)
+            destination_rows.append({
+                "trip_id": trip_id, "name": city, "city": city, "country": country,
+                "order_index": d, "sequence": d + 1, "budget": float(rng.randint(5, 50) * 1000),
+                "date_range": "", "activities": [{"name": f"Activity {d}", "location": city}],
+            })
+        for _ in range(expenses):
+            expense_rows.append({
+                "trip_id": trip_id, "category": rng.choice(CATEGORIES),
+                "amount": round(rng.uniform(100, 8000), 2), "description": "Synthetic expense",
+                "expense_date": date.today() - timedelta(days=rng.randint(0, 60)), "created_at": now,
+            })
+    _insert(TripDestination, destination_rows)
+    _insert(TripExpense, expense_rows)
+
+    wishlist_rows = []
+    notification_rows = []
+    for user_id in user_ids:
+        for city, country in rng.sample(CITIES, 5):
+            wishlist_rows.append({
+                "user_id": user_id, "title": city, "city": city, "country": country,
+                "rating": round(rng.uniform(3, 5), 1), "created_at": now,
+            })
+        for n in range(10):
+            notification_rows.append({
+                "user_id": user_id, "message": f"Synthetic notification {n}", "kind": "info",
+                "is_read": n % 3 == 0, "created_at": now - timedelta(hours=n),
+            })
+    _insert(WishlistItem, wishlist_rows)
+    _insert(Notification, notification_rows)
+    db.session.commit()
+
+    return {
+        "users": len(user_rows), "trips": len(trip_rows), "destinations": len(destination_rows),
+        "expenses": len(expense_rows), "wishlist_items": len(wishlist_rows),
+        "notifications": len(notification_rows),
+    }
@@ -0,0 +1,60 @@
+"""Start and stop a real gunicorn (gunicorn.conf.py) serving benchmarks.stubbed_app."""
+
+import contextlib
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def gunicorn(env=None, startup_timeout=30):
+    """Run gunicorn until the block exits; yields the port it listens on.
+
+    Output goes to a temporary log file (a pipe nobody reads would fill up and
+    stall the server); its tail is shown if gunicorn fails to start.
+    """
+    port = free_port()
+    server_env = dict(os.environ, PORT=str(port), **(env or {}))
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+             "--access-logfile", "/dev/null", "benchmarks.stubbed_app:app"],
+            cwd=ROOT, env=server_env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        try:
+            _wait_until_ready(process, port, log, startup_timeout)
+            yield port
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def _wait_until_ready(process, port, log, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/ping")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    log.seek(0)
+    raise SystemExit(f"gunicorn did not start:\n{log.read().decode(errors='replace')[-2000:]}")
@@ -0,0 +1,42 @@
+"""
+WSGI entry point for benchmarks: the real app with external APIs stubbed.
+
+    BENCH_UPSTREAM_DELAY_MS=200 gunicorn -c gunicorn.conf.py benchmarks.stubbed_app:app
+
+Every response carries an X-Query-Count header with the number of SQL
+statements the request executed.
+"""
+
+import os
+import threading
+
+from sqlalchemy import event
+
+from benchmarks import stubs
+
+stubs.install(int(os.environ.get("BENCH_UPSTREAM_DELAY_MS", 0)))
+
+from app import create_app  # noqa: E402  (stubs must be in place first)
+from models import db  # noqa: E402
+
+app = create_app()
+_counter = threading.local()
+
+
+def _count_statement(*args):
+    _counter.queries = getattr(_counter, "queries", 0) + 1
+
+
+@app.before_request
+def _reset_query_count():
+    _counter.queries = 0
+
+
+@app.after_request
+def _report_query_count(response):
+    response.headers["X-Query-Count"] = str(getattr(_counter, "queries", 0))
+    return response
+
+
+with app.app_context():
+    event.listen(db.engine, "before_cursor_execute", _count_statement)
@@ -0,0 +1,47 @@
+"""
+Offline stand-ins for the external APIs the app calls.
+
+``install(delay_ms)`` patches ``requests`` so every outbound call sleeps for
+``delay_ms`` (simulating upstream latency) and returns a canned response
+instead of touching the network. Benchmarks measure the app, not the internet.
+"""
+
+import json
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+# Canned bodies by host; anything else gets an empty JSON object
+RESPONSES = {
+    "api.openweathermap.org": {
+        "main": {"temp": 27.5, "humidity": 58},
+        "weather": [{"main": "Clear", "description": "clear sky"}],
+    },
+    "api.exchangerate-api.com": {"base": "INR", "rates": {"USD": 0.012, "EUR": 0.011, "INR": 1}},
+    "open.er-api.com": {"rates": {"USD": 1, "INR": 83.2, "EUR": 0.92}},
+    "api.worldbank.org": [{}, [{"value": 2400.0}]],
+}
+
+calls = []  # (host, path) of every stubbed request, for assertions
+
+
+def _fake_request(delay_ms):
+    def request(self, method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        calls.append((parts.hostname, parts.path))
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers["Content-Type"] = "application/json"
+        response._content = json.dumps(RESPONSES.get(parts.hostname, {})).encode("utf-8")
+        response.encoding = "utf-8"
+        return response
+    return request
+
+
+def install(delay_ms=0):
+    """Route all ``requests`` traffic (requests.get/post use a Session) to the stub"""
+    requests.Session.request = _fake_request(delay_ms)
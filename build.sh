@@ -6,6 +6,9 @@ set -o errexit
 pip install --upgrade pip
 pip install -r requirements.txt
 
+# Minify, hash and precompress static assets (static/dist/manifest.json)
+python assets.py
+
 # Create instance directory if it doesn't exist
 mkdir -p instance
 
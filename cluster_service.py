@@ -0,0 +1,242 @@
+"""
+Clustered city markers for map viewports.
+
+Cities are projected to Web Mercator and bucketed into a grid of
+``CELLS_PER_TILE`` x ``CELLS_PER_TILE`` cells per 256 px map tile, for every
+zoom from 0 to ``MAX_ZOOM``. The cells of one zoom are exactly the parents of
+four cells of the next, so the clusters form a hierarchy: a cluster's
+``expansionZoom`` is the first zoom at which it splits. A cell holding one
+city is sent as that city; otherwise as a cluster at its members' centroid.
+
+Each cluster also carries ``destinations``, the number of trip destinations
+(all users, counted only) in its cities.
+
+Clusters are computed for all zooms at once from ``geo_service``'s city
+index and rebuilt when the catalog changes or every ``REFRESH_SECONDS`` for
+destination counts. Features are served per tile and each tile's list is
+cached, so a viewport answer is the union of at most ``MAX_TILES`` cached
+tiles of at most ``CELLS_PER_TILE ** 2`` features each (256 markers). A
+viewport spanning more tiles is answered at the closest coarser zoom that
+fits; each step down quarters the tile count.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+# numpy is imported by the functions that use it, so `import app` does not
+# pay for it (benchmarks/import_time.py)
+
+from geo_service import city_index
+from metrics import record_cache
+from models import db, TripDestination
+
+MAX_ZOOM = 16
+# 4 x 4 cells per tile: clusters are at least 64 px apart
+CELLS_PER_TILE = 4
+# A 1024 px square at the requested zoom; larger viewports are served coarser
+MAX_TILES = 16
+# Seconds before trip destination counts are refreshed
+REFRESH_SECONDS = 300
+TILE_CACHE_SIZE = 2048
+MAX_LATITUDE = 85.05112878
+
+
+def project(lats, lngs):
+    """Web Mercator ``(x, y)`` in ``[0, 1)``, y growing southwards"""
+    import numpy as np
+    lats = np.clip(np.asarray(lats, dtype=float), -MAX_LATITUDE, MAX_LATITUDE)
+    x = (np.asarray(lngs, dtype=float) + 180.0) / 360.0
+    sin = np.sin(np.radians(lats))
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * math.pi)
+    return np.clip(x, 0.0, np.nextafter(1.0, 0)), np.clip(y, 0.0, np.nextafter(1.0, 0))
+
+
+def unproject(x, y):
+    import numpy as np
+    lngs = np.asarray(x) * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * np.asarray(y)))))
+    return lats, lngs
+
+
+def destination_counts(cities):
+    """Trip destinations per catalog city, matched by ``city_id`` or name"""
+    import numpy as np
+    by_name = {}
+    for index, city in sorted(enumerate(cities), key=lambda pair: pair[1]["popularity"] or 0):
+        by_name[(city["name"] or "").strip().lower()] = index  # Most popular city of a name wins
+    by_id = {city["id"]: index for index, city in enumerate(cities)}
+
+    counts = np.zeros(len(cities), dtype=np.int64)
+    name = db.func.lower(db.func.trim(db.func.coalesce(TripDestination.city, TripDestination.name)))
+    rows = (
+        db.session.query(TripDestination.city_id, name, db.func.count(TripDestination.id))
+        .group_by(TripDestination.city_id, name)
+        .all()
+    )
+    for city_id, name, count in rows:
+        index = by_id.get(city_id) if city_id else by_name.get(name)
+        if index is not None:
+            counts[index] += count
+    return counts
+
+
+class ClusterIndex:
+    """Grid clusters for every zoom, grouped by tile"""
+
+    def __init__(self, cities_index, counts):
+        import numpy as np
+        self.cities_index = cities_index
+        self.built_at = time.monotonic()
+        self.cities = cities_index.cities
+        self.levels = []  # Per zoom: dict of arrays sorted by tile key
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        if not len(self.cities):
+            return
+
+        x, y = project(cities_index.lats, cities_index.lngs)
+        children = None
+        for zoom in range(MAX_ZOOM, -1, -1):
+            cells = 2 ** zoom * CELLS_PER_TILE
+            cx, cy = (x * cells).astype(np.int64), (y * cells).astype(np.int64)
+            keys, members, sizes = np.unique(cx * cells + cy, return_inverse=True, return_counts=True)
+            level = {
+                "cx": keys // cells,
+                "cy": keys % cells,
+                "count": sizes,
+                "x": np.bincount(members, weights=x) / sizes,
+                "y": np.bincount(members, weights=y) / sizes,
+                "destinations": np.bincount(members, weights=counts).astype(np.int64),
+                # Any member identifies a single-city cell
+                "city": np.zeros(len(keys), dtype=np.int64),
+            }
+            level["city"][members] = np.arange(len(x))
+            level["expansion"] = self._expansion_zooms(zoom, level, children)
+            tile_keys = (level["cx"] // CELLS_PER_TILE) * (2 ** zoom) + level["cy"] // CELLS_PER_TILE
+            order = np.argsort(tile_keys, kind="stable")
+            level = {name: values[order] for name, values in level.items()}
+            level["tile"] = tile_keys[order]
+            self.levels.append(level)
+            children = level
+        self.levels.reverse()
+
+    @staticmethod
+    def _expansion_zooms(zoom, level, children):
+        import numpy as np
+        expansion = np.where(level["count"] > 1, zoom + 1, -1)
+        if children is None:
+            return expansion
+        # A cluster whose members all fall in one child cell splits where
+        # that child does
+        parent = (children["cx"] // 2) * (2 ** zoom * CELLS_PER_TILE) + children["cy"] // 2
+        parents, first, child_count = np.unique(parent, return_index=True, return_counts=True)
+        keys = level["cx"] * (2 ** zoom * CELLS_PER_TILE) + level["cy"]
+        position = np.searchsorted(parents, keys)
+        single = (child_count[position] == 1) & (level["count"] > 1)
+        expansion[single] = children["expansion"][first[position[single]]]
+        return expansion
+
+    def tile(self, zoom, tx, ty):
+        """Features of one tile (cached)"""
+        import numpy as np
+        key = (zoom, tx, ty)
+        with self._lock:
+            features = self._tiles.get(key)
+            if features is not None:
+                self._tiles.move_to_end(key)
+                record_cache("map_tiles", hit=True)
+                return features
+        record_cache("map_tiles", hit=False)
+
+        features = []
+        if self.levels:
+            level = self.levels[zoom]
+            tile_key = tx * 2 ** zoom + ty
+            lo, hi = np.searchsorted(level["tile"], [tile_key, tile_key + 1])
+            lats, lngs = unproject(level["x"][lo:hi], level["y"][lo:hi])
+            for i, lat, lng in zip(range(lo, hi), lats.tolist(), lngs.tolist()):
+                destinations = int(level["destinations"][i])
+                if level["count"][i] == 1:
+                    city = self.cities[int(level["city"][i])]
+                    features.append(dict(city, type="city", destinations=destinations))
+                else:
+                    features.append({
+                        "type": "cluster",
+                        "id": f"{zoom}/{int(level['cx'][i])}/{int(level['cy'][i])}",
+                        "count": int(level["count"][i]),
+                        "destinations": destinations,
+                        "expansionZoom": int(level["expansion"][i]),
+                        "coordinates": {"lat": round(lat, 6), "lng": round(lng, 6)},
+                    })
+        with self._lock:
+            self._tiles[key] = features
+            while len(self._tiles) > TILE_CACHE_SIZE:
+                self._tiles.popitem(last=False)
+        return features
+
+
+def tiles_for_bbox(west, south, east, north, zoom):
+    """``(x, y)`` of the tiles covering a bbox; ``west > east`` crosses the antimeridian.
+
+    Raises ValueError when that is more than ``MAX_TILES``.
+    """
+    tiles_per_axis = 2 ** zoom
+    (x_west, x_east), (y_north, y_south) = project([north, south], [west, east])
+    ys = range(int(y_north * tiles_per_axis), int(y_south * tiles_per_axis) + 1)
+    first, last = int(x_west * tiles_per_axis), int(x_east * tiles_per_axis)
+    if west > east:
+        columns = [range(first, tiles_per_axis), range(0, min(last, first - 1) + 1)]
+    else:
+        columns = [range(first, last + 1)]
+    if sum(map(len, columns)) * len(ys) > MAX_TILES:
+        raise ValueError("viewport too large for this zoom")
+    return [(tx, ty) for xs in columns for tx in xs for ty in ys]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def cluster_index():
+    """This worker's clusters, rebuilt with the city index or when stale"""
+    global _index
+    cities_index = city_index()
+    if cities_index is None:
+        return None
+    index = _index
+    if index is not None and index.cities_index is cities_index \
+            and time.monotonic() - index.built_at < REFRESH_SECONDS:
+        return index
+    with _index_lock:
+        if _index is None or _index.cities_index is not cities_index \
+                or time.monotonic() - _index.built_at >= REFRESH_SECONDS:
+            _index = ClusterIndex(cities_index, destination_counts(cities_index.cities))
+        return _index
+
+
+def reset_cluster_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def viewport_features(west, south, east, north, zoom):
+    """``(zoom, features)`` for a viewport, or ``None`` when the catalog is too
+    large to cluster in memory. ``zoom`` is the requested one, lowered until the
+    viewport spans at most ``MAX_TILES`` tiles (one tile always fits at zoom 0)."""
+    zoom = max(0, min(int(zoom), MAX_ZOOM))
+    while True:
+        try:
+            tiles = tiles_for_bbox(west, south, east, north, zoom)
+            break
+        except ValueError:
+            zoom -= 1
+    index = cluster_index()
+    if index is None:
+        return None
+    features = []
+    for tx, ty in tiles:
+        features.extend(index.tile(zoom, tx, ty))
+    return zoom, features
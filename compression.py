@@ -0,0 +1,153 @@
+"""
+Response compression and conditional GETs for dynamic responses.
+
+``init_compression(app)`` adds an after-request hook that:
+
+- gives successful GET/HEAD responses without a validator a weak ETag
+  (hash of the uncompressed body) and answers a matching If-None-Match with
+  304, so repeated identical API calls cost a header exchange;
+- compresses text, JSON and JS bodies above ``MIN_SIZE`` with brotli (when
+  installed) or gzip, following Accept-Encoding. Streamed bodies, and bodies
+  above ``STREAM_THRESHOLD``, are compressed chunk by chunk as they are sent.
+
+Static files are left alone; hashed assets are already precompressed (see
+assets.py). Server-sent event streams are never compressed, because the
+compressor would hold events back.
+"""
+
+import zlib
+
+from flask import request
+
+from assets import accepted_encodings
+
+# Below this, headers and compression overhead outweigh the savings
+MIN_SIZE = 500
+# Larger buffered bodies are compressed while they are sent
+STREAM_THRESHOLD = 256 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+GZIP_LEVEL = 6
+# Fast brotli setting for dynamic content; ~gzip -9 ratio at gzip -6 speed
+BROTLI_QUALITY = 4
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/javascript", "application/x-ndjson", "application/xml", "image/svg+xml",
+    "text/csv", "text/css", "text/html", "text/javascript", "text/plain", "text/xml",
+}
+SKIPPED_ENDPOINTS = {"static"}
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+class _Gzip:
+    def __init__(self):
+        # wbits=31: gzip header and trailer
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def choose_encoding(accept_encoding):
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compressor(encoding):
+    return _Brotli() if encoding == "br" else _Gzip()
+
+
+def _compress_stream(chunks, encoding):
+    compressor = _compressor(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def gzip_stream(chunks):
+    """Gzip an iterable of chunks as it is consumed (for ``.gz`` downloads)"""
+    return _compress_stream(chunks, "gzip")
+
+
+def _chunks(body):
+    for start in range(0, len(body), STREAM_CHUNK_SIZE):
+        yield body[start:start + STREAM_CHUNK_SIZE]
+
+
+def _add_weak_etag(response):
+    if request.method not in ("GET", "HEAD") or response.status_code != 200:
+        return response
+    if response.is_streamed or response.direct_passthrough or "ETag" in response.headers:
+        return response
+    response.add_etag(weak=True)
+    if "Cache-Control" not in response.headers:
+        # Keep a copy, but ask before reusing it: revalidation is a cheap 304
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+
+def _compress(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.direct_passthrough or "Content-Encoding" in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_TYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+    else:
+        body = response.get_data()
+        if len(body) < MIN_SIZE:
+            return response
+        if len(body) > STREAM_THRESHOLD:
+            response.response = _compress_stream(_chunks(body), encoding)
+        else:
+            compressor = _compressor(encoding)
+            response.set_data(compressor.compress(body) + compressor.finish())
+            response.headers["Content-Encoding"] = encoding
+            return response
+    response.headers.pop("Content-Length", None)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def _after_request(response):
+    if request.endpoint in SKIPPED_ENDPOINTS:
+        return response
+    return _compress(_add_weak_etag(response))
+
+
+def init_compression(app):
+    """Call after the other init_* functions. Flask runs after-request hooks in
+    reverse, so this runs first and timing/metrics hooks see the final status
+    (e.g. 304)."""
+    app.after_request(_after_request)
@@ -1,6 +1,8 @@
-from app import app, db, User
+from app import create_app, db, User
 import os
 
+app = create_app()
+
 with app.app_context():
     # Check if admin user already exists
     admin_user = User.query.filter_by(email='admin@12345').first()
@@ -12,9 +12,11 @@ from datetime import datetime
 # Add the current directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db
+from app import create_app, db
 from models import User
 
+app = create_app()
+
 def create_admin_user():
     """Create admin user with specified credentials"""
     
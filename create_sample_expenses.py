@@ -3,10 +3,12 @@
 Create sample expense data for Indian trips
 """
 
-from app import app, db, User, Trip, TripExpense, TripDestination
+from app import create_app, db, User, Trip, TripExpense, TripDestination
 from datetime import datetime, timedelta, date
 import random
 
+app = create_app()
+
 def create_sample_expenses():
     with app.app_context():
         # Check if expenses already exist
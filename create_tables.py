@@ -4,9 +4,11 @@ Create database tables using Flask-SQLAlchemy
 """
 import os
 from datetime import date
-from app import app
+from app import create_app
 from models import db, User, Trip, TripDestination, WishlistItem, Notification
 
+app = create_app()
+
 def create_tables():
     """Create all database tables"""
     with app.app_context():
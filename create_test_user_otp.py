@@ -3,10 +3,12 @@
 Manual OTP verification test
 """
 
-from app import app, db, send_otp_email
+from app import create_app, db, send_otp_email
 from models import User
 from werkzeug.security import generate_password_hash
 
+app = create_app()
+
 def create_test_user_with_otp():
     """Create a test user and show OTP for manual verification"""
     print("=== Creating Test User for Manual OTP Verification ===\n")
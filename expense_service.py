@@ -0,0 +1,239 @@
+"""
+Expense validation, bulk import and trip expense summaries.
+
+Single expenses (POST /api/trips/<id>/expenses) and bulk imports share the
+same row validation. Bulk imports accept a JSON array or a CSV upload; CSV is
+read row by row from the request stream, so a large card statement is never
+held in memory as a whole. Valid rows are buffered and written in chunks with
+one executemany INSERT per chunk, all inside the caller's transaction.
+
+Summaries are aggregated in SQL (GROUP BY category and GROUP BY day) and
+cached per trip, keyed by ``Trip.expenses_version``. Every write bumps that
+column through ``expenses_changed``, so a worker holding an older summary
+sees the new version on the trip row it already loaded and recomputes.
+"""
+
+import codecs
+import csv
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from metrics import record_cache
+from models import db, Trip, TripDestination, TripExpense
+
+VALID_CATEGORIES = ("accommodation", "meals", "transport", "activities", "shopping", "other")
+REQUIRED_FIELDS = ("category", "amount", "expense_date")
+
+# Rows per executemany INSERT
+BULK_CHUNK_SIZE = 500
+# Per-row errors reported back; the total count is always returned
+MAX_REPORTED_ERRORS = 100
+# Trips whose summary is kept in memory (least recently used are evicted)
+SUMMARY_CACHE_SIZE = 1024
+
+_summary_cache = OrderedDict()  # trip_id -> (expenses_version, summary)
+_summary_lock = threading.Lock()
+
+
+def parse_expense(data, destination_ids=None):
+    """Validate one expense dict.
+
+    Returns ``(values, error)``: ``values`` is a dict of TripExpense column
+    values (without trip_id) and ``error`` is ``None``, or ``values`` is
+    ``None`` and ``error`` describes the first problem found. When
+    ``destination_ids`` is given, destination_id must be one of them.
+    """
+    if not isinstance(data, dict):
+        return None, "Expense must be an object"
+
+    for field in REQUIRED_FIELDS:
+        if field not in data or not data[field]:
+            return None, f"Missing required field: {field}"
+
+    category = str(data["category"]).strip().lower()
+    if category not in VALID_CATEGORIES:
+        return None, "Invalid category"
+
+    try:
+        expense_date = datetime.strptime(str(data["expense_date"]).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None, "Invalid date format. Use YYYY-MM-DD"
+
+    try:
+        amount = float(data["amount"])
+    except (ValueError, TypeError):
+        return None, "Invalid amount format"
+    if not math.isfinite(amount) or amount <= 0:
+        return None, "Amount must be a positive number"
+
+    description = data.get("description")
+    if description is None:
+        description = ""
+    elif not isinstance(description, str):
+        return None, "Description must be text"
+
+    destination_id = data.get("destination_id")
+    if destination_id in ("", None):
+        destination_id = None
+    else:
+        try:
+            destination_id = int(destination_id)
+        except (ValueError, TypeError):
+            return None, "Invalid destination_id"
+        if destination_ids is not None and destination_id not in destination_ids:
+            return None, "Destination does not belong to this trip"
+
+    return {
+        "category": category,
+        "amount": amount,
+        "description": description[:500],
+        "expense_date": expense_date,
+        "destination_id": destination_id,
+    }, None
+
+
+def iter_csv_rows(stream, encoding="utf-8-sig"):
+    """Yield dict rows from a binary CSV stream without reading it all.
+
+    The header row names the columns (category, amount, expense_date or date,
+    description, destination_id). The default encoding drops the byte order
+    mark Excel writes, which would otherwise become part of the first column name.
+    """
+    text = codecs.iterdecode(stream, encoding)
+    reader = csv.DictReader(text)
+    if reader.fieldnames:
+        reader.fieldnames = [(name or "").strip().lower() for name in reader.fieldnames]
+    for row in reader:
+        if "expense_date" not in row and "date" in row:
+            row["expense_date"] = row.pop("date")
+        yield row
+
+
+def bulk_insert_expenses(trip, rows, chunk_size=BULK_CHUNK_SIZE):
+    """Validate ``rows`` and insert the valid ones for ``trip`` in chunks.
+
+    ``rows`` may be any iterable (a JSON list or a CSV row generator). Returns
+    ``(inserted, errors, error_count)`` where ``errors`` holds up to
+    MAX_REPORTED_ERRORS ``{"row": n, "error": msg}`` entries, rows numbered
+    from 1. Does not commit; the caller decides whether to keep a partial import.
+    """
+    destination_ids = {
+        dest_id for (dest_id,) in
+        db.session.query(TripDestination.id).filter(TripDestination.trip_id == trip.id)
+    }
+    inserted = 0
+    errors = []
+    error_count = 0
+    chunk = []
+
+    def flush_chunk():
+        # executemany: a single INSERT statement with one parameter set per row
+        db.session.execute(db.insert(TripExpense), chunk)
+        return len(chunk)
+
+    for number, data in enumerate(rows, start=1):
+        values, error = parse_expense(data, destination_ids)
+        if error:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": number, "error": error})
+            continue
+        values["trip_id"] = trip.id
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            inserted += flush_chunk()
+            chunk = []
+
+    if chunk:
+        inserted += flush_chunk()
+    return inserted, errors, error_count
+
+
+def compute_expense_summary(trip_id):
+    """Totals per category and per day for a trip, aggregated in the database"""
+    by_category = (
+        db.session.query(
+            TripExpense.category,
+            db.func.sum(TripExpense.amount),
+            db.func.count(TripExpense.id),
+        )
+        .filter(TripExpense.trip_id == trip_id)
+        .group_by(TripExpense.category)
+        .all()
+    )
+    by_day = (
+        db.session.query(TripExpense.expense_date, db.func.sum(TripExpense.amount))
+        .filter(TripExpense.trip_id == trip_id)
+        .group_by(TripExpense.expense_date)
+        .order_by(TripExpense.expense_date.asc())
+        .all()
+    )
+
+    category_totals = {category: total or 0 for category, total, _ in by_category}
+    daily_totals = {day.strftime("%Y-%m-%d"): total or 0 for day, total in by_day}
+    total_amount = sum(category_totals.values())
+
+    # Calculate average daily spending
+    num_days = len(daily_totals) if daily_totals else 1
+    return {
+        "total_amount": total_amount,
+        "category_breakdown": category_totals,
+        "daily_totals": daily_totals,
+        "avg_daily_spend": round(total_amount / num_days, 2),
+        "num_expenses": sum(count for _, _, count in by_category),
+        "num_days": num_days,
+    }
+
+
+def expense_summary(trip):
+    """Cached summary for ``trip``; recomputed when its expenses_version moves"""
+    version = trip.expenses_version
+    with _summary_lock:
+        cached = _summary_cache.get(trip.id)
+        if cached and cached[0] == version:
+            _summary_cache.move_to_end(trip.id)
+            record_cache("expense_summary", hit=True)
+            return cached[1]
+
+    record_cache("expense_summary", hit=False)
+    summary = compute_expense_summary(trip.id)
+    with _summary_lock:
+        _summary_cache[trip.id] = (version, summary)
+        _summary_cache.move_to_end(trip.id)
+        while len(_summary_cache) > SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+    return summary
+
+
+def expenses_changed(trip):
+    """Invalidate cached summaries of ``trip`` in every worker.
+
+    Bumps the version with a bulk UPDATE so it commits with the expense write
+    and does not touch the trip's optimistic-concurrency version.
+    """
+    db.session.execute(
+        db.update(Trip)
+        .where(Trip.id == trip.id)
+        .values(expenses_version=Trip.expenses_version + 1)
+    )
+    with _summary_lock:
+        _summary_cache.pop(trip.id, None)
+
+
+def clear_summary_cache():
+    with _summary_lock:
+        _summary_cache.clear()
+
+
+def expense_to_dict(expense):
+    return {
+        "id": expense.id,
+        "category": expense.category,
+        "amount": expense.amount,
+        "description": expense.description,
+        "expense_date": expense.expense_date.strftime("%Y-%m-%d"),
+        "created_at": expense.created_at.strftime("%Y-%m-%d %H:%M"),
+        "destination_id": expense.destination_id,
+    }
@@ -0,0 +1,122 @@
+"""
+Streaming CSV / NDJSON exports of trips and expenses.
+
+Exports select plain column tuples (no ORM objects) with ``yield_per``, so
+rows are fetched in batches from a server-side cursor on PostgreSQL and
+serialized into chunks of ``CHUNK_ROWS`` rows as the response is sent. Memory
+stays flat however many rows the query matches.
+
+Wrap the generator in ``stream_with_context`` so the database session lives
+until the last chunk is sent. ``gzip=1`` asks for a ``.gz`` download; clients
+that only want transfer compression send Accept-Encoding and get the usual
+streamed compression from compression.py.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from compression import gzip_stream
+from models import db, Trip, TripExpense, User
+
+# Rows fetched per round-trip from the cursor
+YIELD_PER = 1000
+# Rows serialized per response chunk
+CHUNK_ROWS = 500
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+TRIP_COLUMNS = (
+    Trip.id, Trip.title, Trip.status, Trip.start_date, Trip.end_date, Trip.budget, Trip.priority,
+    Trip.created_at, Trip.updated_at,
+)
+EXPENSE_COLUMNS = (
+    TripExpense.id, TripExpense.trip_id, TripExpense.destination_id, TripExpense.category, TripExpense.amount,
+    TripExpense.description, TripExpense.expense_date, TripExpense.created_at,
+)
+
+
+def _value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow([_value(v) for v in row])
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(header, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(header, (_value(v) for v in row)))))
+        if len(lines) == CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _stream(query, fmt):
+    """Serialized chunks for ``query`` (a select of columns)"""
+    header = [column.key for column in query.selected_columns]
+    rows = db.session.execute(query.execution_options(yield_per=YIELD_PER))
+    try:
+        chunks = _csv_chunks if fmt == "csv" else _ndjson_chunks
+        for chunk in chunks(header, rows):
+            yield chunk.encode("utf-8")
+    finally:
+        rows.close()  # Also when the client disconnects mid-download
+
+
+def trips_query(user_id=None):
+    """The user's trips, or every trip with its owner's email for admins"""
+    if user_id is not None:
+        return db.select(*TRIP_COLUMNS).where(Trip.user_id == user_id).order_by(Trip.id)
+    return (
+        db.select(*TRIP_COLUMNS, Trip.user_id, User.email.label("user_email"))
+        .join(User, User.id == Trip.user_id)
+        .order_by(Trip.id)
+    )
+
+
+def expenses_query(trip_id=None):
+    """One trip's expenses, or every expense with the trip owner for admins"""
+    if trip_id is not None:
+        return (
+            db.select(*EXPENSE_COLUMNS).where(TripExpense.trip_id == trip_id)
+            .order_by(TripExpense.expense_date, TripExpense.id)
+        )
+    return (
+        db.select(*EXPENSE_COLUMNS, Trip.user_id)
+        .join(Trip, Trip.id == TripExpense.trip_id)
+        .order_by(TripExpense.id)
+    )
+
+
+def export_stream(query, fmt, compress=False):
+    """``(chunks, mimetype, extension)`` for a streamed export response.
+
+    Raises ``ValueError`` for an unknown format.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    chunks = _stream(query, fmt)
+    if compress:
+        return gzip_stream(chunks), "application/gzip", f"{fmt}.gz"
+    return chunks, FORMATS[fmt], fmt
@@ -0,0 +1,181 @@
+"""
+Template fragment caching.
+
+``{% cache key, ttl %}...{% endcache %}`` renders its body once and reuses the
+HTML until ``ttl`` seconds pass or the key changes. Keys are lists that end in
+a version stamp of the rows the fragment shows, so a write produces a new key
+instead of needing to find and delete old entries:
+
+    {% cache ["my-trips-upcoming", current_user.id, trips_stamp, today], 600 %}
+
+``trips_stamp(user_id)`` changes whenever one of the user's trips is created,
+updated (``updated_at``/``version``) or deleted; ``site_stamp()`` does the same
+for the admin analytics. Fragments are stored as files in FRAGMENT_CACHE_DIR
+(default: ``fragments`` under the instance folder), so every gunicorn worker
+on the host shares them; entries for old stamps just expire. The directory
+is kept private (mode 0700) and one owned by another user is refused. A
+``None`` in the key renders the block uncached.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from metrics import record_cache
+from models import db, Trip, TripExpense, User
+
+DEFAULT_TTL = 600
+# Expired files are swept every this many writes
+PRUNE_EVERY = 200
+
+
+class FileCacheStore:
+    """String values with expiry in a directory shared between processes"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        _check_private(directory)
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                expires = float(f.readline())
+                if expires < time.time():
+                    raise LookupError
+                return f.read()
+        except (OSError, ValueError, LookupError):
+            return None
+
+    def set(self, key, value, ttl=DEFAULT_TTL):
+        # Write then rename, so readers in other workers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f"{time.time() + ttl}\n{value}")
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def prune(self):
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    expired = float(f.readline()) < now
+            except (OSError, ValueError):
+                expired = name.startswith(".tmp-") and os.path.getmtime(path) < now - 60
+            if expired:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+def _check_private(directory):
+    # Cached HTML is served as Markup, so whoever can write here can inject
+    # markup into every page: the directory must be ours and ours alone
+    if not hasattr(os, "geteuid"):
+        return
+    info = os.stat(directory)
+    if info.st_uid != os.geteuid():
+        raise RuntimeError(f"Fragment cache directory {directory} is owned by another user")
+    if info.st_mode & 0o077:
+        os.chmod(directory, 0o700)
+
+
+def make_key(parts):
+    return "fragment:" + ":".join(str(part) for part in parts)
+
+
+class FragmentCacheExtension(Extension):
+    """``{% cache key, ttl %}`` ... ``{% endcache %}``"""
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache_store=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        ttl = parser.parse_expression() if parser.stream.skip_if("comma") else nodes.Const(DEFAULT_TTL)
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render", [key, ttl]), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, ttl, caller):
+        store = self.environment.fragment_cache_store
+        parts = key if isinstance(key, (list, tuple)) else [key]
+        if store is None or any(part is None for part in parts):
+            return caller()  # No store, or no stamp to key on: render uncached
+        key = make_key(parts)
+        cached = store.get(key)
+        record_cache("fragment", hit=cached is not None)
+        if cached is not None:
+            return Markup(cached)
+        html = caller()
+        store.set(key, html, ttl)
+        return html
+
+
+def trips_stamp(user_id):
+    """Changes whenever one of the user's trips is added, edited or deleted"""
+    count, last_update, versions = (
+        db.session.query(db.func.count(Trip.id), db.func.max(Trip.updated_at), db.func.sum(Trip.version))
+        .filter(Trip.user_id == user_id)
+        .one()
+    )
+    return f"{count}-{last_update.isoformat() if last_update else 0}-{versions or 0}"
+
+
+def site_stamp():
+    """Changes with any user, trip or expense write (admin analytics)"""
+    users, last_user, active, verified = db.session.query(
+        db.func.count(User.id), db.func.max(User.id),
+        db.func.sum(db.case((User.is_active, 1), else_=0)),
+        db.func.sum(db.case((User.is_email_verified, 1), else_=0)),
+    ).one()
+    trips, last_trip_update, trip_versions = db.session.query(
+        db.func.count(Trip.id), db.func.max(Trip.updated_at), db.func.sum(Trip.version)
+    ).one()
+    expenses, last_expense = db.session.query(db.func.count(TripExpense.id), db.func.max(TripExpense.id)).one()
+    last_trip_update = last_trip_update.isoformat() if last_trip_update else 0
+    return (f"{users}-{last_user or 0}-{active or 0}-{verified or 0}-"
+            f"{trips}-{last_trip_update}-{trip_versions or 0}-{expenses}-{last_expense or 0}")
+
+
+def init_fragment_cache(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if not app.config.get("FRAGMENT_CACHE_ENABLED", True):
+        return
+    directory = app.config.get("FRAGMENT_CACHE_DIR") or os.path.join(app.instance_path, "fragments")
+    app.jinja_env.fragment_cache_store = FileCacheStore(directory)
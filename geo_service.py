@@ -0,0 +1,413 @@
+"""
+Nearby-city lookups for the city search map.
+
+Every worker keeps a KD-tree over the ``cities`` catalog in memory. Cities are
+stored as unit vectors on the sphere: the straight-line (chord) distance
+between two vectors grows with the great-circle distance, so a plain 3-D
+KD-tree answers "within ``radius_km``" and "nearest ``k``" exactly, with no
+special cases at the poles or the antimeridian. Leaves hold ``LEAF_SIZE``
+cities and are scanned with numpy; a query visits a handful of leaves.
+
+The tree is rebuilt when the catalog changes: a cheap ``count/max(id)/
+max(updated_at)`` stamp is compared at most every ``REFRESH_SECONDS`` (and
+right after a city is written through the ORM in this worker).
+
+``cities.geohash`` (kept in sync on insert/update) indexes the same points in
+SQL. ``geohash_prefixes`` covers a circle with at most nine cell prefixes, so
+``nearby_query`` narrows a radius search with indexed ``LIKE 'prefix%'``
+lookups. It serves catalogs larger than ``CITY_INDEX_MAX_ROWS``, which are
+not held in memory.
+"""
+
+import heapq
+import json
+import math
+import threading
+import time
+
+# numpy is imported by the functions that use it, so `import app` does not
+# pay for it (benchmarks/import_time.py)
+
+from metrics import record_cache
+from models import db, City
+from route_service import EARTH_RADIUS_KM
+
+GEOHASH_PRECISION = 9  # ~5 m cells
+LEAF_SIZE = 32
+# Seconds between checks that the catalog is unchanged
+REFRESH_SECONDS = 30
+# Larger catalogs are searched through cities.geohash instead of memory
+CITY_INDEX_MAX_ROWS = 250_000
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, value, bits, even = [], 0, 0, True
+    while len(chars) < precision:
+        span, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            value, bits = 0, 0
+    return "".join(chars)
+
+
+def _cell_size(precision):
+    """``(lat_degrees, lng_degrees)`` spanned by a geohash cell"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def geohash_prefixes(lat, lng, radius_km):
+    """Geohash prefixes whose cells together cover the circle, or ``None``
+    when the circle is too large (or too close to a pole) to narrow down."""
+    radius_deg = math.degrees(radius_km / EARTH_RADIUS_KM)
+    widest = min(89.9, abs(lat) + radius_deg)  # Longitude degrees shrink towards the poles
+    km_per_lng_deg = math.radians(1) * EARTH_RADIUS_KM * math.cos(math.radians(widest))
+    km_per_lat_deg = math.radians(1) * EARTH_RADIUS_KM
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_deg, lng_deg = _cell_size(precision)
+        # With cells at least radius wide, the cell holding the centre and its
+        # eight neighbours contain the whole circle
+        if lat_deg * km_per_lat_deg >= radius_km and lng_deg * km_per_lng_deg >= radius_km:
+            break
+    else:
+        return None
+    prefixes = set()
+    for dlat in (-lat_deg, 0.0, lat_deg):
+        for dlng in (-lng_deg, 0.0, lng_deg):
+            neighbour_lat = max(-90.0, min(90.0, lat + dlat))
+            neighbour_lng = (lng + dlng + 180.0) % 360.0 - 180.0
+            prefixes.add(encode_geohash(neighbour_lat, neighbour_lng, precision))
+    return sorted(prefixes)
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Distances (km) from one point to arrays of points"""
+    import numpy as np
+    lat, lng = math.radians(lat), math.radians(lng)
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _unit_vectors(lats, lngs):
+    import numpy as np
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    return np.column_stack((np.cos(lats) * np.cos(lngs), np.cos(lats) * np.sin(lngs), np.sin(lats)))
+
+
+def _chord(km):
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def _arc_km(chords):
+    import numpy as np
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chords / 2, 0.0, 1.0))
+
+
+class KDTree:
+    """Static 3-D KD-tree over unit vectors.
+
+    Nodes are ``[lo, hi, box_min, box_max, left, right]``; ``lo:hi`` is the
+    node's slice of the reordered ``points``. Leaves have no children.
+    """
+
+    def __init__(self, points, leaf_size=LEAF_SIZE):
+        import numpy as np
+        self.order = np.arange(len(points))
+        self.points = np.array(points, dtype=float)  # Reordered in place while building
+        self.nodes = []
+        if len(points):
+            self._build(0, len(points), leaf_size)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build(self, lo, hi, leaf_size):
+        import numpy as np
+        stack = [(lo, hi, None, None)]
+        while stack:
+            lo, hi, parent, side = stack.pop()
+            block = self.points[lo:hi]
+            node = [lo, hi, block.min(axis=0), block.max(axis=0), None, None]
+            self.nodes.append(node)
+            if parent is not None:
+                self.nodes[parent][side] = len(self.nodes) - 1
+            if hi - lo <= leaf_size:
+                continue
+            axis = int(np.argmax(node[3] - node[2]))
+            middle = (hi - lo) // 2
+            split = np.argpartition(block[:, axis], middle)
+            self.points[lo:hi] = block[split]
+            self.order[lo:hi] = self.order[lo:hi][split]
+            index = len(self.nodes) - 1
+            stack.append((lo, lo + middle, index, 4))
+            stack.append((lo + middle, hi, index, 5))
+
+    @staticmethod
+    def _box_distance(node, point):
+        import numpy as np
+        gap = np.maximum(node[2] - point, 0.0) + np.maximum(point - node[3], 0.0)
+        return float(np.sqrt(gap @ gap))
+
+    def _leaf_distances(self, node, point):
+        import numpy as np
+        block = self.points[node[0]:node[1]] - point
+        return np.sqrt(np.einsum("ij,ij->i", block, block))
+
+    def within(self, point, radius):
+        """``(indexes, chord distances)`` of points within ``radius``"""
+        import numpy as np
+        found, distances = [], []
+        stack = [0] if self.nodes else []
+        while stack:
+            node = self.nodes[stack.pop()]
+            if self._box_distance(node, point) > radius:
+                continue
+            if node[4] is None:
+                leaf = self._leaf_distances(node, point)
+                inside = leaf <= radius
+                found.append(self.order[node[0]:node[1]][inside])
+                distances.append(leaf[inside])
+            else:
+                stack.extend((node[4], node[5]))
+        if not found:
+            return np.empty(0, dtype=int), np.empty(0)
+        return np.concatenate(found), np.concatenate(distances)
+
+    def nearest(self, point, k):
+        """``(indexes, chord distances)`` of the ``k`` nearest points, closest first"""
+        import numpy as np
+        best = []  # Max-heap of (-distance, index)
+        queue = [(0.0, 0)] if self.nodes and k > 0 else []
+        while queue:
+            bound, index = heapq.heappop(queue)
+            if len(best) == k and bound > -best[0][0]:
+                break
+            node = self.nodes[index]
+            if node[4] is None:
+                distances, indexes = self._leaf_distances(node, point), self.order[node[0]:node[1]]
+                if len(best) == k:
+                    closer = distances < -best[0][0]
+                    distances, indexes = distances[closer], indexes[closer]
+                for distance, found in zip(distances.tolist(), indexes.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, found))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, found))
+            else:
+                for child in (node[4], node[5]):
+                    heapq.heappush(queue, (self._box_distance(self.nodes[child], point), child))
+        best.sort(reverse=True)
+        return (np.array([found for _, found in best], dtype=int),
+                np.array([-distance for distance, _ in best], dtype=float))
+
+
+def city_payload(city):
+    """JSON shape used by the city search page and its map"""
+    try:
+        attractions = json.loads(city.attractions) if city.attractions else []
+    except ValueError:
+        attractions = []
+    return {
+        "id": city.id,
+        "name": city.name,
+        "country": city.country,
+        "region": city.region,
+        "costIndex": city.cost_index,
+        "costIndexValue": city.cost_index_value,
+        "popularity": city.popularity,
+        "description": city.description,
+        "attractions": attractions,
+        "bestTime": city.best_time,
+        "imageUrl": city.image_url,
+        "coordinates": {"lat": city.latitude, "lng": city.longitude},
+    }
+
+
+class CityIndex:
+    """KD-tree over the located cities plus their search payloads"""
+
+    def __init__(self, cities, stamp=None):
+        import numpy as np
+        located = [c for c in cities if c.latitude is not None and c.longitude is not None]
+        self.stamp = stamp
+        self.cities = [city_payload(c) for c in located]
+        self.lats = np.array([c.latitude for c in located], dtype=float)
+        self.lngs = np.array([c.longitude for c in located], dtype=float)
+        self.tree = KDTree(_unit_vectors(self.lats, self.lngs) if located else np.empty((0, 3)))
+
+    def __len__(self):
+        return len(self.cities)
+
+    def _results(self, indexes, chords, match, limit):
+        results = []
+        for index, distance in zip(indexes, _arc_km(chords)):
+            city = self.cities[index]
+            if match is None or match(city):
+                results.append(dict(city, distanceKm=round(float(distance), 2)))
+                if limit is not None and len(results) == limit:
+                    break
+        return results
+
+    def within(self, lat, lng, radius_km, match=None, limit=None):
+        """Cities within ``radius_km``, closest first"""
+        import numpy as np
+        point = _unit_vectors([lat], [lng])[0]
+        indexes, chords = self.tree.within(point, _chord(radius_km))
+        order = np.argsort(chords, kind="stable")
+        return self._results(indexes[order], chords[order], match, limit)
+
+    def nearest(self, lat, lng, k, match=None):
+        """The ``k`` closest cities accepted by ``match``"""
+        point = _unit_vectors([lat], [lng])[0]
+        wanted = k
+        while True:
+            # Widen the search until enough cities pass the filter
+            indexes, chords = self.tree.nearest(point, min(wanted, len(self)))
+            results = self._results(indexes, chords, match, k)
+            if len(results) == k or wanted >= len(self):
+                return results
+            wanted *= 4
+
+
+_index = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def catalog_stamp():
+    """Changes whenever a catalog city is added, edited or deleted"""
+    return tuple(db.session.query(
+        db.func.count(City.id), db.func.max(City.id), db.func.max(City.updated_at)
+    ).one())
+
+
+def city_index():
+    """This worker's index, rebuilt if the catalog changed; ``None`` when the
+    catalog is too large to hold in memory"""
+    global _index, _checked_at
+    now = time.monotonic()
+    index = _index
+    if index is not None and now - _checked_at < REFRESH_SECONDS:
+        record_cache("city_index", hit=True)
+        return index
+
+    stamp = catalog_stamp()
+    with _index_lock:
+        if _index is None or _index.stamp != stamp:
+            record_cache("city_index", hit=False)
+            _index = None if stamp[0] > CITY_INDEX_MAX_ROWS else CityIndex(City.query.all(), stamp)
+        else:
+            record_cache("city_index", hit=True)
+        _checked_at = now
+        return _index
+
+
+def reset_city_index():
+    global _index, _checked_at
+    with _index_lock:
+        _index, _checked_at = None, 0.0
+
+
+def nearby_query(lat, lng, radius_km):
+    """``City`` query narrowed to the geohash cells around the circle.
+
+    Candidates may lie outside ``radius_km``; callers filter by distance.
+    """
+    query = City.query.filter(City.geohash.isnot(None))
+    prefixes = geohash_prefixes(lat, lng, radius_km)
+    if prefixes is not None:
+        query = query.filter(db.or_(*(City.geohash.like(prefix + "%") for prefix in prefixes)))
+    return query
+
+
+def city_filter(text=None, country=None, cost=None):
+    """Predicate over city payloads, or ``None`` when nothing is filtered"""
+    text, country, cost = (value.strip().lower() if value else "" for value in (text, country, cost))
+    if not (text or country or cost):
+        return None
+
+    def match(city):
+        if country and (city["country"] or "").lower() != country:
+            return False
+        if cost and (city["costIndex"] or "").lower() != cost:
+            return False
+        return not text or any(text in (city[field] or "").lower() for field in ("name", "country", "region"))
+    return match
+
+
+def find_cities(lat=None, lng=None, radius_km=None, k=None, match=None, limit=50):
+    """City payloads for the search page.
+
+    With ``radius_km``: cities within it, closest first. With only
+    ``lat``/``lng``: the ``k`` nearest. Otherwise the catalog by popularity.
+    Located results carry ``distanceKm``.
+    """
+    index = city_index()
+    if lat is not None and index is not None:
+        if radius_km is not None:
+            return index.within(lat, lng, radius_km, match, limit)
+        return index.nearest(lat, lng, min(k or limit, limit), match)
+    if lat is not None:
+        return _search_large_catalog(lat, lng, radius_km, k, match, limit)
+
+    if index is not None:
+        cities = index.cities
+    else:
+        cities = [city_payload(c) for c in City.query.order_by(City.popularity.desc(), City.name).limit(limit * 20)]
+    if match is not None:
+        cities = [city for city in cities if match(city)]
+    return sorted(cities, key=lambda city: (-(city["popularity"] or 0), city["name"]))[:limit]
+
+
+def _search_large_catalog(lat, lng, radius_km, k, match, limit):
+    if radius_km is None:
+        # Grow the circle until it holds k cities (or half the globe)
+        limit, radius_km = min(k or limit, limit), 50.0
+        while True:
+            results = _search_large_catalog(lat, lng, radius_km, None, match, limit)
+            if len(results) == limit or radius_km >= math.pi * EARTH_RADIUS_KM:
+                return results
+            radius_km *= 4
+    cities = nearby_query(lat, lng, radius_km).all()
+    distances = haversine_km(lat, lng, [c.latitude for c in cities], [c.longitude for c in cities])
+    results = []
+    for distance, city in sorted(zip(distances, cities), key=lambda pair: pair[0]):
+        if distance > radius_km:
+            break
+        payload = city_payload(city)
+        if match is None or match(payload):
+            results.append(dict(payload, distanceKm=round(float(distance), 2)))
+            if len(results) == limit:
+                break
+    return results
+
+
+def _set_geohash(mapper, connection, city):
+    if city.latitude is None or city.longitude is None:
+        city.geohash = None
+    else:
+        city.geohash = encode_geohash(city.latitude, city.longitude)
+
+
+def _catalog_changed(mapper, connection, city):
+    global _checked_at
+    _checked_at = 0.0  # Compare the stamp on the next lookup
+
+
+db.event.listen(City, "before_insert", _set_geohash)
+db.event.listen(City, "before_update", _set_geohash)
+for _event in ("after_insert", "after_update", "after_delete"):
+    db.event.listen(City, _event, _catalog_changed)
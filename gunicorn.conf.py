@@ -0,0 +1,215 @@
+"""
+Gunicorn settings for GlobeTrotter.
+
+Many routes block on external APIs (weather, SendGrid, World Bank, Numbeo), so
+the default profile runs threaded workers; a slow upstream then holds a thread
+instead of a whole process. Select a profile with GUNICORN_PROFILE:
+
+    gthread  (default) a few processes with GUNICORN_THREADS threads each
+    gevent   cooperative greenlets; needs gevent (and psycogreen for
+             PostgreSQL, otherwise database calls block the event loop)
+    sync     one request per process, the old behaviour
+
+Notification streams (server-sent events) stay open for minutes. They need
+the gevent profile, which production uses (Procfile, render.yaml). Under
+gthread each stream holds a thread, so a worker only accepts threads // 2 of
+them as a fallback and answers the rest with 503; sync accepts none.
+
+Worker counts are derived from the CPUs and memory available to the container
+(cgroup limits included). WEB_CONCURRENCY overrides the process count.
+
+Prometheus metrics are shared between workers through files in
+PROMETHEUS_MULTIPROC_DIR (a fresh temporary directory unless set), so
+/metrics reports totals for the whole server, not the worker that answered.
+Its *.db files are cleared when the master starts; reloads keep them.
+
+    gunicorn -c gunicorn.conf.py "app:create_app()"
+"""
+
+import glob
+import os
+import sys
+import tempfile
+
+PROFILE = os.environ.get("GUNICORN_PROFILE", "gthread").strip().lower()
+if PROFILE not in ("gthread", "gevent", "sync"):
+    raise RuntimeError(f"Unknown GUNICORN_PROFILE {PROFILE!r}; use gthread, gevent or sync")
+
+if PROFILE == "gevent":
+    # Patch before preload_app imports the app, so SQLAlchemy's pool locks,
+    # requests' sockets and time.sleep all cooperate with the event loop
+    from gevent import monkey
+
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
+    except ImportError:
+        pass  # Reported per worker by _verify_gevent
+
+# Must be set before the app (and prometheus_client) is imported. Unless the
+# operator chose a directory, use a fresh one. This module is read again on
+# SIGHUP, when the variable is already set, so it never deletes anything here;
+# stale files of a previous run are removed once, in on_starting.
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    METRICS_DIR = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(METRICS_DIR, exist_ok=True)
+else:
+    METRICS_DIR = os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="globetrotter-metrics-")
+
+
+def _read_int(path):
+    try:
+        with open(path) as f:
+            value = f.read().split()[0]
+    except (OSError, IndexError):
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def available_cpus():
+    """CPUs this process may use: affinity mask, capped by a cgroup v2 quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def available_memory_mb():
+    """Memory limit of the container (cgroup v2/v1), else physical memory"""
+    limits = [
+        _read_int("/sys/fs/cgroup/memory.max"),
+        _read_int("/sys/fs/cgroup/memory/memory.limit_in_bytes"),
+    ]
+    try:
+        physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        physical = None
+    # Unlimited cgroups report a huge number; never exceed physical memory
+    candidates = [value for value in limits + [physical] if value]
+    return min(candidates) // (1024 * 1024) if candidates else 1024
+
+
+def derive_workers(profile, cpus, memory_mb, worker_memory_mb):
+    """Process count: what the CPUs can keep busy, bounded by what fits in memory"""
+    by_cpu = {"sync": 2 * cpus + 1, "gthread": cpus + 1, "gevent": cpus}[profile]
+    # Keep a quarter of the memory for the master, page cache and spikes
+    by_memory = int(memory_mb * 0.75) // worker_memory_mb
+    return max(1, min(by_cpu, by_memory))
+
+
+CPUS = available_cpus()
+MEMORY_MB = available_memory_mb()
+WORKER_MEMORY_MB = int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", 160))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+worker_class = PROFILE
+workers = int(os.environ.get("WEB_CONCURRENCY") or derive_workers(PROFILE, CPUS, MEMORY_MB, WORKER_MEMORY_MB))
+if PROFILE == "gthread":
+    # Stays below SQLAlchemy's default pool (5 + 10 overflow) per process
+    threads = int(os.environ.get("GUNICORN_THREADS", 8))
+    # Each notification stream holds a thread; keep half for ordinary requests
+    stream_slots = threads // 2
+elif PROFILE == "gevent":
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 200))
+    stream_slots = worker_connections * 3 // 4
+else:
+    stream_slots = 0  # A stream would block the only request slot
+# Read by notification_stream.py when the (preloaded) app is created
+os.environ.setdefault("NOTIFICATION_STREAMS_PER_WORKER", str(stream_slots))
+
+# Import the app once in the master and fork it into workers (faster boot,
+# shared pages). Database connections are not fork-safe: see post_fork.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+
+# Recycle workers periodically; the jitter keeps them from restarting together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+# External APIs can be slow; don't kill a worker that is only waiting on one
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"  # Heartbeat file off the (possibly slow) disk
+
+accesslog = "-"
+errorlog = "-"
+
+
+def _engines():
+    """SQLAlchemy engines of the preloaded app, if it has been imported"""
+    module = sys.modules.get("app")
+    flask_app = getattr(module, "app", None)
+    if flask_app is None or "sqlalchemy" not in flask_app.extensions:
+        return []
+    from models import db
+
+    with flask_app.app_context():
+        return list(db.engines.values())
+
+
+def on_starting(server):
+    # Files of a previous run would be merged into this one's totals. Only the
+    # metric files are removed, never the directory: it may be the operator's.
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.db")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def when_ready(server):
+    concurrency = {"gthread": "threads", "gevent": "worker_connections"}.get(PROFILE)
+    server.log.info(
+        "GlobeTrotter: %s profile, %d workers%s (%d CPUs, %d MB, preload=%s)",
+        PROFILE, workers, f" x {globals()[concurrency]} {concurrency}" if concurrency else "",
+        CPUS, MEMORY_MB, preload_app,
+    )
+    if PROFILE != "gevent":
+        server.log.warning("GlobeTrotter: notification streams need GUNICORN_PROFILE=gevent; "
+                           "%d per worker under %s", stream_slots, PROFILE)
+    # Nothing in the master should keep pooled connections the workers inherit
+    for engine in _engines():
+        engine.dispose()
+
+
+def post_fork(server, worker):
+    # A connection opened before the fork would be shared by every worker.
+    # close=False drops the inherited pool without closing the parent's sockets.
+    for engine in _engines():
+        engine.dispose(close=False)
+    if PROFILE == "gevent":
+        _verify_gevent(worker)
+
+
+def child_exit(server, worker):
+    # Live gauges (pool connections, emails in flight) of a dead worker are stale
+    from metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
+
+
+def _verify_gevent(worker):
+    """Warn when parts of the stack would still block the event loop"""
+    from gevent import monkey
+
+    for module in ("socket", "threading", "time", "ssl"):
+        if not monkey.is_module_patched(module):
+            worker.log.warning("gevent: %s is not monkey-patched; requests will block the worker", module)
+    for engine in _engines():
+        if engine.dialect.name == "postgresql":
+            import psycopg2.extensions
+
+            if psycopg2.extensions.get_wait_callback() is None:
+                worker.log.warning("gevent: psycopg2 is not patched (pip install psycogreen); "
+                                   "database calls will block the worker")
@@ -1,35 +1,21 @@
 #!/usr/bin/env python3
 """
 Database initialization script for GlobeTrotter
-Works with both SQLite (development) and PostgreSQL (production)
+Applies all pending versioned migrations (see migrations/), which works with
+both SQLite (development) and PostgreSQL (production).
+
+    python init_db.py            # create / upgrade the schema
+    python init_db.py --dry-run  # print the SQL without applying it
 """
-from app import app, db
-import os
+import sys
+
+from migrations.__main__ import main
+
+
+def init_database(dry_run=False):
+    """Bring the database schema up to date"""
+    return main(["upgrade"] + (["--dry-run"] if dry_run else []))
 
-def init_database():
-    """Initialize database tables using Flask-SQLAlchemy"""
-    with app.app_context():
-        print("Creating database tables...")
-        
-        # Create all tables defined in models.py
-        db.create_all()
-        
-        print("✓ Database tables created successfully!")
-        print("Tables created:")
-        print("  - user")
-        print("  - trips")
-        print("  - trip_destinations")
-        print("  - wishlist_items")
-        print("  - notifications")
-        print("  - trip_expenses")
-        
-        # Verify database connection
-        try:
-            from models import User
-            count = User.query.count()
-            print(f"\n✓ Database connection verified! ({count} users found)")
-        except Exception as e:
-            print(f"\n⚠ Warning: Could not verify database: {e}")
 
 if __name__ == "__main__":
-    init_database()
+    sys.exit(init_database(dry_run="--dry-run" in sys.argv[1:]))
@@ -0,0 +1,212 @@
+"""
+Diff-based persistence for itinerary sections.
+
+The itinerary builder posts the full list of sections on every save. Instead of
+deleting and re-inserting every TripDestination row, sections are matched to
+existing rows (by the id round-tripped through the page, then by name), and
+only the differences are written: new rows are inserted, changed rows updated
+in one executemany, and removed rows deleted. A content hash of the normalized
+sections turns an unchanged save into a no-op.
+
+Activities are stored as a JSON list and the date range is parsed once, on
+save, into ``start_date``/``end_date``; readers never parse strings.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+
+from models import db, TripDestination, TripExpense
+from place_service import resolve as resolve_places
+
+# Fields compared between the posted sections and the stored rows
+SECTION_FIELDS = ("name", "city", "order_index", "sequence", "date_range", "start_date", "end_date", "budget",
+                  "activities")
+# Activity keys kept from posted sections
+ACTIVITY_FIELDS = ("name", "location", "category", "cost", "time")
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def _parse_budget(value):
+    try:
+        budget = float(value) if value else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+    return max(budget, 0.0)  # Prevent negative budgets
+
+
+def _parse_id(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_date_range(value):
+    """``"2025-03-01 to 2025-03-04"`` (or a single date) -> (start, end) dates"""
+    parts = [part.strip() for part in (value or "").split(" to ")]
+    try:
+        dates = [datetime.strptime(part, DATE_FORMAT).date() for part in parts if part]
+    except ValueError:
+        return None, None
+    if not dates or len(dates) > 2:
+        return None, None
+    start, end = dates[0], dates[-1]
+    return (start, end) if start <= end else (end, start)
+
+
+def normalize_activities(activities):
+    """Posted activities as a list of plain dicts with known keys"""
+    normalized = []
+    for activity in activities if isinstance(activities, list) else []:
+        if isinstance(activity, str):
+            activity = {"name": activity}
+        if not isinstance(activity, dict) or not str(activity.get("name") or "").strip():
+            continue
+        normalized.append({key: activity[key] for key in ACTIVITY_FIELDS if activity.get(key) not in (None, "")})
+    return normalized
+
+
+def normalize_sections(sections):
+    """Turn posted section dicts into row-shaped dicts.
+
+    Returns a list aligned with ``sections``; entries that cannot be saved
+    (not a dict, or no city) are ``None``.
+    """
+    normalized = []
+    for position, section_data in enumerate(sections):
+        if not isinstance(section_data, dict):
+            normalized.append(None)
+            continue
+
+        # Handle city data - could be string or object
+        city_data = section_data.get("city", "")
+        if isinstance(city_data, dict):
+            city_name = (city_data.get("name") or "").strip()
+        else:
+            city_name = str(city_data or "").strip()
+        if not city_name:
+            normalized.append(None)
+            continue
+
+        try:
+            order = int(section_data.get("order") or position + 1)
+        except (ValueError, TypeError):
+            order = position + 1
+
+        date_range = str(section_data.get("dateRange") or "").strip()
+        start_date, end_date = parse_date_range(date_range)
+        normalized.append({
+            "id": _parse_id(section_data.get("id")),
+            "name": city_name,
+            "city": city_name,  # Store city name in city field too
+            "order_index": order - 1,  # 0-based index
+            "sequence": order,  # 1-based sequence
+            "date_range": date_range,
+            "start_date": start_date,
+            "end_date": end_date,
+            "budget": _parse_budget(section_data.get("budget")),
+            "activities": normalize_activities(section_data.get("activities")),
+        })
+    return normalized
+
+
+def row_to_section(row):
+    """Normalize a stored TripDestination the same way as posted sections"""
+    return {
+        "id": row.id,
+        "name": row.name,
+        "city": row.city,
+        "order_index": row.order_index,
+        "sequence": row.sequence,
+        "date_range": row.date_range or "",
+        "start_date": row.start_date,
+        "end_date": row.end_date,
+        "budget": float(row.budget or 0),
+        "activities": row.activities or [],
+    }
+
+
+def content_hash(sections):
+    """Stable hash of section content, ignoring row ids"""
+    payload = [[s[field] for field in SECTION_FIELDS] for s in sections]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def save_itinerary_sections(trip, sections):
+    """Apply the posted sections to ``trip`` as a minimal diff.
+
+    Returns ``(ids, stats)`` where ``ids`` is aligned with ``sections`` (the
+    row id each section was saved as, ``None`` for skipped entries) and
+    ``stats`` counts inserted/updated/deleted rows. Does not commit.
+    """
+    normalized = normalize_sections(sections)
+    wanted = [s for s in normalized if s is not None]
+    rows = (
+        TripDestination.query.filter_by(trip_id=trip.id)
+        .order_by(TripDestination.order_index.asc(), TripDestination.id.asc())
+        .all()
+    )
+    stats = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": False}
+
+    if content_hash(wanted) == content_hash([row_to_section(r) for r in rows]):
+        # Nothing changed; hand back the existing ids so the client can
+        # round-trip them on the next save
+        stats["unchanged"] = True
+        row_ids = iter(r.id for r in rows)
+        return [next(row_ids) if s is not None else None for s in normalized], stats
+
+    by_id = {r.id: r for r in rows}
+    unclaimed = list(rows)
+    matches = []
+    for section in wanted:
+        row = by_id.get(section["id"])
+        if row is None or row not in unclaimed:
+            # Clients that don't send ids still keep their rows when the
+            # destination name matches
+            row = next((r for r in unclaimed if r.name == section["name"]), None)
+        if row is not None:
+            unclaimed.remove(row)
+        matches.append(row)
+
+    changes = []
+    new_rows = []
+    for section, row in zip(wanted, matches):
+        if row is None:
+            new_row = TripDestination(trip_id=trip.id, **{f: section[f] for f in SECTION_FIELDS})
+            new_rows.append(new_row)
+            continue
+        current = row_to_section(row)
+        changed = {f: section[f] for f in SECTION_FIELDS if current[f] != section[f]}
+        if changed:
+            changes.append({"id": row.id, **changed})
+
+    if unclaimed:
+        removed_ids = [r.id for r in unclaimed]
+        # Keep expenses, just detach them from the removed destinations
+        TripExpense.query.filter(TripExpense.destination_id.in_(removed_ids)).update(
+            {TripExpense.destination_id: None}, synchronize_session=False
+        )
+        TripDestination.query.filter(TripDestination.id.in_(removed_ids)).delete(synchronize_session=False)
+        stats["deleted"] = len(removed_ids)
+
+    if changes:
+        # The bulk UPDATE skips ORM flush hooks, so renamed rows get their
+        # canonical place here
+        renamed = [(change, (change["city"], by_id[change["id"]].country)) for change in changes if "city" in change]
+        places = resolve_places(db.session.connection(), [typed for _, typed in renamed])
+        for change, typed in renamed:
+            change["place_id"], change["city_id"] = places.get(typed, (None, None))
+        # Bulk UPDATE by primary key: one executemany per set of changed columns
+        db.session.execute(db.update(TripDestination), changes)
+        stats["updated"] = len(changes)
+
+    if new_rows:
+        db.session.add_all(new_rows)
+        db.session.flush()
+        stats["inserted"] = len(new_rows)
+
+    saved = iter(new_rows)
+    saved_ids = [row.id if row is not None else next(saved).id for row in matches]
+    saved_ids = iter(saved_ids)
+    return [next(saved_ids) if s is not None else None for s in normalized], stats
@@ -0,0 +1,153 @@
+"""
+Prometheus metrics, served at ``/metrics``.
+
+- request latency histogram per route, method and status;
+- SQLAlchemy pool connections checked out and overflow;
+- cache lookups per cache and result (hit ratio = hits / all lookups);
+- outbound API latency and errors per upstream host (fed by perf.py);
+- emails being sent and emails sent per kind and result;
+- open notification streams.
+
+Under gunicorn each worker keeps its own counters. gunicorn.conf.py points
+PROMETHEUS_MULTIPROC_DIR at a shared directory before the app is imported;
+prometheus_client then writes every worker's values to files there, and
+``/metrics`` (answered by whichever worker gets the scrape) merges them. Dead
+workers' live gauges are dropped in the ``child_exit`` hook.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+
+# Seconds; spans cached JSON (ms) to slow upstream-bound pages (tens of seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Requests not worth a time series
+IGNORED_ENDPOINTS = {"static", "metrics_endpoint"}
+
+REQUEST_LATENCY = Histogram(
+    "globetrotter_http_request_duration_seconds", "HTTP request latency",
+    ["route", "method", "status"], buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "globetrotter_db_pool_checked_out", "Database connections in use",
+    ["pool"], multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "globetrotter_db_pool_overflow", "Database connections open beyond pool_size",
+    ["pool"], multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "globetrotter_cache_requests_total", "Cache lookups", ["cache", "result"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "globetrotter_upstream_request_duration_seconds", "Outbound API call latency",
+    ["upstream"], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "globetrotter_upstream_errors_total", "Outbound API calls that failed or returned 5xx", ["upstream"],
+)
+EMAILS_IN_FLIGHT = Gauge(
+    "globetrotter_email_in_flight", "Emails currently being handed to SendGrid",
+    multiprocess_mode="livesum",
+)
+EMAILS_SENT = Counter(
+    "globetrotter_emails_total", "Emails handed to SendGrid", ["kind", "result"],
+)
+NOTIFICATION_STREAMS = Gauge(
+    "globetrotter_notification_streams", "Open notification event streams",
+    multiprocess_mode="livesum",
+)
+
+
+def multiprocess_enabled():
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def _record_upstream(host, elapsed_ms, ok):
+    UPSTREAM_LATENCY.labels(upstream=host).observe(elapsed_ms / 1000)
+    if not ok:
+        UPSTREAM_ERRORS.labels(upstream=host).inc()
+
+
+@contextmanager
+def track_email(kind, upstream="api.sendgrid.com"):
+    """Wrap one SendGrid send: in-flight gauge, outcome counter, upstream latency"""
+    from perf import record_external
+
+    EMAILS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        EMAILS_IN_FLIGHT.dec()
+        EMAILS_SENT.labels(kind=kind, result="sent" if ok else "failed").inc()
+        record_external(upstream, (time.perf_counter() - started) * 1000, ok)
+
+
+def _watch_pool(engine, name):
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return  # SQLite's static/singleton pools have nothing to report
+
+    def update(*args):
+        DB_POOL_CHECKED_OUT.labels(pool=name).set(engine.pool.checkedout())
+        DB_POOL_OVERFLOW.labels(pool=name).set(max(0, engine.pool.overflow()))
+
+    # Engine-level pool listeners survive engine.dispose() (see gunicorn post_fork)
+    event.listen(engine, "checkout", update)
+    event.listen(engine, "checkin", update)
+    update()
+
+
+def _observe_request(response):
+    timings = g.get("perf")
+    endpoint = request.endpoint or "unmatched"
+    if timings is None or endpoint in IGNORED_ENDPOINTS:
+        return response
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_LATENCY.labels(route=route, method=request.method, status=str(response.status_code)).observe(
+        timings.elapsed_ms / 1000
+    )
+    return response
+
+
+def render_metrics():
+    """(body, content type) for a scrape, merged across workers when multiprocess"""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    from prometheus_client import REGISTRY
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Drop a dead worker's live gauges (gunicorn child_exit)"""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
+
+
+def init_metrics(app):
+    """Hook request latency, pool gauges and upstream calls; needs perf.init_perf"""
+    from models import db
+    from perf import external_observers
+
+    if _record_upstream not in external_observers:
+        external_observers.append(_record_upstream)
+    app.after_request(_observe_request)
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            _watch_pool(engine, bind_key or "default")
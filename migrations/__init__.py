@@ -0,0 +1,10 @@
+"""
+Versioned database migrations.
+
+Run ``python -m migrations upgrade [--dry-run]`` (or ``python init_db.py``)
+to bring any database up to the latest schema.
+"""
+
+from migrations.runner import MigrationRunner, Operations, load_migrations
+
+__all__ = ["MigrationRunner", "Operations", "load_migrations"]
@@ -0,0 +1,40 @@
+"""
+Command line entry point for the migration runner
+
+    python -m migrations upgrade            # apply pending migrations
+    python -m migrations upgrade --dry-run  # print the SQL without applying it
+    python -m migrations status             # list applied / pending versions
+"""
+
+import argparse
+import sys
+
+from migrations.runner import MigrationRunner
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m migrations", description="GlobeTrotter schema migrations")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    parser.add_argument("--dry-run", action="store_true", help="print the SQL that would run without applying it")
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    with app.app_context():
+        runner = MigrationRunner(db.engine)
+        print(f"Database: {db.engine.url.render_as_string(hide_password=True)}")
+        if args.command == "status":
+            for version, description, applied in runner.status():
+                print(f"  [{'x' if applied else ' '}] {version:04d} {description}")
+            return 0
+
+        applied = runner.upgrade(dry_run=args.dry_run)
+        if applied and not args.dry_run:
+            print(f"✓ Applied {len(applied)} migration(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
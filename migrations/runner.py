@@ -0,0 +1,226 @@
+"""
+Versioned schema migrations for GlobeTrotter.
+
+Every module in ``migrations/versions`` defines ``VERSION`` (an increasing
+integer), ``DESCRIPTION`` and ``upgrade(op)``. Applied versions are recorded in
+the ``schema_version`` table, so each migration runs exactly once per database
+and the same files work on SQLite (development) and PostgreSQL (production).
+"""
+
+import importlib
+import pkgutil
+from datetime import datetime
+
+import sqlalchemy as sa
+
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+_metadata = sa.MetaData()
+
+schema_version = sa.Table(
+    SCHEMA_VERSION_TABLE,
+    _metadata,
+    sa.Column("version", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column("description", sa.String(200), nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+
+class Operations:
+    """Dialect-aware DDL helpers handed to each migration's ``upgrade(op)``.
+
+    Every helper is a no-op when the object already exists, so databases that
+    were built by ``db.create_all()`` or the old ad hoc scripts converge on the
+    same schema. In dry-run mode statements are only logged.
+    """
+
+    def __init__(self, connection, dry_run=False, log=print):
+        self.connection = connection
+        self.dialect = connection.dialect
+        self.dry_run = dry_run
+        self.log = log
+        # (index name, statement) pairs that must run outside a transaction
+        self.deferred = []
+
+    @property
+    def is_postgres(self):
+        return self.dialect.name == "postgresql"
+
+    def quote(self, name):
+        return self.dialect.identifier_preparer.quote(name)
+
+    def _inspector(self):
+        # A fresh inspector per check so tables created earlier in the same
+        # migration are visible
+        return sa.inspect(self.connection)
+
+    def has_table(self, table):
+        return self._inspector().has_table(table)
+
+    def has_column(self, table, column):
+        if not self.has_table(table):
+            return False
+        return column in {c["name"] for c in self._inspector().get_columns(table)}
+
+    def has_index(self, table, name):
+        if not self.has_table(table):
+            return False
+        return name in {i["name"] for i in self._inspector().get_indexes(table)}
+
+    def _render(self, statement):
+        return str(statement.compile(dialect=self.dialect)).strip()
+
+    def _literal(self, value, type_):
+        return str(sa.literal(value, type_).compile(dialect=self.dialect, compile_kwargs={"literal_binds": True}))
+
+    def execute(self, statement, params=None):
+        """Run (or, in dry-run mode, only log) a SQL statement"""
+        if isinstance(statement, str):
+            statement = sa.text(statement)
+        self.log(f"  {self._render(statement)}")
+        if self.dry_run:
+            return None
+        if params is None:
+            return self.connection.execute(statement)
+        return self.connection.execute(statement, params)
+
+    def create_table(self, table):
+        """Create a table and its indexes from a SQLAlchemy ``Table``"""
+        if self.has_table(table.name):
+            return False
+        self.execute(sa.schema.CreateTable(table))
+        # The table is empty, so plain (blocking) index creation is fine here
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            self.execute(sa.schema.CreateIndex(index))
+        return True
+
+    def add_column(self, table, name, type_, nullable=True, default=None, references=None):
+        """Add a column; ``default`` is required for NOT NULL columns.
+
+        ``references`` (``"table.column"``) adds a foreign key, the same one
+        ``db.create_all()`` declares for the model column.
+        """
+        if self.has_column(table, name):
+            return False
+        if not nullable and default is None:
+            raise ValueError(f"NOT NULL column {table}.{name} needs a default")
+        ddl = f"ALTER TABLE {self.quote(table)} ADD COLUMN {self.quote(name)} {type_.compile(dialect=self.dialect)}"
+        if references is not None:
+            ref_table, ref_column = references.split(".")
+            ddl += f" REFERENCES {self.quote(ref_table)} ({self.quote(ref_column)})"
+        if default is not None:
+            ddl += f" DEFAULT {self._literal(default, type_)}"
+        if not nullable:
+            ddl += " NOT NULL"
+        self.execute(ddl)
+        return True
+
+    def create_index(self, name, table, columns, unique=False):
+        """Create an index, online (``CONCURRENTLY``) on PostgreSQL"""
+        if self.has_index(table, name):
+            return False
+        column_sql = ", ".join(self.quote(c) for c in columns)
+        unique_sql = "UNIQUE " if unique else ""
+        if self.is_postgres:
+            ddl = (f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {self.quote(name)} "
+                   f"ON {self.quote(table)} ({column_sql})")
+            # CONCURRENTLY cannot run inside a transaction block; the runner
+            # executes these in autocommit mode once the migration commits
+            self.log(f"  {ddl}  -- deferred, runs outside the transaction")
+            self.deferred.append((name, ddl))
+        else:
+            self.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {self.quote(name)} ON {self.quote(table)} ({column_sql})")
+        return True
+
+    def bulk_insert(self, table, rows):
+        """Insert many rows with a single executemany round-trip"""
+        if not rows:
+            return
+        self.execute(table.insert(), rows)
+
+
+def load_migrations():
+    """Import every module in ``migrations.versions`` ordered by VERSION"""
+    from migrations import versions
+
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+    ]
+    modules.sort(key=lambda m: m.VERSION)
+    seen = set()
+    for module in modules:
+        if module.VERSION in seen:
+            raise RuntimeError(f"Duplicate migration version {module.VERSION} ({module.__name__})")
+        seen.add(module.VERSION)
+    return modules
+
+
+class MigrationRunner:
+    """Applies pending migrations to a SQLAlchemy engine"""
+
+    def __init__(self, engine, migrations=None, log=print):
+        self.engine = engine
+        self.migrations = migrations if migrations is not None else load_migrations()
+        self.log = log
+
+    def applied_versions(self):
+        with self.engine.connect() as conn:
+            if not sa.inspect(conn).has_table(SCHEMA_VERSION_TABLE):
+                return set()
+            return set(conn.execute(sa.select(schema_version.c.version)).scalars())
+
+    def pending(self):
+        applied = self.applied_versions()
+        return [m for m in self.migrations if m.VERSION not in applied]
+
+    def status(self):
+        """List of (version, description, applied) for every known migration"""
+        applied = self.applied_versions()
+        return [(m.VERSION, m.DESCRIPTION, m.VERSION in applied) for m in self.migrations]
+
+    def upgrade(self, dry_run=False):
+        """Apply pending migrations in order and return their versions"""
+        pending = self.pending()
+        if not pending:
+            self.log("Database schema is up to date.")
+            return []
+
+        if not dry_run:
+            _metadata.create_all(self.engine)
+
+        for migration in pending:
+            prefix = "[dry-run] " if dry_run else ""
+            self.log(f"{prefix}Applying {migration.VERSION:04d}: {migration.DESCRIPTION}")
+            if dry_run:
+                with self.engine.connect() as conn:
+                    migration.upgrade(Operations(conn, dry_run=True, log=self.log))
+                    conn.rollback()
+                continue
+
+            with self.engine.begin() as conn:
+                op = Operations(conn, log=self.log)
+                migration.upgrade(op)
+            self._run_deferred(op.deferred)
+            with self.engine.begin() as conn:
+                conn.execute(schema_version.insert().values(
+                    version=migration.VERSION,
+                    description=migration.DESCRIPTION,
+                    applied_at=datetime.utcnow(),
+                ))
+        return [m.VERSION for m in pending]
+
+    def _run_deferred(self, statements):
+        if not statements:
+            return
+        with self.engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            for name, ddl in statements:
+                try:
+                    conn.execute(sa.text(ddl))
+                except Exception:
+                    # A failed CONCURRENTLY build leaves an INVALID index that
+                    # IF NOT EXISTS would skip on the next run; drop it first
+                    conn.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {conn.dialect.identifier_preparer.quote(name)}"))
+                    raise
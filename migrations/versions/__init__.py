@@ -0,0 +1 @@
+"""Migration modules, named ``vNNNN_<description>.py``"""
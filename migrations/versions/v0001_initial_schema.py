@@ -0,0 +1,104 @@
+"""Core tables: users, trips, destinations, wishlist and notifications.
+
+The tables are spelled out as they were when this migration was written,
+not taken from ``models``: columns added to the models later arrive
+through their own migrations, so fresh and upgraded databases match.
+"""
+
+import sqlalchemy as sa
+
+VERSION = 1
+DESCRIPTION = "initial schema"
+
+metadata = sa.MetaData()
+
+user = sa.Table(
+    "user",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("first_name", sa.String(80), nullable=False),
+    sa.Column("last_name", sa.String(80), nullable=False),
+    sa.Column("email", sa.String(255), unique=True, nullable=False, index=True),
+    sa.Column("phone", sa.String(32), nullable=True),
+    sa.Column("city", sa.String(120), nullable=True),
+    sa.Column("state", sa.String(120), nullable=True),
+    sa.Column("country", sa.String(120), nullable=True),
+    sa.Column("date_of_birth", sa.Date, nullable=True),
+    sa.Column("bio", sa.Text, nullable=True),
+    sa.Column("travel_preferences", sa.Text, nullable=True),
+    sa.Column("profile_picture", sa.String(500), nullable=True),
+    sa.Column("password_hash", sa.String(255), nullable=False),
+    sa.Column("reset_token", sa.String(255), nullable=True),
+    sa.Column("reset_token_expiry", sa.DateTime, nullable=True),
+    sa.Column("is_admin", sa.Boolean, nullable=False, index=True),
+    sa.Column("last_login", sa.DateTime, nullable=True),
+    sa.Column("is_active", sa.Boolean, nullable=False, index=True),
+    sa.Column("is_email_verified", sa.Boolean, nullable=False),
+    sa.Column("otp_code", sa.String(6), nullable=True),
+    sa.Column("otp_expiry", sa.DateTime, nullable=True),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+)
+
+trips = sa.Table(
+    "trips",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False, index=True),
+    sa.Column("title", sa.String(200), nullable=False, index=True),
+    sa.Column("start_date", sa.Date, nullable=True, index=True),
+    sa.Column("end_date", sa.Date, nullable=True, index=True),
+    sa.Column("status", sa.String(20), nullable=False, index=True),
+    sa.Column("created_at", sa.DateTime, nullable=False, index=True),
+    sa.Column("budget", sa.Float, nullable=True, index=True),
+    sa.Column("priority", sa.Integer, nullable=False, index=True),
+)
+
+trip_destinations = sa.Table(
+    "trip_destinations",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("trip_id", sa.Integer, sa.ForeignKey("trips.id"), nullable=False, index=True),
+    sa.Column("name", sa.String(200), nullable=False, index=True),
+    sa.Column("city", sa.String(120), nullable=True, index=True),
+    sa.Column("country", sa.String(120), nullable=True, index=True),
+    sa.Column("order_index", sa.Integer, nullable=False, index=True),
+    sa.Column("sequence", sa.Integer, nullable=False, index=True),
+    sa.Column("budget_allocated", sa.Float, nullable=True),
+    sa.Column("budget", sa.Float, nullable=True),
+    sa.Column("date", sa.Date, nullable=True),
+    sa.Column("date_range", sa.String(100), nullable=True),
+    sa.Column("duration", sa.String(50), nullable=True),
+    sa.Column("description", sa.Text, nullable=True),
+    sa.Column("notes", sa.Text, nullable=True),
+    sa.Column("city_id", sa.Integer, nullable=True, index=True),
+)
+
+wishlist_items = sa.Table(
+    "wishlist_items",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False, index=True),
+    sa.Column("title", sa.String(200), nullable=False, index=True),
+    sa.Column("city", sa.String(120), nullable=True, index=True),
+    sa.Column("country", sa.String(120), nullable=True, index=True),
+    sa.Column("image_url", sa.String(500), nullable=True),
+    sa.Column("tags", sa.Text, nullable=True),
+    sa.Column("rating", sa.Float, nullable=False, index=True),
+    sa.Column("created_at", sa.DateTime, nullable=False, index=True),
+)
+
+notifications = sa.Table(
+    "notifications",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False, index=True),
+    sa.Column("message", sa.String(500), nullable=False),
+    sa.Column("kind", sa.String(50), nullable=True, index=True),
+    sa.Column("is_read", sa.Boolean, nullable=False, index=True),
+    sa.Column("created_at", sa.DateTime, nullable=False, index=True),
+)
+
+
+def upgrade(op):
+    for table in (user, trips, trip_destinations, wishlist_items, notifications):
+        op.create_table(table)
@@ -0,0 +1,14 @@
+"""Admin role and activity tracking on users (was migrate_admin_fields.py)"""
+
+import sqlalchemy as sa
+
+VERSION = 2
+DESCRIPTION = "admin fields on user"
+
+
+def upgrade(op):
+    op.add_column("user", "is_admin", sa.Boolean(), nullable=False, default=False)
+    op.add_column("user", "last_login", sa.DateTime())
+    op.add_column("user", "is_active", sa.Boolean(), nullable=False, default=True)
+    op.create_index("ix_user_is_admin", "user", ["is_admin"])
+    op.create_index("ix_user_is_active", "user", ["is_active"])
@@ -0,0 +1,41 @@
+"""Sorting fields and search indexes (was migrate_database.py)"""
+
+import sqlalchemy as sa
+
+VERSION = 3
+DESCRIPTION = "trip/wishlist sorting fields and search indexes"
+
+INDEXES = [
+    ("ix_trips_title", "trips", ["title"]),
+    ("ix_trips_start_date", "trips", ["start_date"]),
+    ("ix_trips_end_date", "trips", ["end_date"]),
+    ("ix_trips_status", "trips", ["status"]),
+    ("ix_trips_created_at", "trips", ["created_at"]),
+    ("ix_trips_budget", "trips", ["budget"]),
+    ("ix_trips_priority", "trips", ["priority"]),
+    ("ix_trip_destinations_name", "trip_destinations", ["name"]),
+    ("ix_trip_destinations_city", "trip_destinations", ["city"]),
+    ("ix_trip_destinations_country", "trip_destinations", ["country"]),
+    ("ix_trip_destinations_order_index", "trip_destinations", ["order_index"]),
+    ("ix_wishlist_items_title", "wishlist_items", ["title"]),
+    ("ix_wishlist_items_city", "wishlist_items", ["city"]),
+    ("ix_wishlist_items_country", "wishlist_items", ["country"]),
+    ("ix_wishlist_items_created_at", "wishlist_items", ["created_at"]),
+    ("ix_wishlist_items_rating", "wishlist_items", ["rating"]),
+    ("ix_notifications_kind", "notifications", ["kind"]),
+    ("ix_notifications_is_read", "notifications", ["is_read"]),
+    ("ix_notifications_created_at", "notifications", ["created_at"]),
+    # Composite indexes for the per-user listing queries
+    ("ix_trips_user_status", "trips", ["user_id", "status"]),
+    ("ix_trips_user_created", "trips", ["user_id", "created_at"]),
+    ("ix_notifications_user_read", "notifications", ["user_id", "is_read"]),
+]
+
+
+def upgrade(op):
+    op.add_column("trips", "budget", sa.Float())
+    op.add_column("trips", "priority", sa.Integer(), nullable=False, default=0)
+    op.add_column("wishlist_items", "tags", sa.Text())
+    op.add_column("wishlist_items", "rating", sa.Float(), nullable=False, default=0.0)
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
@@ -0,0 +1,20 @@
+"""Itinerary section fields on trip_destinations (was migrate_trip_destination_fields.py)"""
+
+import sqlalchemy as sa
+
+VERSION = 4
+DESCRIPTION = "itinerary fields on trip_destinations"
+
+
+def upgrade(op):
+    op.add_column("trip_destinations", "sequence", sa.Integer(), nullable=False, default=0)
+    op.add_column("trip_destinations", "budget_allocated", sa.Float())
+    op.add_column("trip_destinations", "budget", sa.Float())
+    op.add_column("trip_destinations", "date", sa.Date())
+    op.add_column("trip_destinations", "date_range", sa.String(100))
+    op.add_column("trip_destinations", "duration", sa.String(50))
+    op.add_column("trip_destinations", "description", sa.Text())
+    op.add_column("trip_destinations", "notes", sa.Text())
+    op.add_column("trip_destinations", "city_id", sa.Integer())
+    op.create_index("ix_trip_destinations_sequence", "trip_destinations", ["sequence"])
+    op.create_index("ix_trip_destinations_city_id", "trip_destinations", ["city_id"])
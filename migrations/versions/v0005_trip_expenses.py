@@ -0,0 +1,29 @@
+"""Expense tracking table (was migrate_expenses.py)"""
+
+import sqlalchemy as sa
+
+VERSION = 5
+DESCRIPTION = "trip_expenses table"
+
+metadata = sa.MetaData()
+
+# Created by v0001; declared so the foreign keys resolve
+sa.Table("trips", metadata, sa.Column("id", sa.Integer, primary_key=True))
+sa.Table("trip_destinations", metadata, sa.Column("id", sa.Integer, primary_key=True))
+
+trip_expenses = sa.Table(
+    "trip_expenses",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("trip_id", sa.Integer, sa.ForeignKey("trips.id"), nullable=False, index=True),
+    sa.Column("category", sa.String(50), nullable=False, index=True),
+    sa.Column("amount", sa.Float, nullable=False),
+    sa.Column("description", sa.String(500), nullable=True),
+    sa.Column("expense_date", sa.Date, nullable=False, index=True),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+    sa.Column("destination_id", sa.Integer, sa.ForeignKey("trip_destinations.id"), nullable=True, index=True),
+)
+
+
+def upgrade(op):
+    op.create_table(trip_expenses)
@@ -0,0 +1,16 @@
+"""Email OTP verification fields on users (was migrate_otp_verification.py)"""
+
+import sqlalchemy as sa
+
+VERSION = 6
+DESCRIPTION = "email OTP verification fields on user"
+
+
+def upgrade(op):
+    added = op.add_column("user", "is_email_verified", sa.Boolean(), nullable=False, default=False)
+    op.add_column("user", "otp_code", sa.String(6))
+    op.add_column("user", "otp_expiry", sa.DateTime())
+    if added:
+        # Existing admins predate verification; don't lock them out
+        users = sa.table("user", sa.column("is_admin", sa.Boolean), sa.column("is_email_verified", sa.Boolean))
+        op.execute(users.update().where(users.c.is_admin == sa.true()).values(is_email_verified=True))
@@ -0,0 +1,49 @@
+"""City catalog with coordinates and seed data (was migrate_city_search.py / flask_city_migration.py)"""
+
+import json
+import os
+from datetime import datetime
+
+import sqlalchemy as sa
+
+VERSION = 7
+DESCRIPTION = "cities catalog"
+
+SEED_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "cities.json")
+
+metadata = sa.MetaData()
+
+# Python-side defaults are kept: the seed rows rely on them
+cities = sa.Table(
+    "cities",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(100), nullable=False, index=True),
+    sa.Column("country", sa.String(100), nullable=False, index=True),
+    sa.Column("region", sa.String(100), nullable=True, index=True),
+    sa.Column("latitude", sa.Float, nullable=True),
+    sa.Column("longitude", sa.Float, nullable=True),
+    sa.Column("cost_index", sa.String(20), nullable=False, default="medium", index=True),
+    sa.Column("cost_index_value", sa.Integer, nullable=False, default=50),
+    sa.Column("popularity", sa.Integer, nullable=False, default=3, index=True),
+    sa.Column("description", sa.Text, nullable=True),
+    sa.Column("best_time", sa.String(50), nullable=True),
+    sa.Column("attractions", sa.Text, nullable=True),
+    sa.Column("image_url", sa.String(500), nullable=True),
+    sa.Column("created_at", sa.DateTime, default=datetime.utcnow, nullable=False),
+    sa.Column("updated_at", sa.DateTime, default=datetime.utcnow, nullable=False),
+)
+
+
+def upgrade(op):
+    op.create_table(cities)
+    op.create_index("ix_cities_country_cost", "cities", ["country", "cost_index"])
+
+    # Seed only an empty catalog so admin edits are never overwritten
+    if op.has_table("cities") and op.connection.execute(sa.select(sa.func.count()).select_from(cities)).scalar():
+        return
+    with open(SEED_FILE, encoding="utf-8") as f:
+        seed = json.load(f)
+    for city in seed:
+        city["attractions"] = json.dumps(city.get("attractions") or [])
+    op.bulk_insert(cities, seed)
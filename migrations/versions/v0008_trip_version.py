@@ -0,0 +1,11 @@
+"""Optimistic concurrency version and modification time on trips"""
+
+import sqlalchemy as sa
+
+VERSION = 8
+DESCRIPTION = "version and updated_at on trips"
+
+
+def upgrade(op):
+    op.add_column("trips", "version", sa.Integer(), nullable=False, default=1)
+    op.add_column("trips", "updated_at", sa.DateTime())
@@ -0,0 +1,12 @@
+"""Indexes for SQL-side expense summaries and the summary cache version"""
+
+import sqlalchemy as sa
+
+VERSION = 9
+DESCRIPTION = "expense aggregation indexes and trips.expenses_version"
+
+
+def upgrade(op):
+    op.add_column("trips", "expenses_version", sa.Integer(), nullable=False, default=0)
+    op.create_index("ix_trip_expenses_trip_category", "trip_expenses", ["trip_id", "category"])
+    op.create_index("ix_trip_expenses_trip_date", "trip_expenses", ["trip_id", "expense_date"])
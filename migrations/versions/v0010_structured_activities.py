@@ -0,0 +1,101 @@
+"""Structured activities and parsed date ranges on trip destinations.
+
+Activities move from a JSON string in ``notes`` to a JSON ``activities``
+column, and ``date_range`` strings are parsed into ``start_date``/``end_date``.
+Existing rows are converted in id-ordered batches.
+"""
+
+import json
+from datetime import datetime
+
+import sqlalchemy as sa
+
+VERSION = 10
+DESCRIPTION = "trip_destinations.activities, start_date and end_date"
+
+BATCH_SIZE = 1000
+
+destinations = sa.table(
+    "trip_destinations",
+    sa.column("id", sa.Integer),
+    sa.column("notes", sa.Text),
+    sa.column("date_range", sa.String),
+    sa.column("activities", sa.JSON),
+    sa.column("start_date", sa.Date),
+    sa.column("end_date", sa.Date),
+)
+
+# Frozen copies of the itinerary_service helpers as of this version, so later
+# changes there cannot alter what this migration writes
+ACTIVITY_FIELDS = ("name", "location", "category", "cost", "time")
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def parse_date_range(value):
+    """``"2025-03-01 to 2025-03-04"`` (or a single date) -> (start, end) dates"""
+    parts = [part.strip() for part in (value or "").split(" to ")]
+    try:
+        dates = [datetime.strptime(part, DATE_FORMAT).date() for part in parts if part]
+    except ValueError:
+        return None, None
+    if not dates or len(dates) > 2:
+        return None, None
+    start, end = dates[0], dates[-1]
+    return (start, end) if start <= end else (end, start)
+
+
+def normalize_activities(activities):
+    """Stored activities as a list of plain dicts with known keys"""
+    normalized = []
+    for activity in activities if isinstance(activities, list) else []:
+        if isinstance(activity, str):
+            activity = {"name": activity}
+        if not isinstance(activity, dict) or not str(activity.get("name") or "").strip():
+            continue
+        normalized.append({key: activity[key] for key in ACTIVITY_FIELDS if activity.get(key) not in (None, "")})
+    return normalized
+
+
+def convert(row):
+    """Values for one stored row; ``notes`` is cleared once its activities moved out"""
+    values = {"row_id": row.id, "notes": row.notes, "activities": []}
+    try:
+        parsed = json.loads(row.notes) if row.notes else []
+    except ValueError:
+        parsed = None  # Real free-form notes; keep them
+    if isinstance(parsed, list):
+        values["activities"] = normalize_activities(parsed)
+        values["notes"] = None
+    values["start_date"], values["end_date"] = parse_date_range(row.date_range)
+    return values
+
+
+def upgrade(op):
+    op.add_column("trip_destinations", "activities", sa.JSON())
+    op.add_column("trip_destinations", "start_date", sa.Date())
+    op.add_column("trip_destinations", "end_date", sa.Date())
+    if op.dry_run:
+        return
+
+    update = (
+        destinations.update()
+        .where(destinations.c.id == sa.bindparam("row_id"))
+        .values(
+            notes=sa.bindparam("notes"),
+            activities=sa.bindparam("activities"),
+            start_date=sa.bindparam("start_date"),
+            end_date=sa.bindparam("end_date"),
+        )
+    )
+    last_id = 0
+    while True:
+        rows = op.connection.execute(
+            sa.select(destinations.c.id, destinations.c.notes, destinations.c.date_range)
+            .where(destinations.c.id > last_id, destinations.c.activities.is_(None))
+            .order_by(destinations.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        op.connection.execute(update, [convert(row) for row in rows])
+        last_id = rows[-1].id
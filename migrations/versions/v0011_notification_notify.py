@@ -0,0 +1,30 @@
+"""NOTIFY listeners when notifications are inserted (PostgreSQL only)
+
+The notification stream's dispatcher LISTENs on this channel; other databases
+are polled instead (see notification_stream.py).
+"""
+
+VERSION = 11
+DESCRIPTION = "notify on notifications insert"
+
+# notification_stream.CHANNEL when this was written; a later rename needs a new migration
+CHANNEL = "globetrotter_notifications"
+
+
+def upgrade(op):
+    if not op.is_postgres:
+        return
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_new_notifications() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{CHANNEL}', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS notifications_notify ON notifications")
+    # One NOTIFY per statement (bulk inserts included), sent at commit
+    op.execute("""
+        CREATE TRIGGER notifications_notify AFTER INSERT ON notifications
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_new_notifications()
+    """)
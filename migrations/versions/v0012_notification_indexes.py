@@ -0,0 +1,8 @@
+"""Index for the retention purge; (user_id, is_read) already comes from v0003"""
+
+VERSION = 12
+DESCRIPTION = "notifications (is_read, created_at) index"
+
+
+def upgrade(op):
+    op.create_index("ix_notifications_read_created", "notifications", ["is_read", "created_at"])
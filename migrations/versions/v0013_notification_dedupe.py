@@ -0,0 +1,12 @@
+"""Dedupe key for broadcast notifications"""
+
+import sqlalchemy as sa
+
+VERSION = 13
+DESCRIPTION = "notifications.dedupe_key and unique (user_id, kind, dedupe_key)"
+
+
+def upgrade(op):
+    op.add_column("notifications", "dedupe_key", sa.String(200))
+    # NULL keys (one-off notifications) never conflict
+    op.create_index("ux_notifications_user_kind_key", "notifications", ["user_id", "kind", "dedupe_key"], unique=True)
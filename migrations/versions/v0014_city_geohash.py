@@ -0,0 +1,65 @@
+"""Geohash of each city's coordinates, indexed for prefix (nearby) lookups"""
+
+import sqlalchemy as sa
+
+VERSION = 14
+DESCRIPTION = "cities.geohash"
+
+BATCH_SIZE = 1000
+
+cities = sa.table(
+    "cities",
+    sa.column("id", sa.Integer),
+    sa.column("latitude", sa.Float),
+    sa.column("longitude", sa.Float),
+    sa.column("geohash", sa.String),
+)
+
+# Frozen copy of geo_service.encode_geohash as of this version; importing
+# geo_service would pull in the models, metrics and route_service
+GEOHASH_PRECISION = 9
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, value, bits, even = [], 0, 0, True
+    while len(chars) < precision:
+        span, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            value, bits = 0, 0
+    return "".join(chars)
+
+
+def upgrade(op):
+    op.add_column("cities", "geohash", sa.String(12))
+    op.create_index("ix_cities_geohash", "cities", ["geohash"])
+    if op.dry_run:
+        return
+
+    update = cities.update().where(cities.c.id == sa.bindparam("row_id")).values(geohash=sa.bindparam("geohash"))
+    last_id = 0
+    while True:
+        rows = op.connection.execute(
+            sa.select(cities.c.id, cities.c.latitude, cities.c.longitude)
+            .where(cities.c.id > last_id, cities.c.geohash.is_(None),
+                   cities.c.latitude.isnot(None), cities.c.longitude.isnot(None))
+            .order_by(cities.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        op.connection.execute(update, [
+            {"row_id": row.id, "geohash": encode_geohash(row.latitude, row.longitude)} for row in rows
+        ])
+        last_id = rows[-1].id
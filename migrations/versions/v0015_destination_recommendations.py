@@ -0,0 +1,60 @@
+"""Destination co-occurrence, tag affinities and per-user recommendations"""
+
+import sqlalchemy as sa
+
+VERSION = 15
+DESCRIPTION = "destination recommendation tables"
+
+metadata = sa.MetaData()
+
+# Created by v0001; declared so the foreign key resolves
+sa.Table("user", metadata, sa.Column("id", sa.Integer, primary_key=True))
+
+destination_stats = sa.Table(
+    "destination_stats",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("key", sa.String(120), nullable=False, unique=True),
+    sa.Column("name", sa.String(120), nullable=False),
+    sa.Column("country", sa.String(120), nullable=True),
+    sa.Column("travellers", sa.Integer, nullable=False, index=True),
+)
+
+destination_pairs = sa.Table(
+    "destination_pairs",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("destination", sa.String(120), nullable=False, index=True),
+    sa.Column("other", sa.String(120), nullable=False),
+    sa.Column("count", sa.Integer, nullable=False),
+    sa.Column("weight", sa.Float, nullable=False),
+)
+
+destination_tag_affinities = sa.Table(
+    "destination_tag_affinities",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("tag", sa.String(50), nullable=False, index=True),
+    sa.Column("destination", sa.String(120), nullable=False),
+    sa.Column("weight", sa.Float, nullable=False),
+)
+
+user_recommendations = sa.Table(
+    "user_recommendations",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("rank", sa.Integer, nullable=False),
+    sa.Column("destination", sa.String(120), nullable=False),
+    sa.Column("name", sa.String(120), nullable=False),
+    sa.Column("country", sa.String(120), nullable=True),
+    sa.Column("score", sa.Float, nullable=False),
+    sa.Column("reason", sa.String(200), nullable=True),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+)
+
+
+def upgrade(op):
+    for table in (destination_stats, destination_pairs, destination_tag_affinities, user_recommendations):
+        op.create_table(table)
+    op.create_index("ix_user_recommendations_user_rank", "user_recommendations", ["user_id", "rank"])
@@ -0,0 +1,100 @@
+"""Time-decayed destination popularity, seeded from existing trips and wishlists.
+
+The seeding is a frozen copy of popularity_service.rebuild as of this
+version, so the migration does not depend on today's models or scoring.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+import sqlalchemy as sa
+
+VERSION = 16
+DESCRIPTION = "destination_popularity"
+
+metadata = sa.MetaData()
+
+destination_popularity = sa.Table(
+    "destination_popularity",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("key", sa.String(120), nullable=False, unique=True),
+    sa.Column("name", sa.String(120), nullable=False),
+    sa.Column("country", sa.String(120), nullable=True),
+    sa.Column("score", sa.Float, nullable=False, index=True),
+    sa.Column("trips", sa.Integer, nullable=False),
+    sa.Column("wishlists", sa.Integer, nullable=False),
+    sa.Column("updated_at", sa.DateTime, nullable=False),
+)
+
+trips = sa.table(
+    "trips",
+    sa.column("id", sa.Integer),
+    sa.column("created_at", sa.DateTime),
+)
+
+destinations = sa.table(
+    "trip_destinations",
+    sa.column("trip_id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("city", sa.String),
+    sa.column("country", sa.String),
+)
+
+wishlist_items = sa.table(
+    "wishlist_items",
+    sa.column("city", sa.String),
+    sa.column("country", sa.String),
+    sa.column("created_at", sa.DateTime),
+)
+
+EPOCH = datetime(2025, 1, 1)
+HALF_LIFE_DAYS = 30
+TRIP_WEIGHT = 1.0
+WISHLIST_WEIGHT = 0.5
+WRITE_CHUNK_SIZE = 1000
+
+
+def destination_key(name):
+    return " ".join((name or "").split()).lower()[:120]
+
+
+def scaled(weight, at):
+    """``weight`` of an event at ``at``, in stored (epoch-scaled) units"""
+    return weight * 2 ** ((at - EPOCH).total_seconds() / 86400 / HALF_LIFE_DAYS)
+
+
+def rebuild(connection, now=None):
+    """Score every destination from existing rows (trip stops dated by their trip's creation)"""
+    now = now or datetime.utcnow()
+    rows = defaultdict(lambda: {"score": 0.0, "trips": 0, "wishlists": 0, "name": None, "country": None})
+    trip_rows = connection.execute(
+        sa.select(sa.func.coalesce(destinations.c.city, destinations.c.name), destinations.c.country,
+                  trips.c.created_at)
+        .join(trips, trips.c.id == destinations.c.trip_id)
+    )
+    wishlist_rows = connection.execute(
+        sa.select(wishlist_items.c.city, wishlist_items.c.country, wishlist_items.c.created_at)
+        .where(wishlist_items.c.city.isnot(None))
+    )
+    for source, is_trip in ((trip_rows, True), (wishlist_rows, False)):
+        for name, country, created_at in source:
+            key = destination_key(name)
+            if not key:
+                continue
+            row = rows[key]
+            row["score"] += scaled(TRIP_WEIGHT if is_trip else WISHLIST_WEIGHT, created_at or now)
+            row["trips" if is_trip else "wishlists"] += 1
+            row["name"] = row["name"] or " ".join(name.split())[:120]
+            row["country"] = row["country"] or (country or "").strip() or None
+
+    values = [{"key": key, "updated_at": now, **row} for key, row in rows.items()]
+    for start in range(0, len(values), WRITE_CHUNK_SIZE):
+        connection.execute(destination_popularity.insert(), values[start:start + WRITE_CHUNK_SIZE])
+
+
+def upgrade(op):
+    created = op.create_table(destination_popularity)
+    if op.dry_run or not created:
+        return
+    rebuild(op.connection)
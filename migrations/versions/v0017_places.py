@@ -0,0 +1,212 @@
+"""Canonical place dictionary; existing trip stops are resolved to it.
+
+The resolver below is a frozen copy of place_service as of this version,
+working on this migration's tables: the live module uses today's models and
+registers a session hook on import.
+"""
+
+import re
+import unicodedata
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+
+VERSION = 17
+DESCRIPTION = "places, place_aliases, trip_destinations.place_id"
+
+metadata = sa.MetaData()
+
+places = sa.Table(
+    "places",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("key", sa.String(250), nullable=False, unique=True),
+    sa.Column("name", sa.String(120), nullable=False),
+    sa.Column("country", sa.String(120), nullable=True),
+    sa.Column("city_id", sa.Integer, nullable=True, index=True),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+)
+
+place_aliases = sa.Table(
+    "place_aliases",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("alias", sa.String(250), nullable=False, unique=True),
+    sa.Column("place_id", sa.Integer, sa.ForeignKey("places.id"), nullable=False, index=True),
+)
+
+cities = sa.table(
+    "cities",
+    sa.column("id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("country", sa.String),
+    sa.column("popularity", sa.Integer),
+)
+
+destinations = sa.table(
+    "trip_destinations",
+    sa.column("id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("city", sa.String),
+    sa.column("country", sa.String),
+    sa.column("city_id", sa.Integer),
+    sa.column("place_id", sa.Integer),
+)
+
+BATCH_SIZE = 1000
+NAME_LENGTH = 120
+
+_PUNCTUATION = re.compile(r"[^\w\s'-]+")
+
+
+def normalize(text):
+    """Case-, accent-, punctuation- and spacing-insensitive form of a name"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_PUNCTUATION.sub(" ", text.casefold()).split())[:NAME_LENGTH]
+
+
+def split_place(name, country=None):
+    """``(name, country)`` as typed -> display name and country"""
+    parts = [" ".join(part.split()) for part in (name or "").split(",")]
+    parts = [part for part in parts if part]
+    if not parts:
+        return "", None
+    country = " ".join((country or "").split()) or (parts[-1] if len(parts) > 1 else "")
+    return parts[0][:NAME_LENGTH], country[:NAME_LENGTH] or None
+
+
+def place_key(name, country=None):
+    """Alias form: ``"goa|india"``, or ``"goa"`` without a country"""
+    name, country = normalize(name), normalize(country)
+    return f"{name}|{country}" if country else name
+
+
+def _insert_ignoring_duplicates(connection, table):
+    if connection.dialect.name == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if connection.dialect.name == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return sa.insert(table)
+
+
+def _lookup(connection, keys):
+    """``{alias: (place_id, city_id, normalised country)}``"""
+    rows = connection.execute(
+        sa.select(place_aliases.c.alias, places.c.id, places.c.city_id, places.c.country)
+        .join(places, places.c.id == place_aliases.c.place_id)
+        .where(place_aliases.c.alias.in_(keys))
+    )
+    return {alias: (place_id, city_id, normalize(country)) for alias, place_id, city_id, country in rows}
+
+
+def _match(found, name, country):
+    exact = found.get(place_key(name, country))
+    if exact or not country:
+        return exact
+    bare = found.get(place_key(name))
+    if bare and bare[2] in ("", normalize(country)):
+        return bare
+    return None
+
+
+def _catalog_matches(connection, new_places):
+    """``{key: (city_id, name, country)}`` of catalog cities matching new places"""
+    names = {name.lower() for name, _ in new_places.values()}
+    candidates = connection.execute(
+        sa.select(cities.c.id, cities.c.name, cities.c.country)
+        .where(sa.func.lower(cities.c.name).in_(names))
+        .order_by(cities.c.popularity.desc(), cities.c.id)
+    ).all()
+    matches = {}
+    for key, (name, country) in new_places.items():
+        for city_id, city_name, city_country in candidates:
+            if normalize(city_name) == normalize(name) and (not country or normalize(city_country) == normalize(country)):
+                matches[key] = (city_id, city_name, city_country)
+                break
+    return matches
+
+
+def _create(connection, new_places):
+    """Insert ``{key: (name, country)}`` places and their aliases"""
+    now = datetime.utcnow()
+    catalog = _catalog_matches(connection, new_places)
+    rows = []
+    for key, (name, country) in new_places.items():
+        city_id, name, country = catalog.get(key, (None, name, country))
+        rows.append({"key": key, "name": name, "country": country, "city_id": city_id, "created_at": now})
+    connection.execute(_insert_ignoring_duplicates(connection, places), rows)
+
+    ids = dict(connection.execute(sa.select(places.c.key, places.c.id).where(places.c.key.in_(new_places))).all())
+    aliases = {}
+    for key, (name, country) in new_places.items():
+        aliases.setdefault(key, ids[key])
+        # The first place of a name also answers for the bare name
+        aliases.setdefault(place_key(name), ids[key])
+    connection.execute(_insert_ignoring_duplicates(connection, place_aliases),
+                       [{"alias": alias, "place_id": place_id} for alias, place_id in aliases.items()])
+
+
+def resolve(connection, typed_places):
+    """``{(name, country): (place_id, city_id)}``, creating missing places"""
+    wanted = {}
+    for typed in dict.fromkeys(typed_places):
+        name, country = split_place(*typed)
+        if normalize(name):
+            wanted[typed] = (name, country)
+    if not wanted:
+        return {}
+
+    keys = {place_key(name, country) for name, country in wanted.values()}
+    keys |= {place_key(name) for name, _ in wanted.values()}
+    found = _lookup(connection, keys)
+    missing = {}
+    for name, country in wanted.values():
+        if _match(found, name, country) is None:
+            missing.setdefault(place_key(name, country), (name, country))
+    # "Paris" and "Paris, France" first seen together are one place
+    with_country = {place_key(name) for name, country in missing.values() if country}
+    missing = {key: place for key, place in missing.items() if place[1] or key not in with_country}
+    if missing:
+        _create(connection, missing)
+        found = _lookup(connection, keys)
+    matches = {typed: _match(found, *canonical) for typed, canonical in wanted.items()}
+    return {typed: match[:2] for typed, match in matches.items() if match}
+
+
+def backfill(connection, batch_size=BATCH_SIZE):
+    """Resolve every trip stop without a place, keeping ``city_id`` values already set"""
+    update = destinations.update().where(destinations.c.id == sa.bindparam("row_id")).values(
+        place_id=sa.bindparam("b_place"),
+        city_id=sa.func.coalesce(destinations.c.city_id, sa.bindparam("b_city")),
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(destinations.c.id, destinations.c.name, destinations.c.city, destinations.c.country)
+            .where(destinations.c.id > last_id, destinations.c.place_id.is_(None))
+            .order_by(destinations.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        resolved = resolve(connection, [(row.city or row.name, row.country) for row in rows])
+        updates = []
+        for row in rows:
+            match = resolved.get((row.city or row.name, row.country))
+            if match:
+                updates.append({"row_id": row.id, "b_place": match[0], "b_city": match[1]})
+        if updates:
+            connection.execute(update, updates)
+        last_id = rows[-1].id
+
+
+def upgrade(op):
+    op.create_table(places)
+    op.create_table(place_aliases)
+    op.add_column("trip_destinations", "place_id", sa.Integer(), references="places.id")
+    op.create_index("ix_trip_destinations_place_id", "trip_destinations", ["place_id"])
+    if op.dry_run:
+        return
+    backfill(op.connection)
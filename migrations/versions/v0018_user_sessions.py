@@ -0,0 +1,23 @@
+"""Server-side session store (used when SESSION_BACKEND=database)"""
+
+import sqlalchemy as sa
+
+VERSION = 18
+DESCRIPTION = "user_sessions"
+
+metadata = sa.MetaData()
+
+user_sessions = sa.Table(
+    "user_sessions",
+    metadata,
+    sa.Column("id", sa.String(64), primary_key=True),
+    sa.Column("user_id", sa.Integer, nullable=True, index=True),
+    sa.Column("data", sa.Text, nullable=False),
+    sa.Column("expires_at", sa.DateTime, nullable=False, index=True),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+    sa.Column("updated_at", sa.DateTime, nullable=False),
+)
+
+
+def upgrade(op):
+    op.create_table(user_sessions)
@@ -89,11 +89,25 @@ class Trip(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)  # Add index for sorting
     budget = db.Column(db.Float, nullable=True, index=True)  # Add budget field with index
     priority = db.Column(db.Integer, default=0, nullable=False, index=True)  # Add priority for sorting
+    version = db.Column(db.Integer, nullable=False, default=1)  # Optimistic concurrency token, bumped on every UPDATE
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
+    expenses_version = db.Column(db.Integer, nullable=False, default=0)  # Bumped on expense writes; keys cached summaries
 
     user = db.relationship("User", backref=db.backref("trips", lazy="dynamic", order_by="Trip.created_at.desc()"))
 
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f'<Trip {self.title}>'
+
+    @property
+    def etag(self):
+        """Entity tag for conditional requests; changes whenever the trip is written"""
+        return f"trip-{self.id}-v{self.version}"
+
+    def touch(self):
+        """Mark the trip modified (e.g. after its destinations change) so its version is bumped"""
+        self.updated_at = datetime.utcnow()
     
     @classmethod
     def search_trips(cls, user_id, query=None, status=None, limit=None, offset=0, order_by='created_at', order_dir='desc'):
@@ -149,14 +163,24 @@ class TripDestination(db.Model):
     budget_allocated = db.Column(db.Float, nullable=True)  # Add budget allocation per destination
     budget = db.Column(db.Float, nullable=True)  # Section budget
     date = db.Column(db.Date, nullable=True)  # Add date for when to visit this destination
-    date_range = db.Column(db.String(100), nullable=True)  # Date range string
+    date_range = db.Column(db.String(100), nullable=True)  # Date range as typed, e.g. "2025-03-01 to 2025-03-04"
+    start_date = db.Column(db.Date, nullable=True)  # date_range parsed on save
+    end_date = db.Column(db.Date, nullable=True)
     duration = db.Column(db.String(50), nullable=True)  # Add duration to stay
     description = db.Column(db.Text, nullable=True)  # Add description
-    notes = db.Column(db.Text, nullable=True)  # Activities and other notes as JSON
+    notes = db.Column(db.Text, nullable=True)  # Free-form notes (activities used to be stored here as JSON)
+    activities = db.Column(db.JSON, nullable=True)  # [{"name": ..., "location": ...}, ...]
     city_id = db.Column(db.Integer, nullable=True, index=True)  # Add city_id for relations
+    place_id = db.Column(db.Integer, db.ForeignKey("places.id"), nullable=True, index=True)  # Canonical place, set by place_service
 
     trip = db.relationship("Trip", backref=db.backref("destinations", lazy="dynamic", order_by="TripDestination.order_index.asc()"))
 
+    @property
+    def duration_days(self):
+        if self.start_date and self.end_date:
+            return (self.end_date - self.start_date).days + 1
+        return None
+
     def __repr__(self):
         return f'<TripDestination {self.name}>'
 
@@ -236,6 +260,12 @@ class Notification(db.Model):
     kind = db.Column(db.String(50), nullable=True, index=True)  # Add index for filtering by type
     is_read = db.Column(db.Boolean, default=False, nullable=False, index=True)  # Add index for filtering
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)  # Add index for sorting
+    dedupe_key = db.Column(db.String(200), nullable=True)  # Broadcasts: one row per (user, kind, key)
+
+    # broadcast() inserts with ON CONFLICT DO NOTHING against this (v0013)
+    __table_args__ = (
+        db.Index("ux_notifications_user_kind_key", "user_id", "kind", "dedupe_key", unique=True),
+    )
 
     user = db.relationship("User", backref=db.backref("notifications", lazy="dynamic", order_by="Notification.created_at.desc()"))
 
@@ -362,3 +392,120 @@ class TripExpense(db.Model):
 
     def __repr__(self):
         return f'<TripExpense {self.category}: ₹{self.amount}>'
+
+
+class DestinationStat(db.Model):
+    """Destinations seen in trips and wishlists; rebuilt by recommendation_service"""
+    __tablename__ = "destination_stats"
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(120), nullable=False, unique=True)  # lower(trim(city))
+    name = db.Column(db.String(120), nullable=False)
+    country = db.Column(db.String(120), nullable=True)
+    travellers = db.Column(db.Integer, nullable=False, default=0, index=True)  # Users with it in a trip or wishlist
+
+
+class DestinationPair(db.Model):
+    """Sparse destination co-occurrence: the strongest neighbours of each destination"""
+    __tablename__ = "destination_pairs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    destination = db.Column(db.String(120), nullable=False, index=True)
+    other = db.Column(db.String(120), nullable=False)
+    count = db.Column(db.Integer, nullable=False)  # Users with both
+    weight = db.Column(db.Float, nullable=False)  # count / sqrt(travellers * other travellers)
+
+
+class DestinationTagAffinity(db.Model):
+    """How strongly a preference/wishlist tag goes with a destination"""
+    __tablename__ = "destination_tag_affinities"
+
+    id = db.Column(db.Integer, primary_key=True)
+    tag = db.Column(db.String(50), nullable=False, index=True)
+    destination = db.Column(db.String(120), nullable=False)
+    weight = db.Column(db.Float, nullable=False)
+
+
+class Place(db.Model):
+    """Canonical destination; every spelling seen maps to one via PlaceAlias"""
+    __tablename__ = "places"
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(250), nullable=False, unique=True)  # "name|country" or "name", normalised
+    name = db.Column(db.String(120), nullable=False)
+    country = db.Column(db.String(120), nullable=True)
+    city_id = db.Column(db.Integer, nullable=True, index=True)  # Matching catalog city, if any
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<Place {self.name}, {self.country}>'
+
+
+class PlaceAlias(db.Model):
+    __tablename__ = "place_aliases"
+    id = db.Column(db.Integer, primary_key=True)
+    alias = db.Column(db.String(250), nullable=False, unique=True)  # Normalised spelling, same form as Place.key
+    place_id = db.Column(db.Integer, db.ForeignKey("places.id"), nullable=False, index=True)
+
+
+class DestinationPopularity(db.Model):
+    """Time-decayed interest per destination, maintained by popularity_service"""
+    __tablename__ = "destination_popularity"
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(120), nullable=False, unique=True)  # lower(trim(city))
+    name = db.Column(db.String(120), nullable=False)
+    country = db.Column(db.String(120), nullable=True)
+    score = db.Column(db.Float, nullable=False, default=0.0, index=True)  # Decayed score scaled to the epoch
+    trips = db.Column(db.Integer, nullable=False, default=0)  # Trip stops ever added
+    wishlists = db.Column(db.Integer, nullable=False, default=0)  # Wishlist items ever added
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class UserRecommendation(db.Model):
+    """Precomputed top-k destination suggestions per user"""
+    __tablename__ = "user_recommendations"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)  # Indexed with rank (v0015)
+    rank = db.Column(db.Integer, nullable=False)
+    destination = db.Column(db.String(120), nullable=False)
+    name = db.Column(db.String(120), nullable=False)
+    country = db.Column(db.String(120), nullable=True)
+    score = db.Column(db.Float, nullable=False)
+    reason = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class City(db.Model):
+    __tablename__ = "cities"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, index=True)
+    country = db.Column(db.String(100), nullable=False, index=True)
+    region = db.Column(db.String(100), nullable=True, index=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True, index=True)  # Set from latitude/longitude by geo_service
+    cost_index = db.Column(db.String(20), nullable=False, default="medium", index=True)  # low, medium, high
+    cost_index_value = db.Column(db.Integer, nullable=False, default=50)
+    popularity = db.Column(db.Integer, nullable=False, default=3, index=True)  # 1-5
+    description = db.Column(db.Text, nullable=True)
+    best_time = db.Column(db.String(50), nullable=True)
+    attractions = db.Column(db.Text, nullable=True)  # JSON list of attraction names
+    image_url = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<City {self.name}, {self.country}>'
+
+
+class UserSession(db.Model):
+    """Server-side session (SESSION_BACKEND=database), see session_store"""
+    __tablename__ = "user_sessions"
+    id = db.Column(db.String(64), primary_key=True)  # SHA-256 of the cookie's session id
+    user_id = db.Column(db.Integer, nullable=True, index=True)  # For revoking a user's sessions
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,229 @@
+"""
+Notification reads, mark-read, retention and broadcasts.
+
+Every page render shows the unread badge, so ``unread_count`` is cached per
+user for ``UNREAD_TTL`` seconds. Writes made through this module drop the
+cached count in the worker that made them; other workers catch up within
+the TTL.
+
+``mark_read`` is a single ``UPDATE ... WHERE`` however many rows it flips.
+``purge_read`` deletes read notifications older than the retention period
+in batches, each in its own short transaction, so the table and its indexes
+only hold recent history.
+
+``broadcast`` sends one message to an audience (a SELECT of user ids, see the
+``*_audience`` helpers): recipients are resolved in one query that already
+skips users holding the same ``(kind, dedupe_key)``, then rows are written
+with one executemany INSERT per ``BROADCAST_CHUNK_SIZE`` users. Re-running a
+broadcast is a no-op, so the jobs can be scheduled freely. Run them from cron
+or a scheduler:
+
+    python notification_service.py purge --days 90
+    python notification_service.py trip-reminders
+    python notification_service.py broadcast --wishlist-city Goa --kind deal --key goa-monsoon \\
+        --message "Monsoon deals for Goa are live"
+"""
+
+import argparse
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from metrics import record_cache
+from models import db, Notification, Trip, User, WishlistItem
+
+# Seconds a cached unread count is trusted
+UNREAD_TTL = 30
+# Users whose count is kept in memory (least recently used are evicted)
+UNREAD_CACHE_SIZE = 4096
+RETENTION_DAYS = 90
+PURGE_BATCH_SIZE = 1000
+# Rows per executemany INSERT
+BROADCAST_CHUNK_SIZE = 1000
+
+_unread_cache = OrderedDict()  # user_id -> (expires_at, count)
+_unread_lock = threading.Lock()
+
+
+def unread_count(user_id):
+    now = time.monotonic()
+    with _unread_lock:
+        cached = _unread_cache.get(user_id)
+        if cached and cached[0] > now:
+            _unread_cache.move_to_end(user_id)
+            record_cache("unread_notifications", hit=True)
+            return cached[1]
+
+    record_cache("unread_notifications", hit=False)
+    count = (
+        db.session.query(db.func.count(Notification.id))
+        .filter(Notification.user_id == user_id, Notification.is_read.is_(False))
+        .scalar()
+    )
+    with _unread_lock:
+        _unread_cache[user_id] = (now + UNREAD_TTL, count)
+        _unread_cache.move_to_end(user_id)
+        while len(_unread_cache) > UNREAD_CACHE_SIZE:
+            _unread_cache.popitem(last=False)
+    return count
+
+
+def invalidate_unread(*user_ids):
+    with _unread_lock:
+        for user_id in user_ids:
+            _unread_cache.pop(user_id, None)
+
+
+def clear_unread_cache():
+    with _unread_lock:
+        _unread_cache.clear()
+
+
+def mark_read(user_id, ids=None):
+    """Mark the user's notifications (all, or only ``ids``) read with one
+    UPDATE and return the number of rows changed. Does not commit."""
+    query = Notification.query.filter(Notification.user_id == user_id, Notification.is_read.is_(False))
+    if ids:
+        query = query.filter(Notification.id.in_(ids))
+    updated = query.update({Notification.is_read: True}, synchronize_session=False)
+    invalidate_unread(user_id)
+    return updated
+
+
+def purge_read(days=RETENTION_DAYS, batch_size=PURGE_BATCH_SIZE, now=None):
+    """Delete read notifications older than ``days``, committing per batch.
+
+    Returns the number of rows deleted. Unread notifications are kept
+    whatever their age.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    deleted = 0
+    while True:
+        ids = [
+            notification_id for (notification_id,) in
+            db.session.query(Notification.id)
+            .filter(Notification.is_read.is_(True), Notification.created_at < cutoff)
+            .order_by(Notification.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            return deleted
+        Notification.query.filter(Notification.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+
+
+def active_users_audience():
+    return db.select(User.id).where(User.is_active.is_(True))
+
+
+def trips_starting_audience(day):
+    """Owners of trips starting on ``day`` that are not completed"""
+    return db.select(Trip.user_id).where(Trip.start_date == day, Trip.status != "completed").distinct()
+
+
+def wishlist_city_audience(city):
+    """Users with ``city`` on their wishlist (case-insensitive)"""
+    return (
+        db.select(WishlistItem.user_id)
+        .where(db.func.lower(db.func.trim(WishlistItem.city)) == city.strip().lower())
+        .distinct()
+    )
+
+
+def _insert_ignoring_duplicates():
+    # Two schedulers racing on the same broadcast: the unique
+    # (user_id, kind, dedupe_key) index turns the loser's rows into no-ops
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(Notification).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(Notification).on_conflict_do_nothing()
+    return db.insert(Notification)
+
+
+def broadcast(audience, message, kind, key, chunk_size=BROADCAST_CHUNK_SIZE):
+    """Notify every user selected by ``audience`` once per ``(kind, key)``.
+
+    Returns the number of users notified. Does not commit.
+    """
+    already_sent = (
+        db.select(Notification.id)
+        .where(Notification.user_id == User.id, Notification.kind == kind, Notification.dedupe_key == key)
+        .exists()
+    )
+    user_ids = db.session.scalars(
+        db.select(User.id).where(User.id.in_(audience.scalar_subquery()), ~already_sent).order_by(User.id)
+    ).all()
+
+    insert = _insert_ignoring_duplicates()
+    now = datetime.utcnow()
+    for start in range(0, len(user_ids), chunk_size):
+        rows = [
+            {"user_id": user_id, "message": message, "kind": kind, "dedupe_key": key,
+             "is_read": False, "created_at": now}
+            for user_id in user_ids[start:start + chunk_size]
+        ]
+        db.session.execute(insert, rows)
+    invalidate_unread(*user_ids)
+    return len(user_ids)
+
+
+def send_trip_reminders(day=None):
+    """Tell owners of trips starting tomorrow (or on ``day``); once per day"""
+    day = day or date.today() + timedelta(days=1)
+    return broadcast(
+        trips_starting_audience(day),
+        "Your trip starts tomorrow. Time to pack!" if day == date.today() + timedelta(days=1)
+        else f"Your trip starts on {day.isoformat()}.",
+        kind="trip_reminder", key=f"trip-start-{day.isoformat()}",
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="notification_service.py", description="Notification maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    purge = commands.add_parser("purge", help="delete old read notifications")
+    purge.add_argument("--days", type=int, default=RETENTION_DAYS, help="keep read notifications this many days")
+    purge.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE)
+    reminders = commands.add_parser("trip-reminders", help="notify owners of trips starting tomorrow")
+    reminders.add_argument("--date", type=date.fromisoformat, help="trip start date (default: tomorrow)")
+    send = commands.add_parser("broadcast", help="send one message to an audience")
+    audience = send.add_mutually_exclusive_group(required=True)
+    audience.add_argument("--all", action="store_true", help="every active user")
+    audience.add_argument("--wishlist-city", metavar="CITY")
+    audience.add_argument("--trips-starting", metavar="YYYY-MM-DD", type=date.fromisoformat)
+    send.add_argument("--message", required=True)
+    send.add_argument("--kind", default="info")
+    send.add_argument("--key", required=True, help="users who already got this (kind, key) are skipped")
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "purge":
+            deleted = purge_read(days=args.days, batch_size=args.batch_size)
+            print(f"Deleted {deleted} read notification(s) older than {args.days} days")
+            return 0
+        if args.command == "trip-reminders":
+            sent = send_trip_reminders(args.date)
+        else:
+            if args.all:
+                selected = active_users_audience()
+            elif args.wishlist_city:
+                selected = wishlist_city_audience(args.wishlist_city)
+            else:
+                selected = trips_starting_audience(args.trips_starting)
+            sent = broadcast(selected, args.message, args.kind, args.key)
+        db.session.commit()
+    print(f"Notified {sent} user(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
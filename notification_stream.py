@@ -0,0 +1,398 @@
+"""
+Server-sent event stream of new notifications (``/api/notifications/stream``).
+
+Each worker keeps an in-process ``Broker`` of open streams, keyed by user.
+One ``Dispatcher`` thread per worker (started with the first stream) finds
+new ``notifications`` rows and hands them to the broker, so the database sees
+one query per worker per wake-up instead of one per open tab. What wakes the
+dispatcher is pluggable:
+
+- ``ListenBackend`` (PostgreSQL): ``LISTEN`` on a dedicated connection. Every
+  INSERT into ``notifications`` fires ``NOTIFY`` from a statement trigger
+  (migration v0011), so writes from any worker or script wake every worker.
+- ``PollingBackend`` (SQLite and anything else): a timer.
+
+Either way the dispatcher reads new rows by primary key; missed wake-ups
+cost latency, never events. Ids are handed out at INSERT but rows become
+visible at COMMIT, so on PostgreSQL a lower id can show up after a higher one
+was read. Each scan therefore looks ``RESCAN_IDS`` back from the newest id
+seen and skips the ids already delivered.
+
+Streams resume: every event carries the notification id, browsers send it
+back as ``Last-Event-ID`` when they reconnect, and the missed rows are
+replayed. Comments are sent as heartbeats so proxies keep the connection
+open and dead clients are noticed.
+
+Streams are meant for the gevent gunicorn profile, where one costs a
+greenlet and a worker holds hundreds. Each worker accepts at most
+``NOTIFICATION_STREAMS_PER_WORKER`` streams (extra clients get a 503 and the
+page retries with backoff) and closes streams after ``MAX_STREAM_SECONDS``;
+the browser reconnects and resumes from its last id. Under the threaded
+profile that cap is a fallback that keeps half the threads for ordinary
+requests. The slot is given back when the response is closed, even if its
+body was never read. The stream never holds a database connection while it
+waits.
+"""
+
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from collections import defaultdict
+
+from metrics import NOTIFICATION_STREAMS
+from models import db, Notification
+
+logger = logging.getLogger("globetrotter.notifications")
+
+CHANNEL = "globetrotter_notifications"  # Also written into the v0011 trigger
+HEARTBEAT_SECONDS = 15
+MAX_STREAM_SECONDS = 300
+# Browser reconnect delay after a stream ends
+RETRY_MS = 3000
+POLL_INTERVAL = 2.0
+# LISTEN wake-ups can be lost while the connection is re-established
+LISTEN_SAFETY_INTERVAL = 30.0
+FETCH_BATCH = 500
+# How far behind the newest id each scan looks for late-committed rows
+RESCAN_IDS = 100
+# Events replayed on resume; beyond that the client is told to reload
+BACKLOG_LIMIT = 100
+# Undelivered events per stream before it is closed (the client resumes)
+QUEUE_SIZE = 100
+DEFAULT_STREAMS_PER_WORKER = 50
+
+
+def notification_event(row):
+    return {
+        "id": row.id,
+        "message": row.message,
+        "kind": row.kind,
+        "is_read": row.is_read,
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+def format_event(data, event=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    __slots__ = ("user_id", "queue", "overflowed")
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broker:
+    """In-process pub/sub: user id -> open streams"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, item):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.put(item)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+class PollingBackend:
+    """Wakes the dispatcher on a timer"""
+
+    interval = POLL_INTERVAL
+
+    def __init__(self, engine):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+    def close(self):
+        pass
+
+
+class ListenBackend:
+    """Wakes the dispatcher on PostgreSQL ``NOTIFY``"""
+
+    interval = LISTEN_SAFETY_INTERVAL
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._connection = None
+
+    def _connect(self):
+        raw = self._engine.raw_connection()
+        raw.detach()  # A permanent LISTEN connection must not count against the pool
+        connection = raw.driver_connection
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        self._connection = connection
+
+    def wait(self, timeout):
+        try:
+            if self._connection is None:
+                self._connect()
+            if select.select([self._connection], [], [], timeout)[0]:
+                self._connection.poll()
+                self._connection.notifies.clear()
+        except Exception:
+            logger.warning("LISTEN connection lost; reconnecting", exc_info=True)
+            self.close()
+            time.sleep(POLL_INTERVAL)
+
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+
+BACKENDS = {"postgresql": ListenBackend}
+
+
+class Dispatcher:
+    """Moves new notification rows into the broker (one thread per worker)"""
+
+    def __init__(self, app, broker, backend_class=None):
+        self.app = app
+        self.broker = broker
+        self.backend_class = backend_class
+        self.last_id = None  # Newest id seen; None while nobody is listening
+        self._recent = set()  # Ids delivered within RESCAN_IDS of last_id
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def subscribe(self, user_id):
+        """Called inside a request, before the stream reads its backlog; rows
+        after the current maximum id are delivered by the dispatcher"""
+        with self._lock:
+            subscription = self.broker.subscribe(user_id)
+            if self.last_id is None:
+                try:
+                    last_id = db.session.query(db.func.max(Notification.id)).scalar() or 0
+                    self._recent = set(db.session.scalars(
+                        db.select(Notification.id).where(Notification.id > last_id - RESCAN_IDS)
+                    ))
+                    self.last_id = last_id
+                except Exception:
+                    self.broker.unsubscribe(subscription)
+                    raise
+            if self._thread is None or self._pid != os.getpid():
+                # Also after a fork: threads do not survive it
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def _run(self):
+        with self.app.app_context():
+            engine = db.engine
+            backend_class = self.backend_class or BACKENDS.get(engine.dialect.name, PollingBackend)
+            backend = backend_class(engine)
+            while True:
+                backend.wait(backend.interval)
+                try:
+                    self.dispatch(engine)
+                except Exception:
+                    logger.exception("Notification dispatch failed")
+
+    def dispatch(self, engine):
+        with self._lock:
+            if not len(self.broker):
+                self.last_id = None
+                self._recent = set()
+                return
+            last_id = self.last_id
+            recent = set(self._recent)
+        if last_id is None:
+            return
+        table = Notification.__table__
+        with engine.connect() as connection:
+            while True:
+                floor = last_id - RESCAN_IDS
+                recent = {row_id for row_id in recent if row_id > floor}
+                query = db.select(table).where(table.c.id > floor)
+                if recent:
+                    query = query.where(table.c.id.notin_(recent))
+                rows = connection.execute(query.order_by(table.c.id).limit(FETCH_BATCH)).all()
+                for row in rows:
+                    self.broker.publish(row.user_id, notification_event(row))
+                recent.update(row.id for row in rows)
+                if rows:
+                    last_id = max(last_id, rows[-1].id)
+                with self._lock:
+                    if self.last_id is not None:
+                        self.last_id = max(self.last_id, last_id)
+                        self._recent = {row_id for row_id in self._recent | recent if row_id > self.last_id - RESCAN_IDS}
+                if len(rows) < FETCH_BATCH:
+                    break
+
+
+class Stream:
+    """Response body of one open stream. ``release`` gives back the slot and
+    the subscription; it runs when the response is closed, so a body that is
+    never iterated (client gone, HEAD) does not hold them."""
+
+    def __init__(self, streams, subscription, opening, last_id, known):
+        self.streams = streams
+        self.subscription = subscription
+        self.opening = opening
+        self.last_id = last_id
+        self.known = known
+        self._released = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self.streams._events(self)
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.streams.broker.unsubscribe(self.subscription)
+        self.streams._slots.release()
+
+
+class NotificationStreams:
+    def __init__(self, app):
+        self.broker = Broker()
+        self.dispatcher = Dispatcher(app, self.broker)
+        limit = app.config.get("NOTIFICATION_STREAMS_PER_WORKER") or os.environ.get(
+            "NOTIFICATION_STREAMS_PER_WORKER", DEFAULT_STREAMS_PER_WORKER
+        )
+        self.limit = int(limit)
+        self.max_seconds = app.config.get("NOTIFICATION_STREAM_SECONDS", MAX_STREAM_SECONDS)
+        self.heartbeat = app.config.get("NOTIFICATION_HEARTBEAT_SECONDS", HEARTBEAT_SECONDS)
+        self._slots = threading.BoundedSemaphore(self.limit) if self.limit > 0 else None
+
+    def open(self, user_id, last_event_id=None):
+        """``Stream`` for one client, or ``None`` when this worker is full.
+
+        All database work happens here, inside the request; the stream only
+        waits on the broker. The caller must ``release`` it when the response
+        is closed.
+        """
+        if self._slots is None or not self._slots.acquire(blocking=False):
+            return None
+        try:
+            subscription = self.dispatcher.subscribe(user_id)
+            try:
+                opening = self._opening_events(user_id, last_event_id)
+            except Exception:
+                self.broker.unsubscribe(subscription)
+                raise
+        except Exception:
+            self._slots.release()
+            raise
+        finally:
+            db.session.remove()  # Give the connection back before streaming
+        return Stream(self, subscription, *opening)
+
+    def _opening_events(self, user_id, last_event_id):
+        """``(events, last id, known ids)``; known ids are the user's rows near
+        the last id that the client already has or counted, which the stream
+        must not send again when the dispatcher rescans them"""
+        base = Notification.query.filter(Notification.user_id == user_id)
+        unread = base.filter(Notification.is_read.is_(False)).count()
+        if last_event_id is None:
+            last_id = base.with_entities(db.func.max(Notification.id)).scalar() or 0
+            events = [format_event({"unread": unread}, "ready", last_id)]
+        else:
+            missed = base.filter(Notification.id > last_event_id).order_by(Notification.id.desc()).limit(BACKLOG_LIMIT + 1).all()
+            if len(missed) > BACKLOG_LIMIT:
+                # Too far behind to replay; the client reloads its list instead
+                last_id = missed[0].id
+                events = [format_event({"unread": unread}, "resync", last_id)]
+            else:
+                last_id = max([last_event_id] + [n.id for n in missed])
+                events = [format_event({"unread": unread}, "ready")]
+                events += [format_event(notification_event(n), "notification", n.id) for n in reversed(missed)]
+        known = {row_id for (row_id,) in base.filter(Notification.id > last_id - RESCAN_IDS).with_entities(Notification.id)}
+        return events, last_id, known
+
+    def _events(self, stream):
+        subscription, last_id, known = stream.subscription, stream.last_id, stream.known
+        floor = last_id - RESCAN_IDS
+        NOTIFICATION_STREAMS.inc()
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            yield from stream.opening
+            deadline = time.monotonic() + self.max_seconds
+            while not subscription.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                item = subscription.get(timeout=min(self.heartbeat, remaining))
+                if item is None:
+                    yield ": ping\n\n"
+                elif item["id"] > floor and item["id"] not in known:
+                    known.add(item["id"])
+                    # The event id is what the browser resumes from, so it never goes back
+                    last_id = max(last_id, item["id"])
+                    yield format_event(item, "notification", last_id)
+        finally:
+            NOTIFICATION_STREAMS.dec()
+            stream.release()
+
+
+def parse_last_event_id(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def init_notification_stream(app):
+    app.extensions["notification_stream"] = NotificationStreams(app)
+
+
+def notification_streams(app):
+    return app.extensions["notification_stream"]
@@ -0,0 +1,288 @@
+"""
+Per-request performance instrumentation.
+
+``init_perf(app)`` hooks:
+
+- SQLAlchemy ``before_cursor_execute``/``after_cursor_execute`` on every
+  engine, counting statements and database time;
+- outbound ``requests`` calls (and aiohttp sessions created with
+  ``aiohttp_trace_config()``), timing each upstream call;
+- Flask's template signals, timing template rendering.
+
+Each request's totals are sent back in a ``Server-Timing`` header (visible in
+the browser's network panel), logged as one JSON line on the
+``globetrotter.perf`` logger and aggregated per endpoint for the admin
+``/admin/perf`` page. Aggregates are per worker process and reset on restart.
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("globetrotter.perf")
+
+# Latency samples kept per endpoint for percentiles
+SAMPLES_PER_ENDPOINT = 500
+# Endpoints not worth timing
+IGNORED_ENDPOINTS = {"static"}
+
+
+class RequestTimings:
+    """What one request spent, filled in by the hooks below"""
+
+    __slots__ = ("started", "db_queries", "db_ms", "external", "template_ms", "_template_started")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.external = []  # (upstream host, ms, ok)
+        self.template_ms = 0.0
+        self._template_started = None
+
+    @property
+    def external_ms(self):
+        return sum(ms for _, ms, _ in self.external)
+
+    @property
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+def current_timings():
+    """Timings of the request being handled, or None outside a request"""
+    if not has_request_context():
+        return None
+    return g.get("perf")
+
+
+class EndpointStats:
+    """Aggregated timings per endpoint (this process only)"""
+
+    def __init__(self, sample_size=SAMPLES_PER_ENDPOINT):
+        self._lock = threading.Lock()
+        self._sample_size = sample_size
+        self._endpoints = {}
+
+    def record(self, endpoint, status, timings, elapsed_ms):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    "count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "db_queries": 0,
+                    "db_ms": 0.0, "external_ms": 0.0, "template_ms": 0.0,
+                    "samples": deque(maxlen=self._sample_size),
+                }
+            stats["count"] += 1
+            stats["errors"] += status >= 500
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["db_queries"] += timings.db_queries
+            stats["db_ms"] += timings.db_ms
+            stats["external_ms"] += timings.external_ms
+            stats["template_ms"] += timings.template_ms
+            stats["samples"].append(elapsed_ms)
+
+    def slowest(self, limit=25):
+        """Endpoints ordered by p95 latency, slowest first"""
+        with self._lock:
+            rows = []
+            for endpoint, stats in self._endpoints.items():
+                samples = sorted(stats["samples"])
+                count = stats["count"]
+                rows.append({
+                    "endpoint": endpoint,
+                    "count": count,
+                    "errors": stats["errors"],
+                    "avg_ms": round(stats["total_ms"] / count, 1),
+                    "p50_ms": round(samples[len(samples) // 2], 1),
+                    "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+                    "max_ms": round(stats["max_ms"], 1),
+                    "avg_queries": round(stats["db_queries"] / count, 1),
+                    "avg_db_ms": round(stats["db_ms"] / count, 1),
+                    "avg_external_ms": round(stats["external_ms"] / count, 1),
+                    "avg_template_ms": round(stats["template_ms"] / count, 1),
+                })
+        rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+endpoint_stats = EndpointStats()
+
+
+# --- SQLAlchemy ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, not the connection: a failed statement
+    # never reaches after_cursor_execute, and its context is simply dropped
+    context._perf_query_start = time.perf_counter()
+
+
+def _record_query(context):
+    started = getattr(context, "_perf_query_start", None)
+    if started is None:
+        return
+    del context._perf_query_start
+    timings = current_timings()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.db_ms += (time.perf_counter() - started) * 1000
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(context)
+
+
+def _handle_error(exception_context):
+    # Failed statements still took database time
+    if exception_context.execution_context is not None:
+        _record_query(exception_context.execution_context)
+
+
+# --- Outbound HTTP ---
+
+# Called with (host, elapsed_ms, ok) for every outbound call, in a request or not
+external_observers = []
+
+
+def record_external(host, elapsed_ms, ok):
+    host = host or "unknown"
+    for observer in external_observers:
+        observer(host, elapsed_ms, ok)
+    timings = current_timings()
+    if timings is not None:
+        timings.external.append((host, elapsed_ms, ok))
+
+
+def _wrap_requests():
+    import requests
+
+    original = requests.Session.request
+    if getattr(original, "_perf_wrapped", False):
+        return
+
+    def request(self, method, url, *args, **kwargs):
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = original(self, method, url, *args, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally:
+            record_external(urlsplit(url).hostname, (time.perf_counter() - started) * 1000, ok)
+
+    request._perf_wrapped = True
+    requests.Session.request = request
+
+
+def aiohttp_trace_config():
+    """TraceConfig for ``aiohttp.ClientSession(trace_configs=[...])``"""
+    import aiohttp
+
+    async def on_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_end(session, context, params):
+        ok = params.response.status < 500
+        record_external(params.url.host, (time.perf_counter() - context.started) * 1000, ok)
+
+    async def on_exception(session, context, params):
+        record_external(params.url.host, (time.perf_counter() - context.started) * 1000, False)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_start)
+    trace_config.on_request_end.append(on_end)
+    trace_config.on_request_exception.append(on_exception)
+    return trace_config
+
+
+# --- Templates ---
+
+def _before_render(sender, template, context, **extra):
+    timings = current_timings()
+    if timings is not None:
+        timings._template_started = time.perf_counter()
+
+
+def _rendered(sender, template, context, **extra):
+    timings = current_timings()
+    if timings is not None and timings._template_started is not None:
+        timings.template_ms += (time.perf_counter() - timings._template_started) * 1000
+        timings._template_started = None
+
+
+# --- Request lifecycle ---
+
+def server_timing(timings, elapsed_ms):
+    """Server-Timing header value for one request"""
+    external_calls = len(timings.external)
+    return ", ".join([
+        f'db;dur={timings.db_ms:.1f};desc="{timings.db_queries} queries"',
+        f'ext;dur={timings.external_ms:.1f};desc="{external_calls} calls"',
+        f"tpl;dur={timings.template_ms:.1f}",
+        f"total;dur={elapsed_ms:.1f}",
+    ])
+
+
+def _start_request():
+    g.perf = RequestTimings()
+
+
+def _finish_request(response):
+    timings = g.get("perf")
+    endpoint = request.endpoint or "unmatched"
+    if timings is None or endpoint in IGNORED_ENDPOINTS:
+        return response
+    elapsed_ms = timings.elapsed_ms
+
+    from flask import current_app
+    if current_app.config.get("PERF_SERVER_TIMING", True):
+        response.headers["Server-Timing"] = server_timing(timings, elapsed_ms)
+    endpoint_stats.record(endpoint, response.status_code, timings, elapsed_ms)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({
+            "event": "request",
+            "method": request.method,
+            "path": request.path,
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "duration_ms": round(elapsed_ms, 1),
+            "db_queries": timings.db_queries,
+            "db_ms": round(timings.db_ms, 1),
+            "external_calls": len(timings.external),
+            "external_ms": round(timings.external_ms, 1),
+            "template_ms": round(timings.template_ms, 1),
+        }))
+    return response
+
+
+def init_perf(app):
+    """Install the hooks; safe to call once per application"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+    _wrap_requests()
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+    if app.config.get("PERF_LOG_REQUESTS", True) and not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
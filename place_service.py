@@ -0,0 +1,269 @@
+"""
+Canonical places for free-text trip destinations.
+
+Trip stops are typed by hand, so "Goa", "goa " and "Goa, India" are one
+place spelled three ways. ``places`` holds one row per canonical place,
+and ``place_aliases`` maps every normalised spelling to one of them.
+
+- ``normalize`` folds case, accents, punctuation and spacing, so "GOA."
+  and " goa" both become "goa".
+- ``split_place`` takes a trailing country off a name when no country was
+  given ("Goa, India" becomes "Goa" and "India").
+- Lookups try "name|country" first, then the bare name. A stop without a
+  country therefore joins the existing place of that name. A bare-name
+  place never claims a stop from a different country.
+
+New places are linked to the ``cities`` catalog by name (and country) when
+a catalog city matches. They take its spelling and set ``Place.city_id``.
+
+A session ``before_flush`` hook resolves new or renamed ``TripDestination``
+objects with one alias query per flush, plus one insert for places not seen
+before. It fills ``place_id``, and also ``city_id`` unless that was set
+explicitly. Aggregations such as ``places_visited`` count ``place_id``
+instead of folding strings in Python. Rows written before this existed are
+resolved by:
+
+    python place_service.py backfill
+"""
+
+import argparse
+import re
+import sys
+import unicodedata
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import db, City, Place, PlaceAlias, Trip, TripDestination
+
+BATCH_SIZE = 1000
+NAME_LENGTH = 120
+
+_PUNCTUATION = re.compile(r"[^\w\s'-]+")
+
+
+def normalize(text):
+    """Case-, accent-, punctuation- and spacing-insensitive form of a name"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_PUNCTUATION.sub(" ", text.casefold()).split())[:NAME_LENGTH]
+
+
+def split_place(name, country=None):
+    """``(name, country)`` as typed -> display name and country.
+
+    ``("Goa, India", None)`` -> ``("Goa", "India")``; a given country wins
+    over the one in the name.
+    """
+    parts = [" ".join(part.split()) for part in (name or "").split(",")]
+    parts = [part for part in parts if part]
+    if not parts:
+        return "", None
+    country = " ".join((country or "").split()) or (parts[-1] if len(parts) > 1 else "")
+    return parts[0][:NAME_LENGTH], country[:NAME_LENGTH] or None
+
+
+def place_key(name, country=None):
+    """Alias form: ``"goa|india"``, or ``"goa"`` without a country"""
+    name, country = normalize(name), normalize(country)
+    return f"{name}|{country}" if country else name
+
+
+def _insert_ignoring_duplicates(connection, model):
+    # Two requests creating the same place: the unique key makes the
+    # loser's rows no-ops, and both read the winner's id back
+    if connection.dialect.name == "postgresql":
+        return postgresql.insert(model).on_conflict_do_nothing()
+    if connection.dialect.name == "sqlite":
+        return sqlite.insert(model).on_conflict_do_nothing()
+    return db.insert(model)
+
+
+def _lookup(connection, keys):
+    """``{alias: (place_id, city_id, normalised country)}``"""
+    rows = connection.execute(
+        db.select(PlaceAlias.alias, Place.id, Place.city_id, Place.country)
+        .join(Place, Place.id == PlaceAlias.place_id)
+        .where(PlaceAlias.alias.in_(keys))
+    )
+    return {alias: (place_id, city_id, normalize(country)) for alias, place_id, city_id, country in rows}
+
+
+def _match(found, name, country):
+    exact = found.get(place_key(name, country))
+    if exact or not country:
+        return exact
+    # "Goa, India" may join a place known only as "Goa", unless that place
+    # is in another country
+    bare = found.get(place_key(name))
+    if bare and bare[2] in ("", normalize(country)):
+        return bare
+    return None
+
+
+def _catalog_matches(connection, places):
+    """``{key: (city_id, name, country)}`` of catalog cities matching new places"""
+    names = {name.lower() for name, _ in places.values()}
+    candidates = connection.execute(
+        db.select(City.id, City.name, City.country)
+        .where(db.func.lower(City.name).in_(names))
+        .order_by(City.popularity.desc(), City.id)
+    ).all()
+    matches = {}
+    for key, (name, country) in places.items():
+        for city_id, city_name, city_country in candidates:
+            if normalize(city_name) == normalize(name) and (not country or normalize(city_country) == normalize(country)):
+                matches[key] = (city_id, city_name, city_country)
+                break
+    return matches
+
+
+def _create(connection, places):
+    """Insert ``{key: (name, country)}`` places and their aliases"""
+    now = datetime.utcnow()
+    catalog = _catalog_matches(connection, places)
+    rows = []
+    for key, (name, country) in places.items():
+        city_id, name, country = catalog.get(key, (None, name, country))
+        rows.append({"key": key, "name": name, "country": country, "city_id": city_id, "created_at": now})
+    connection.execute(_insert_ignoring_duplicates(connection, Place), rows)
+
+    ids = dict(connection.execute(db.select(Place.key, Place.id).where(Place.key.in_(places))).all())
+    aliases = {}
+    for key, (name, country) in places.items():
+        aliases.setdefault(key, ids[key])
+        # The first place of a name also answers for the bare name
+        aliases.setdefault(place_key(name), ids[key])
+    connection.execute(_insert_ignoring_duplicates(connection, PlaceAlias),
+                       [{"alias": alias, "place_id": place_id} for alias, place_id in aliases.items()])
+
+
+def resolve(connection, destinations):
+    """``{(name, country): (place_id, city_id)}`` for typed ``(name, country)``
+    pairs, creating the places that do not exist yet. Unusable names
+    (blank or punctuation only) are left out."""
+    wanted = {}
+    for typed in dict.fromkeys(destinations):
+        name, country = split_place(*typed)
+        if normalize(name):
+            wanted[typed] = (name, country)
+    if not wanted:
+        return {}
+
+    keys = {place_key(name, country) for name, country in wanted.values()}
+    keys |= {place_key(name) for name, _ in wanted.values()}
+    found = _lookup(connection, keys)
+    missing = {}
+    for name, country in wanted.values():
+        if _match(found, name, country) is None:
+            missing.setdefault(place_key(name, country), (name, country))
+    # "Paris" and "Paris, France" first seen together are one place
+    with_country = {place_key(name) for name, country in missing.values() if country}
+    missing = {key: place for key, place in missing.items() if place[1] or key not in with_country}
+    if missing:
+        _create(connection, missing)
+        found = _lookup(connection, keys)
+    matches = {typed: _match(found, *canonical) for typed, canonical in wanted.items()}
+    return {typed: match[:2] for typed, match in matches.items() if match}
+
+
+def _typed(destination):
+    return destination.city or destination.name, destination.country
+
+
+def _renamed(destination):
+    attrs = db.inspect(destination).attrs
+    return any(attrs[name].history.has_changes() for name in ("name", "city", "country"))
+
+
+def _resolve_destinations(session, flush_context, instances):
+    pending = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, TripDestination) and (obj in session.new or obj.place_id is None or _renamed(obj))
+    ]
+    if not pending:
+        return
+    resolved = resolve(session.connection(), [_typed(destination) for destination in pending])
+    for destination in pending:
+        place_id, city_id = resolved.get(_typed(destination), (None, None))
+        destination.place_id = place_id
+        if not db.inspect(destination).attrs.city_id.history.has_changes():
+            destination.city_id = city_id
+
+
+db.event.listen(Session, "before_flush", _resolve_destinations)
+
+
+def backfill(connection, batch_size=BATCH_SIZE):
+    """Resolve every trip stop without a place. Keeps ``city_id`` values that
+    are already set. Returns the number of stops resolved."""
+    table = TripDestination.__table__
+    update = table.update().where(table.c.id == db.bindparam("row_id")).values(
+        place_id=db.bindparam("b_place"), city_id=db.func.coalesce(table.c.city_id, db.bindparam("b_city")),
+    )
+    last_id = 0
+    total = 0
+    while True:
+        rows = connection.execute(
+            db.select(table.c.id, table.c.name, table.c.city, table.c.country)
+            .where(table.c.id > last_id, table.c.place_id.is_(None))
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return total
+        resolved = resolve(connection, [(row.city or row.name, row.country) for row in rows])
+        updates = []
+        for row in rows:
+            match = resolved.get((row.city or row.name, row.country))
+            if match:
+                updates.append({"row_id": row.id, "b_place": match[0], "b_city": match[1]})
+        if updates:
+            connection.execute(update, updates)
+        total += len(updates)
+        last_id = rows[-1].id
+
+
+def places_visited(user_id):
+    """Distinct places across a user's trips; stops not resolved yet count by name"""
+    unresolved = db.case((TripDestination.place_id.is_(None), db.func.lower(db.func.trim(TripDestination.name))))
+    resolved_count, unresolved_count = (
+        db.session.query(db.func.count(db.distinct(TripDestination.place_id)), db.func.count(db.distinct(unresolved)))
+        .join(Trip, Trip.id == TripDestination.trip_id)
+        .filter(Trip.user_id == user_id)
+        .one()
+    )
+    return resolved_count + unresolved_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="place_service.py", description="Canonical places")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backfill", help="resolve trip stops that have no place yet")
+    lookup = commands.add_parser("resolve", help="show (and create) the place a name resolves to")
+    lookup.add_argument("name")
+    lookup.add_argument("--country")
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "backfill":
+            count = backfill(db.session.connection())
+            db.session.commit()
+            print(f"Resolved {count} trip stop(s)")
+        else:
+            match = resolve(db.session.connection(), [(args.name, args.country)]).get((args.name, args.country))
+            db.session.commit()
+            if match is None:
+                print("Not a place name")
+                return 1
+            place = db.session.get(Place, match[0])
+            print(f"#{place.id} {place.name} ({place.country or '-'}), catalog city {place.city_id or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Trending destinations: time-decayed interest counts.
+
+Every trip stop and wishlist city added counts as interest in its
+destination (keyed like ``recommendation_service``: ``lower(trim(city))``).
+Its weight halves every ``HALF_LIFE_DAYS``.
+
+Decaying every row as time passes would rewrite the whole table, so scores
+are stored scaled to a fixed ``EPOCH``: an event at time ``t`` adds
+``weight * 2 ** ((t - EPOCH) / half_life)``. All rows decay by the same
+factor, so the stored order is the decayed order. ``top_destinations`` is an
+``ORDER BY score DESC LIMIT n`` on the score index (O(log n + n)), and
+``decayed`` converts a stored score back to today's value. Doubles reach
+about 2**1000, which at a 30-day half-life leaves about 80 years before
+``EPOCH`` has to move.
+
+Rows are updated from a session ``after_flush`` hook. New ``TripDestination``
+and ``WishlistItem`` objects in a flush, and trip stops renamed to another
+destination, are grouped by destination and written with one upsert per
+flush, in the same transaction. Removals are
+not subtracted; they fade out with the decay. ``rebuild`` recomputes every
+score exactly from the rows that exist:
+
+    python popularity_service.py rebuild
+"""
+
+import argparse
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import db, DestinationPopularity, Trip, TripDestination, WishlistItem
+from recommendation_service import destination_key
+
+EPOCH = datetime(2025, 1, 1)
+HALF_LIFE_DAYS = 30
+TRIP_WEIGHT = 1.0
+WISHLIST_WEIGHT = 0.5
+WRITE_CHUNK_SIZE = 1000
+
+
+def scaled(weight, at):
+    """``weight`` of an event at ``at``, in stored (epoch-scaled) units"""
+    return weight * 2 ** ((at - EPOCH).total_seconds() / 86400 / HALF_LIFE_DAYS)
+
+
+def decayed(score, now=None):
+    """A stored score as of ``now``"""
+    return score * 2 ** (-((now or datetime.utcnow()) - EPOCH).total_seconds() / 86400 / HALF_LIFE_DAYS)
+
+
+def _label(name):
+    return " ".join((name or "").split())[:120]
+
+
+def _upsert(dialect):
+    table = DestinationPopularity.__table__
+    if dialect == "postgresql":
+        insert = postgresql.insert(table)
+    elif dialect == "sqlite":
+        insert = sqlite.insert(table)
+    else:
+        return None
+    return insert.on_conflict_do_update(
+        index_elements=[table.c.key],
+        set_={
+            "score": table.c.score + insert.excluded.score,
+            "trips": table.c.trips + insert.excluded.trips,
+            "wishlists": table.c.wishlists + insert.excluded.wishlists,
+            "country": db.func.coalesce(table.c.country, insert.excluded.country),
+            "updated_at": insert.excluded.updated_at,
+        },
+    )
+
+
+def record(connection, events, now=None):
+    """Add ``[(name, country, is_trip)]`` interest events, one upsert per destination"""
+    now = now or datetime.utcnow()
+    rows = {}
+    for name, country, is_trip in events:
+        key = destination_key(name)
+        if not key:
+            continue
+        row = rows.setdefault(key, {"key": key, "name": _label(name), "country": (country or "").strip() or None,
+                                    "score": 0.0, "trips": 0, "wishlists": 0, "updated_at": now})
+        row["score"] += scaled(TRIP_WEIGHT if is_trip else WISHLIST_WEIGHT, now)
+        row["trips" if is_trip else "wishlists"] += 1
+    if not rows:
+        return 0
+
+    upsert = _upsert(connection.dialect.name)
+    if upsert is not None:
+        connection.execute(upsert, list(rows.values()))
+        return len(rows)
+    # Other databases: update what exists, insert the rest
+    table = DestinationPopularity.__table__
+    existing = set(connection.execute(db.select(table.c.key).where(table.c.key.in_(rows))).scalars())
+    for key in existing:
+        row = rows.pop(key)
+        connection.execute(table.update().where(table.c.key == key).values(
+            score=table.c.score + row["score"], trips=table.c.trips + row["trips"],
+            wishlists=table.c.wishlists + row["wishlists"], updated_at=now,
+        ))
+    if rows:
+        connection.execute(table.insert(), list(rows.values()))
+    return len(existing) + len(rows)
+
+
+def _moved(destination):
+    """True when a flushed stop now names a different destination"""
+    # after_flush still sees this flush's history
+    attrs = db.inspect(destination).attrs
+    if not any(attrs[name].history.has_changes() for name in ("name", "city")):
+        return False
+    before = {}
+    for name in ("name", "city"):
+        history = attrs[name].history
+        before[name] = history.deleted[0] if history.deleted else getattr(destination, name)
+    return destination_key(before["city"] or before["name"]) != destination_key(destination.city or destination.name)
+
+
+def _record_new_rows(session, flush_context):
+    events = []
+    for obj in session.new:
+        if isinstance(obj, TripDestination):
+            events.append((obj.city or obj.name, obj.country, True))
+        elif isinstance(obj, WishlistItem) and obj.city:
+            events.append((obj.city, obj.country, False))
+    # A stop renamed in place (the itinerary builder updates rows) is interest
+    # in its new destination
+    for obj in session.dirty:
+        if isinstance(obj, TripDestination) and obj not in session.new and _moved(obj):
+            events.append((obj.city or obj.name, obj.country, True))
+    if events:
+        record(session.connection(), events)
+
+
+db.event.listen(Session, "after_flush", _record_new_rows)
+
+
+def rebuild(connection, now=None):
+    """Recompute every score from existing rows (trip stops dated by their
+    trip's creation). Returns the number of destinations."""
+    now = now or datetime.utcnow()
+    rows = defaultdict(lambda: {"score": 0.0, "trips": 0, "wishlists": 0, "name": None, "country": None})
+    trip_rows = connection.execute(
+        db.select(db.func.coalesce(TripDestination.city, TripDestination.name), TripDestination.country, Trip.created_at)
+        .join(Trip, Trip.id == TripDestination.trip_id)
+    )
+    wishlist_rows = connection.execute(
+        db.select(WishlistItem.city, WishlistItem.country, WishlistItem.created_at).where(WishlistItem.city.isnot(None))
+    )
+    for source, is_trip in ((trip_rows, True), (wishlist_rows, False)):
+        for name, country, created_at in source:
+            key = destination_key(name)
+            if not key:
+                continue
+            row = rows[key]
+            row["score"] += scaled(TRIP_WEIGHT if is_trip else WISHLIST_WEIGHT, created_at or now)
+            row["trips" if is_trip else "wishlists"] += 1
+            row["name"] = row["name"] or _label(name)
+            row["country"] = row["country"] or (country or "").strip() or None
+
+    table = DestinationPopularity.__table__
+    connection.execute(table.delete())
+    values = [{"key": key, "updated_at": now, **row} for key, row in rows.items()]
+    for start in range(0, len(values), WRITE_CHUNK_SIZE):
+        connection.execute(table.insert(), values[start:start + WRITE_CHUNK_SIZE])
+    return len(values)
+
+
+def top_destinations(limit=10, country=None):
+    """The ``limit`` most popular destinations right now"""
+    query = DestinationPopularity.query
+    if country:
+        query = query.filter(db.func.lower(DestinationPopularity.country) == country.strip().lower())
+    return query.order_by(DestinationPopularity.score.desc(), DestinationPopularity.key).limit(limit).all()
+
+
+def entry(row, now=None):
+    """JSON form of a leaderboard row"""
+    return {
+        "key": row.key,
+        "name": row.name,
+        "country": row.country,
+        "score": round(decayed(row.score, now), 3),
+        "trips": row.trips,
+        "wishlists": row.wishlists,
+    }
+
+
+def scores_for(names, now=None):
+    """``{key: decayed score}`` for the given destination names"""
+    keys = {destination_key(name) for name in names} - {""}
+    if not keys:
+        return {}
+    return {
+        key: decayed(score, now) for key, score in
+        db.session.query(DestinationPopularity.key, DestinationPopularity.score)
+        .filter(DestinationPopularity.key.in_(keys))
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="popularity_service.py", description="Destination popularity")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="recompute every score from trips and wishlists")
+    show = commands.add_parser("top", help="print the leaderboard")
+    show.add_argument("--limit", type=int, default=20)
+    show.add_argument("--country")
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "rebuild":
+            count = rebuild(db.session.connection())
+            db.session.commit()
+            print(f"Scored {count} destination(s)")
+        else:
+            for rank, row in enumerate(top_destinations(args.limit, args.country), 1):
+                item = entry(row)
+                print(f"{rank:>3}. {item['name']} ({item['country'] or '-'}): {item['score']:.2f} "
+                      f"[{item['trips']} trips, {item['wishlists']} wishlists]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
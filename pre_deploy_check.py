@@ -81,7 +81,8 @@ def check_procfile():
         with open('Procfile', 'r') as f:
             content = f.read().strip()
         
-        if 'gunicorn' in content and 'app:app' in content:
+        # app:app would serve an unconfigured application; create_app() sets it up
+        if 'gunicorn' in content and 'app:create_app()' in content:
             print(f"✅ Procfile looks good: {content}")
             return True
         else:
@@ -0,0 +1,336 @@
+"""
+Destination suggestions from what other travellers combine.
+
+``build`` is the offline job. Each user's destinations (every trip stop and
+wishlist city, keyed by ``lower(trim(city))``) form one basket, and it
+computes:
+
+- ``destination_pairs``: sparse co-occurrence. For each pair of
+  destinations, the number of users who have both, normalised to
+  ``count / sqrt(n_a * n_b)``. Only the ``MAX_NEIGHBOURS`` strongest
+  neighbours of each destination are kept.
+- ``destination_tag_affinities``: how often users with a travel preference
+  (``User.travel_preferences``) or a wishlist tag have each destination,
+  normalised the same way.
+- ``user_recommendations``: every user's top ``TOP_K`` destinations they do
+  not have yet. A destination scores the sum of its weights with the user's
+  own destinations, plus ``PREFERENCE_WEIGHT`` times its affinity with the
+  user's tags. Popular destinations fill the remaining slots.
+
+Run it nightly from cron:
+
+    python recommendation_service.py build
+
+Between runs, ``refresh_user`` re-scores a single user against the stored
+tables with a handful of indexed queries. Saving a trip calls it, so
+suggestions follow the user's plans right away.
+"""
+
+import argparse
+import json
+import math
+import sys
+from collections import Counter, defaultdict
+
+# numpy is imported by the functions that use it, so `import app` does not
+# pay for it (benchmarks/import_time.py)
+
+from models import (
+    db, DestinationPair, DestinationStat, DestinationTagAffinity, Trip, TripDestination, User,
+    UserRecommendation, WishlistItem,
+)
+
+TOP_K = 12
+MAX_NEIGHBOURS = 50
+# Only this many of a user's destinations count towards pairs (pairs grow quadratically)
+MAX_BASKET = 100
+PREFERENCE_WEIGHT = 0.5
+WRITE_CHUNK_SIZE = 1000
+
+
+def destination_key(name):
+    return " ".join((name or "").split()).lower()[:120]
+
+
+def _parse_tags(raw):
+    try:
+        tags = json.loads(raw) if raw else []
+    except ValueError:
+        return set()
+    if not isinstance(tags, list):
+        return set()
+    return {str(tag).strip().lower()[:50] for tag in tags if str(tag).strip()}
+
+
+def _baskets(user_id=None):
+    """``({user_id: {key}}, {key: Counter((name, country))})``"""
+    trip_rows = (
+        db.session.query(Trip.user_id, db.func.coalesce(TripDestination.city, TripDestination.name), TripDestination.country)
+        .join(Trip, Trip.id == TripDestination.trip_id)
+    )
+    wishlist_rows = db.session.query(WishlistItem.user_id, WishlistItem.city, WishlistItem.country).filter(
+        WishlistItem.city.isnot(None)
+    )
+    if user_id is not None:
+        trip_rows = trip_rows.filter(Trip.user_id == user_id)
+        wishlist_rows = wishlist_rows.filter(WishlistItem.user_id == user_id)
+
+    baskets, labels = defaultdict(set), defaultdict(Counter)
+    for rows in (trip_rows, wishlist_rows):
+        for owner, name, country in rows:
+            key = destination_key(name)
+            if key:
+                baskets[owner].add(key)
+                labels[key][(" ".join(name.split())[:120], (country or "").strip() or None)] += 1
+    return baskets, labels
+
+
+def _tags(user_id=None):
+    """``({user_id: {tag}}, {(tag, key): {user_id}})`` from preferences and wishlist tags"""
+    users = db.session.query(User.id, User.travel_preferences).filter(User.travel_preferences.isnot(None))
+    items = db.session.query(WishlistItem.user_id, WishlistItem.city, WishlistItem.tags).filter(
+        WishlistItem.tags.isnot(None), WishlistItem.city.isnot(None)
+    )
+    if user_id is not None:
+        users = users.filter(User.id == user_id)
+        items = items.filter(WishlistItem.user_id == user_id)
+
+    user_tags, tagged = {}, defaultdict(set)
+    for owner, preferences in users:
+        tags = _parse_tags(preferences)
+        if tags:
+            user_tags[owner] = tags
+    for owner, city, tags in items:
+        key = destination_key(city)
+        for tag in _parse_tags(tags):
+            tagged[(tag, key)].add(owner)
+    return user_tags, tagged
+
+
+def _pair_counts(baskets, keys):
+    """Co-occurrence counts as parallel ``(a, b, count)`` arrays, ``a < b``"""
+    import numpy as np
+    position = {key: i for i, key in enumerate(keys)}
+    firsts, seconds = [], []
+    for basket in baskets.values():
+        items = np.array(sorted(position[key] for key in basket)[:MAX_BASKET], dtype=np.int64)
+        if len(items) > 1:
+            a, b = np.triu_indices(len(items), 1)
+            firsts.append(items[a])
+            seconds.append(items[b])
+    if not firsts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    combined = np.concatenate(firsts) * len(keys) + np.concatenate(seconds)
+    pairs, counts = np.unique(combined, return_counts=True)
+    return pairs // len(keys), pairs % len(keys), counts
+
+
+def _strongest(sources, targets, counts, weights, limit):
+    """Keep the ``limit`` heaviest rows per source"""
+    import numpy as np
+    order = np.lexsort((-weights, sources))
+    sources, targets, counts, weights = sources[order], targets[order], counts[order], weights[order]
+    starts = np.flatnonzero(np.r_[True, sources[1:] != sources[:-1]])
+    rank = np.arange(len(sources)) - np.repeat(starts, np.diff(np.r_[starts, len(sources)]))
+    keep = rank < limit
+    return sources[keep], targets[keep], counts[keep], weights[keep]
+
+
+def _rank(mine, tags, neighbours, affinities, popular, top_k):
+    """``[(key, score, reason)]`` for a user holding ``mine`` with ``tags``.
+
+    ``neighbours``: key -> [(other, weight)]; ``affinities``: tag -> [(key,
+    weight)]; ``popular``: keys by travellers. Reasons are ``("pair", key)``,
+    ``("tag", tag)`` or ``("popular", None)``.
+    """
+    scores, reasons = defaultdict(float), {}
+    for key in mine:
+        for other, weight in neighbours.get(key, ()):
+            if other in mine:
+                continue
+            scores[other] += weight
+            if weight > reasons.get(other, (0.0,))[0]:
+                reasons[other] = (weight, ("pair", key))
+    for tag in tags:
+        for key, weight in affinities.get(tag, ()):
+            if key in mine:
+                continue
+            scores[key] += PREFERENCE_WEIGHT * weight
+            reasons.setdefault(key, (0.0, ("tag", tag)))
+
+    ranked = sorted(scores, key=lambda key: (-scores[key], key))[:top_k]
+    results = [(key, scores[key], reasons[key][1]) for key in ranked]
+    for key in popular:
+        if len(results) >= top_k:
+            break
+        if key not in mine and key not in scores:
+            results.append((key, 0.0, ("popular", None)))
+    return results
+
+
+def _reason_text(reason, names):
+    kind, value = reason
+    if kind == "pair":
+        return f"Often combined with {names.get(value, value.title())}"
+    if kind == "tag":
+        return f"Matches your {value} preference"
+    return "Popular with travellers"
+
+
+def _recommendation_rows(user_id, ranked, labels):
+    names = {key: name for key, (name, _) in labels.items()}
+    return [
+        {"user_id": user_id, "rank": rank, "destination": key, "name": labels[key][0], "country": labels[key][1],
+         "score": round(score, 6), "reason": _reason_text(reason, names)}
+        for rank, (key, score, reason) in enumerate(ranked)
+        if key in labels
+    ]
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), WRITE_CHUNK_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + WRITE_CHUNK_SIZE])
+
+
+def build(top_k=TOP_K, max_neighbours=MAX_NEIGHBOURS):
+    """Recompute every table from scratch and commit once.
+
+    Returns counts of what was written.
+    """
+    import numpy as np
+    baskets, label_counts = _baskets()
+    user_tags, tagged = _tags()
+    keys = sorted(label_counts)
+    position = {key: i for i, key in enumerate(keys)}
+    travellers = np.zeros(len(keys), dtype=np.int64)
+    for basket in baskets.values():
+        for key in basket:
+            travellers[position[key]] += 1
+    labels = {key: label_counts[key].most_common(1)[0][0] for key in keys}
+
+    # Co-occurrence, both directions, strongest neighbours only
+    a, b, counts = _pair_counts(baskets, keys)
+    weights = counts / np.sqrt(travellers[a] * travellers[b]) if len(counts) else np.empty(0)
+    sources, targets, counts, weights = _strongest(
+        np.r_[a, b], np.r_[b, a], np.r_[counts, counts], np.r_[weights, weights], max_neighbours
+    )
+    neighbours = defaultdict(list)
+    for source, target, weight in zip(sources.tolist(), targets.tolist(), weights.tolist()):
+        neighbours[keys[source]].append((keys[target], weight))
+
+    # Tag affinities: users with the tag (as a preference or wishlist tag) who have the destination
+    holders = defaultdict(set)
+    for owner, tags in user_tags.items():
+        for tag in tags:
+            holders[tag].add(owner)
+            for key in baskets.get(owner, ()):
+                tagged[(tag, key)].add(owner)
+    for (tag, _), owners in tagged.items():
+        holders[tag] |= owners
+    affinities = defaultdict(list)
+    for (tag, key), owners in tagged.items():
+        if key in position:
+            weight = len(owners) / math.sqrt(len(holders[tag]) * max(int(travellers[position[key]]), 1))
+            affinities[tag].append((key, weight))
+    for rows in affinities.values():
+        rows.sort(key=lambda row: -row[1])
+
+    popular = sorted(keys, key=lambda key: (-travellers[position[key]], key))[:top_k * 2]
+    recommendations = []
+    for user_id in sorted(set(baskets) | set(user_tags)):
+        ranked = _rank(baskets.get(user_id, set()), user_tags.get(user_id, ()), neighbours, affinities, popular, top_k)
+        recommendations.extend(_recommendation_rows(user_id, ranked, labels))
+
+    for model in (DestinationStat, DestinationPair, DestinationTagAffinity, UserRecommendation):
+        db.session.execute(db.delete(model))
+    _insert(DestinationStat, [
+        {"key": key, "name": labels[key][0], "country": labels[key][1], "travellers": int(travellers[i])}
+        for i, key in enumerate(keys)
+    ])
+    _insert(DestinationPair, [
+        {"destination": keys[s], "other": keys[t], "count": int(c), "weight": round(float(w), 6)}
+        for s, t, c, w in zip(sources.tolist(), targets.tolist(), counts.tolist(), weights.tolist())
+    ])
+    _insert(DestinationTagAffinity, [
+        {"tag": tag, "destination": key, "weight": round(weight, 6)}
+        for tag, rows in affinities.items() for key, weight in rows
+    ])
+    _insert(UserRecommendation, recommendations)
+    db.session.commit()
+    return {"destinations": len(keys), "pairs": len(sources), "users": len({r["user_id"] for r in recommendations})}
+
+
+def refresh_user(user_id, top_k=TOP_K):
+    """Re-score one user against the stored tables. Does not commit."""
+    baskets, _ = _baskets(user_id)
+    user_tags, _ = _tags(user_id)
+    mine, tags = baskets.get(user_id, set()), user_tags.get(user_id, set())
+
+    neighbours, affinities = defaultdict(list), defaultdict(list)
+    if mine:
+        for key, other, weight in db.session.query(
+            DestinationPair.destination, DestinationPair.other, DestinationPair.weight
+        ).filter(DestinationPair.destination.in_(mine)):
+            neighbours[key].append((other, weight))
+    if tags:
+        for tag, key, weight in db.session.query(
+            DestinationTagAffinity.tag, DestinationTagAffinity.destination, DestinationTagAffinity.weight
+        ).filter(DestinationTagAffinity.tag.in_(tags)):
+            affinities[tag].append((key, weight))
+    popular = db.session.scalars(
+        db.select(DestinationStat.key)
+        .order_by(DestinationStat.travellers.desc(), DestinationStat.key)
+        .limit(top_k + len(mine))
+    ).all()
+
+    ranked = _rank(mine, tags, neighbours, affinities, popular, top_k)
+    wanted = {key for key, _, _ in ranked} | {reason[1] for _, _, reason in ranked if reason[0] == "pair"}
+    labels = {
+        key: (name, country) for key, name, country in
+        db.session.query(DestinationStat.key, DestinationStat.name, DestinationStat.country)
+        .filter(DestinationStat.key.in_(wanted))
+    } if wanted else {}
+
+    UserRecommendation.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    rows = _recommendation_rows(user_id, ranked, labels)
+    _insert(UserRecommendation, rows)
+    return len(rows)
+
+
+def recommendations_for(user_id, limit=6):
+    return (
+        UserRecommendation.query.filter_by(user_id=user_id)
+        .order_by(UserRecommendation.rank)
+        .limit(limit)
+        .all()
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="recommendation_service.py", description="Destination recommendations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("build", help="recompute co-occurrence, affinities and every user's suggestions")
+    rebuild.add_argument("--top-k", type=int, default=TOP_K)
+    rebuild.add_argument("--neighbours", type=int, default=MAX_NEIGHBOURS, help="co-occurring destinations kept per destination")
+    refresh = commands.add_parser("refresh", help="re-score one user")
+    refresh.add_argument("user_id", type=int)
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "build":
+            written = build(top_k=args.top_k, max_neighbours=args.neighbours)
+            print(f"{written['destinations']} destination(s), {written['pairs']} pair(s), "
+                  f"suggestions for {written['users']} user(s)")
+        else:
+            count = refresh_user(args.user_id)
+            db.session.commit()
+            print(f"{count} suggestion(s) for user {args.user_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Visiting order for a trip's destinations.
+
+Destinations store no coordinates, so ``resolve_coordinates`` looks them up in
+the ``cities`` catalog (by ``city_id`` when set, else by name) with a single
+query. Distances are great-circle kilometres from a vectorized haversine
+matrix, cached per coordinate set.
+
+``optimize_route`` finds the shortest open path through all stops, optionally
+with a fixed first and/or last stop:
+
+- up to ``EXACT_LIMIT`` stops: exact Held-Karp dynamic programming
+  (O(2^n * n^2), vectorized over the previous stop);
+- beyond that: nearest-neighbour construction from every allowed start,
+  improved with 2-opt (segment reversal) and Or-opt (moving runs of 1-3
+  stops) until no move shortens the path.
+"""
+
+from functools import lru_cache
+
+# numpy is imported by the functions that use it, so `import app` does not
+# pay for it (benchmarks/import_time.py)
+
+from models import db, City
+
+EARTH_RADIUS_KM = 6371.0088
+# Held-Karp time doubles per stop: ~15 ms for 10 stops, ~200 ms for 13
+EXACT_LIMIT = 10
+# Matrices kept for recently optimized coordinate sets
+MATRIX_CACHE_SIZE = 256
+OR_OPT_MAX_RUN = 3
+
+
+def _city_key(name):
+    return (name or "").strip().lower()
+
+
+def resolve_coordinates(destinations):
+    """``[(lat, lng) or None]`` aligned with ``destinations``"""
+    city_ids = {d.city_id for d in destinations if d.city_id}
+    names = {_city_key(d.city or d.name) for d in destinations if not d.city_id}
+    names.discard("")
+    if not city_ids and not names:
+        return [None] * len(destinations)
+
+    conditions = []
+    if city_ids:
+        conditions.append(City.id.in_(city_ids))
+    if names:
+        conditions.append(db.func.lower(City.name).in_(names))
+    rows = (
+        db.session.query(City.id, City.name, City.country, City.latitude, City.longitude, City.popularity)
+        .filter(db.or_(*conditions), City.latitude.isnot(None), City.longitude.isnot(None))
+        .all()
+    )
+    by_id = {row.id: row for row in rows}
+    by_name = {}
+    for row in sorted(rows, key=lambda r: r.popularity or 0):
+        by_name[_city_key(row.name)] = row  # Most popular city of a name wins
+    by_name_country = {(_city_key(row.name), _city_key(row.country)): row for row in rows}
+
+    coordinates = []
+    for dest in destinations:
+        name = _city_key(dest.city or dest.name)
+        row = by_id.get(dest.city_id) or by_name_country.get((name, _city_key(dest.country))) or by_name.get(name)
+        coordinates.append((row.latitude, row.longitude) if row else None)
+    return coordinates
+
+
+@lru_cache(maxsize=MATRIX_CACHE_SIZE)
+def _cached_matrix(coordinates):
+    import numpy as np
+    lat, lng = np.radians(np.array(coordinates, dtype=float)).T
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    matrix = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    matrix.setflags(write=False)  # Shared between callers
+    return matrix
+
+
+def distance_matrix(coordinates):
+    """Pairwise haversine distances (km) for ``[(lat, lng), ...]``"""
+    return _cached_matrix(tuple((round(lat, 6), round(lng, 6)) for lat, lng in coordinates))
+
+
+def path_length(matrix, order):
+    import numpy as np
+    order = np.asarray(order)
+    return float(matrix[order[:-1], order[1:]].sum()) if len(order) > 1 else 0.0
+
+
+def _held_karp(matrix, start, end):
+    import numpy as np
+    n = len(matrix)
+    full = (1 << n) - 1
+    cost = np.full((1 << n, n), np.inf)
+    parent = np.full((1 << n, n), -1, dtype=np.int64)
+    for j in ([start] if start is not None else range(n)):
+        cost[1 << j, j] = 0.0
+
+    stops = np.arange(n)
+    bits = 1 << stops
+    for mask in range(1, full + 1):
+        members = stops[(mask & bits) != 0]
+        if len(members) < 2:
+            continue
+        # Best way to reach each member j last: via some other member i
+        previous = cost[mask ^ bits[members]]  # rows: mask without j
+        totals = previous + matrix[:, members].T
+        best = np.argmin(totals, axis=1)
+        cost[mask, members] = totals[np.arange(len(members)), best]
+        parent[mask, members] = best
+
+    last = end if end is not None else int(np.argmin(cost[full]))
+    order, mask = [], full
+    while last != -1:
+        order.append(last)
+        last, mask = int(parent[mask, last]), mask ^ (1 << last)
+    return order[::-1]
+
+
+def _nearest_neighbour(matrix, first, end):
+    n = len(matrix)
+    order = [first]
+    remaining = set(range(n)) - {first}
+    if end is not None:
+        remaining.discard(end)
+    while remaining:
+        row = matrix[order[-1]]
+        nearest = min(remaining, key=row.__getitem__)
+        order.append(nearest)
+        remaining.remove(nearest)
+    if end is not None and end != first:
+        order.append(end)
+    return order
+
+
+def _two_opt(matrix, order, fixed_start, fixed_end):
+    n = len(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1 if fixed_start else 0, n - 1):
+            for k in range(i + 1, n - 1 if fixed_end else n):
+                # Reversing order[i..k] only changes the edges at its ends
+                before = (matrix[order[i - 1], order[i]] if i > 0 else 0.0) + \
+                         (matrix[order[k], order[k + 1]] if k < n - 1 else 0.0)
+                after = (matrix[order[i - 1], order[k]] if i > 0 else 0.0) + \
+                        (matrix[order[i], order[k + 1]] if k < n - 1 else 0.0)
+                if after < before - 1e-9:
+                    order[i:k + 1] = order[i:k + 1][::-1]
+                    improved = True
+    return order
+
+
+def _edge(matrix, a, b):
+    return matrix[a, b] if a is not None and b is not None else 0.0
+
+
+def _or_opt(matrix, order, fixed_start, fixed_end):
+    n = len(order)
+    low, high = (1 if fixed_start else 0), (n - 1 if fixed_end else n)
+    improved = True
+    while improved:
+        improved = False
+        for run in range(1, OR_OPT_MAX_RUN + 1):
+            for i in range(low, high - run + 1):
+                segment = order[i:i + run]
+                prev = order[i - 1] if i > 0 else None
+                nxt = order[i + run] if i + run < n else None
+                saved = _edge(matrix, prev, segment[0]) + _edge(matrix, segment[-1], nxt) - _edge(matrix, prev, nxt)
+                rest = order[:i] + order[i + run:]
+                for position in range(low, high - run + 1):
+                    if position == i:
+                        continue
+                    a = rest[position - 1] if position > 0 else None
+                    b = rest[position] if position < len(rest) else None
+                    for piece in (segment, segment[::-1]):
+                        added = _edge(matrix, a, piece[0]) + _edge(matrix, piece[-1], b) - _edge(matrix, a, b)
+                        if added < saved - 1e-9:
+                            order = rest[:position] + piece + rest[position:]
+                            improved = True
+                            break
+                    if improved:
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+    return order
+
+
+def _heuristic(matrix, start, end):
+    import numpy as np
+    n = len(matrix)
+    firsts = [start] if start is not None else [j for j in range(n) if j != end]
+    best_order, best_length = None, np.inf
+    for first in firsts:
+        order = _nearest_neighbour(matrix, first, end)
+        order = _two_opt(matrix, order, fixed_start=True, fixed_end=end is not None)
+        length = path_length(matrix, order)
+        if length < best_length:
+            best_order, best_length = order, length
+    # Improve the best tour again, now also free to change its first stop
+    for improve in (_two_opt, _or_opt, _two_opt):
+        best_order = improve(matrix, best_order, start is not None, end is not None)
+    return best_order
+
+
+def optimize_route(coordinates, start=None, end=None):
+    """Shortest open path through ``coordinates``.
+
+    ``start``/``end`` are indexes of stops that must come first/last.
+    Returns ``(order, distance_km, method)``.
+    """
+    n = len(coordinates)
+    if n < 2:
+        return list(range(n)), 0.0, "trivial"
+    if start is not None and start == end:
+        raise ValueError("start and end must be different stops")
+    matrix = distance_matrix(coordinates)
+    if n <= EXACT_LIMIT:
+        order, method = _held_karp(matrix, start, end), "exact"
+    else:
+        order, method = _heuristic(matrix, start, end), "heuristic"
+    return order, path_length(matrix, order), method
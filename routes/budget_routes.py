@@ -3,7 +3,16 @@ from travel_data_service import TravelDataService
 from datetime import datetime
 
 budget_routes = Blueprint('budget', __name__)
-travel_service = TravelDataService()
+_travel_service = None
+
+
+def get_travel_service():
+    """Shared TravelDataService, created on first use (it reads the cached cost/rate files)"""
+    global _travel_service
+    if _travel_service is None:
+        _travel_service = TravelDataService()
+    return _travel_service
+
 
 @budget_routes.route('/api/budget/estimate', methods=['POST'])
 def estimate_budget():
@@ -14,7 +23,7 @@ def estimate_budget():
         duration_days = data.get('duration_days', 7)
         comfort_level = data.get('comfort_level', 'medium')
         
-        budget = travel_service.calculate_trip_budget(
+        budget = get_travel_service().calculate_trip_budget(
             cities=cities,
             duration_days=duration_days,
             comfort_level=comfort_level
@@ -34,7 +43,7 @@ def estimate_budget():
 def get_city_costs(city, country):
     """Get cost of living data for a specific city"""
     try:
-        costs = travel_service.get_city_cost_of_living(city, country)
+        costs = get_travel_service().get_city_cost_of_living(city, country)
         return jsonify({
             'status': 'success',
             'data': costs
@@ -59,7 +68,7 @@ def get_flight_price():
                 'message': 'Origin and destination are required'
             }), 400
             
-        price = travel_service.get_flight_prices(origin, destination, date)
+        price = get_travel_service().get_flight_prices(origin, destination, date)
         return jsonify({
             'status': 'success',
             'data': {
@@ -80,7 +89,7 @@ def get_flight_price():
 def get_exchange_rates():
     """Get current exchange rates"""
     try:
-        rates = travel_service.get_exchange_rates()
+        rates = get_travel_service().get_exchange_rates()
         return jsonify({
             'status': 'success',
             'data': rates
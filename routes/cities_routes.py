@@ -1,12 +1,16 @@
 from flask import Blueprint, jsonify, request
 import requests
 from datetime import datetime
+import json
 import os
-import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
 import re
 
+from metrics import record_cache
+from perf import aiohttp_trace_config
+from popularity_service import scores_for as popularity_scores
+from recommendation_service import destination_key
+from travel_data_service import DATA_DIR
+
 cities_routes = Blueprint('cities', __name__)
 
 # Cache for city data to minimize API calls (short-term, in-memory only)
@@ -17,7 +21,8 @@ async def fetch_exchange_rates():
     """Fetch current exchange rates from ExchangeRate-API (free tier)"""
     try:
         url = "https://open.er-api.com/v6/latest/USD"
-        async with aiohttp.ClientSession() as session:
+        import aiohttp  # Only needed by these async helpers; keep it off the boot path
+        async with aiohttp.ClientSession(trace_configs=[aiohttp_trace_config()]) as session:
             async with session.get(url) as response:
                 data = await response.json()
                 return data.get('rates', {})
@@ -47,7 +52,8 @@ async def fetch_city_info(city_name):
         headers = {'Accept': 'application/json'}
         params = {'query': query, 'format': 'json'}
         
-        async with aiohttp.ClientSession() as session:
+        import aiohttp
+        async with aiohttp.ClientSession(trace_configs=[aiohttp_trace_config()]) as session:
             async with session.get(url, headers=headers, params=params) as response:
                 data = await response.json()
                 results = data.get('results', {}).get('bindings', [])
@@ -64,7 +70,8 @@ async def fetch_cost_estimates(city_name, country_code):
         # Use World Bank Development Indicators API to get GDP per capita
         wb_url = f"http://api.worldbank.org/v2/country/{country_code}/indicator/NY.GDP.PCAP.CD?format=json"
         
-        async with aiohttp.ClientSession() as session:
+        import aiohttp
+        async with aiohttp.ClientSession(trace_configs=[aiohttp_trace_config()]) as session:
             async with session.get(wb_url) as response:
                 data = await response.json()
                 
@@ -118,6 +125,7 @@ def get_city_data():
             
         # Check cache first
         cache_key = f"{city}_{lat}_{lng}_{travel_style}"
+        record_cache("city_details", hit=cache_key in city_cache)
         if cache_key in city_cache:
             return jsonify(city_cache[cache_key])
             
@@ -200,6 +208,19 @@ def get_city_data():
         print(f"City data error: {str(e)}")
         return jsonify({"error": "Failed to fetch city data"}), 500
 
+_city_costs = None
+
+def city_costs_data():
+    """city_costs.json from the travel data directory, read once"""
+    global _city_costs
+    if _city_costs is None:
+        try:
+            with open(os.path.join(DATA_DIR, 'city_costs.json'), 'r') as f:
+                _city_costs = json.load(f)
+        except FileNotFoundError:
+            _city_costs = {}
+    return _city_costs
+
 @cities_routes.route('/api/city-suggestions')
 def get_city_suggestions():
     """Get suggested cities based on search criteria"""
@@ -211,7 +232,7 @@ def get_city_suggestions():
         suggestions = []
         
         # Search through our city costs data
-        for region_name, region_data in city_costs_data["cost_indices"].items():
+        for region_name, region_data in city_costs_data().get("cost_indices", {}).items():
             if region and region.lower() != region_name.lower():
                 continue
                 
@@ -233,8 +254,11 @@ def get_city_suggestions():
                         "imageUrl": f"https://source.unsplash.com/800x500/?{city_name}"
                     })
         
-        # Sort by rating
-        suggestions.sort(key=lambda x: x["rating"], reverse=True)
+        # Trending cities first, then by rating; one keyed lookup for all candidates
+        trending = popularity_scores(city["name"] for city in suggestions)
+        for city in suggestions:
+            city["trending"] = round(trending.get(destination_key(city["name"]), 0.0), 3)
+        suggestions.sort(key=lambda x: (x["trending"], x["rating"]), reverse=True)
         
         return jsonify({
             "cities": suggestions[:20],  # Limit to top 20 results
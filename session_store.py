@@ -0,0 +1,190 @@
+"""
+Server-side sessions.
+
+By default Flask keeps ``session`` in a signed cookie. Everything in it
+travels with every request and is verified and deserialised each time:
+the login email and user id, the pending verification email and
+Flask-Dance's OAuth token. With ``SESSION_BACKEND=database`` the cookie
+holds only a random session id, and the data lives in ``user_sessions``.
+
+- Loading a session is one primary-key lookup. The table stores a SHA-256
+  of the id, so a leaked copy of it cannot be replayed as cookies.
+- A row is written only when the session changed, or when less than half
+  of ``PERMANENT_SESSION_LIFETIME`` is left. Expiry slides without a write
+  on every request.
+- The session's ``user_id`` is copied into an indexed column. When it
+  changes (log in, log out), the session gets a new id, so an id seen
+  before login is worthless after it.
+- ``revoke_user_sessions`` signs a user out everywhere with one DELETE.
+  Deactivating an account in the admin calls it. With the cookie backend
+  there is nothing to delete.
+
+Expired rows are removed from cron:
+
+    python session_store.py sweep
+"""
+
+import argparse
+import hashlib
+import secrets
+import sys
+from datetime import datetime
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from models import db, UserSession
+
+SWEEP_BATCH_SIZE = 1000
+# Longer cookie values cannot be ids we issued; skip the lookup
+MAX_SID_LENGTH = 64
+
+# The cookie session's serializer, so tuples, bytes and datetimes round-trip the same
+serializer = TaggedJSONSerializer()
+
+
+def _hash(sid):
+    return hashlib.sha256(sid.encode("utf-8")).hexdigest()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.stored_user_id = self.get("user_id")
+        self.new = sid is None
+        self.modified = False
+
+
+class DatabaseSessionInterface(SessionInterface):
+    """Sessions in ``user_sessions``, keyed by a random id in the cookie.
+
+    Reads and writes use their own connection, outside the request's
+    ``db.session`` transaction.
+    """
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or len(sid) > MAX_SID_LENGTH:
+            return ServerSession()
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                db.select(UserSession.data, UserSession.expires_at)
+                .where(UserSession.id == _hash(sid), UserSession.expires_at > datetime.utcnow())
+            ).first()
+        if row is None:
+            return ServerSession()
+        return ServerSession(serializer.loads(row.data), sid=sid, expires_at=row.expires_at)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        user_id = session.get("user_id")
+        rotate = session.sid is not None and user_id != session.stored_user_id
+
+        if not session or rotate:
+            if session.sid is not None:
+                with db.engine.begin() as connection:
+                    connection.execute(db.delete(UserSession).where(UserSession.id == _hash(session.sid)))
+                session.sid = None
+            if not session:
+                if not session.new:
+                    response.delete_cookie(name, domain=domain, path=path, secure=self.get_cookie_secure(app),
+                                           samesite=self.get_cookie_samesite(app),
+                                           httponly=self.get_cookie_httponly(app))
+                return
+
+        now = datetime.utcnow()
+        lifetime = app.permanent_session_lifetime
+        stale = session.expires_at is None or session.expires_at - now < lifetime / 2
+        if session.sid is not None and not session.modified and not stale:
+            return
+
+        values = {
+            "user_id": user_id if isinstance(user_id, int) else None,
+            "data": serializer.dumps(dict(session)),
+            "expires_at": now + lifetime,
+            "updated_at": now,
+        }
+        with db.engine.begin() as connection:
+            if session.sid is not None:
+                updated = connection.execute(
+                    db.update(UserSession).where(UserSession.id == _hash(session.sid)).values(**values)
+                ).rowcount
+            if session.sid is None or not updated:
+                # New session, or its row expired and was swept meanwhile
+                session.sid = secrets.token_urlsafe(32)
+                connection.execute(db.insert(UserSession).values(id=_hash(session.sid), created_at=now, **values))
+        session.expires_at = values["expires_at"]
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def revoke_user_sessions(user_id):
+    """Delete every stored session of a user. Returns the number revoked.
+    Does not commit."""
+    return db.session.execute(db.delete(UserSession).where(UserSession.user_id == user_id)).rowcount
+
+
+def sweep(now=None, batch_size=SWEEP_BATCH_SIZE):
+    """Delete expired sessions in batches, committing each. Returns the number deleted."""
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        ids = db.session.scalars(
+            db.select(UserSession.id).where(UserSession.expires_at <= now).limit(batch_size)
+        ).all()
+        if not ids:
+            return total
+        db.session.execute(db.delete(UserSession).where(UserSession.id.in_(ids)))
+        db.session.commit()
+        total += len(ids)
+
+
+def init_session_store(app):
+    """Use server-side sessions when ``SESSION_BACKEND`` is ``database``"""
+    backend = app.config.get("SESSION_BACKEND", "cookie")
+    if backend == "database":
+        app.session_interface = DatabaseSessionInterface()
+    elif backend != "cookie":
+        raise ValueError(f"Unknown SESSION_BACKEND {backend!r}; use 'cookie' or 'database'")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="session_store.py", description="Server-side sessions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("sweep", help="delete expired sessions")
+    revoke = commands.add_parser("revoke", help="sign a user out everywhere")
+    revoke.add_argument("user_id", type=int)
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "sweep":
+            print(f"Deleted {sweep()} expired session(s)")
+        else:
+            count = revoke_user_sessions(args.user_id)
+            db.session.commit()
+            print(f"Revoked {count} session(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,10 @@
-from app import app, db
+from app import create_app, db
 from models import User
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 
+app = create_app()
+
 with app.app_context():
     # Check if admin user already exists
     existing_admin = User.query.filter_by(email='admin@12345').first()
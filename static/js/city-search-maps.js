@@ -52,26 +52,45 @@ class CitySearchWithMaps {
             center: { lat: 20.5937, lng: 78.9629 } // Center of India
         });
 
-        // Load and display all available cities
-        this.loadAllCitiesOnMap();
+        // Markers (clustered server-side) follow the visible area; the first
+        // idle event loads the initial view
+        this.mapManager.map.addListener('idle', () => this.loadClustersInView());
     }
 
-    async loadAllCitiesOnMap() {
+    async loadClustersInView() {
+        const map = this.mapManager.map;
+        const bounds = map.getBounds();
+        // Text searches own the markers until they are cleared
+        if (!bounds || this.activeSearch) return;
+
+        const sw = bounds.getSouthWest();
+        const ne = bounds.getNorthEast();
+        const params = new URLSearchParams({
+            bbox: [sw.lng(), sw.lat(), ne.lng(), ne.lat()].map(v => v.toFixed(5)).join(','),
+            zoom: String(map.getZoom())
+        });
+
+        // Only the latest pan matters
+        if (this.viewRequest) this.viewRequest.abort();
+        this.viewRequest = new AbortController();
         try {
-            const response = await fetch('/api/search/cities?limit=100');
+            const response = await fetch(`/api/map/clusters?${params}`, { signal: this.viewRequest.signal });
             const data = await response.json();
-            
-            if (data.cities) {
-                data.cities.forEach(city => {
-                    this.mapManager.addCityMarker(city);
-                });
-                
-                // Fit map to show all cities
-                this.mapManager.fitMapToCities(data.cities);
-                this.currentSearchResults = data.cities;
-            }
+            if (!data.ok || this.activeSearch) return;
+
+            this.mapManager.clearMarkers();
+            data.features.forEach(feature => {
+                if (feature.type === 'cluster') {
+                    this.mapManager.addClusterMarker(feature);
+                } else {
+                    this.mapManager.addCityMarker(feature);
+                }
+            });
+            this.currentSearchResults = data.features.filter(feature => feature.type === 'city');
         } catch (error) {
-            console.error('Failed to load cities on map:', error);
+            if (error.name !== 'AbortError') {
+                console.error('Failed to load map clusters:', error);
+            }
         }
     }
 
@@ -96,6 +115,12 @@ class CitySearchWithMaps {
     async updateMapWithSearchResults(query, filters) {
         if (!this.mapManager) return;
 
+        this.activeSearch = Boolean(query || filters.country || filters.cost);
+        if (!this.activeSearch) {
+            this.loadClustersInView();
+            return;
+        }
+
         try {
             // Build search params
             const params = new URLSearchParams();
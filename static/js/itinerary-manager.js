@@ -354,7 +354,8 @@ class ItineraryManager {
         }
 
         const sections = [];
-        document.querySelectorAll('.section-card').forEach(section => {
+        const cards = Array.from(document.querySelectorAll('.section-card'));
+        cards.forEach(section => {
             const sectionId = section.dataset.section;
             const cityData = this.cities.get(sectionId);
             const dateRange = section.querySelector('.date-range-picker').value;
@@ -368,6 +369,7 @@ class ItineraryManager {
                 }));
 
             sections.push({
+                id: parseInt(section.dataset.destinationId, 10) || null,
                 order: parseInt(sectionId),
                 city: cityData,
                 dateRange,
@@ -382,7 +384,9 @@ class ItineraryManager {
         saveBtn.disabled = true;
 
         try {
-            const response = await fetch(`/api/trips/${this.tripId}/itinerary`, {
+            // tripWrite (itinerary builder page) adds If-Match and tracks the trip ETag
+            const send = typeof tripWrite === 'function' ? tripWrite : fetch;
+            const response = await send(`/api/trips/${this.tripId}/itinerary`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ sections })
@@ -390,7 +394,15 @@ class ItineraryManager {
 
             const data = await response.json();
             
+            if (response.status === 412) {
+                showNotification(data.message, 'error');
+                return;
+            }
             if (data.ok) {
+                // Round-trip row ids so the next save only sends a diff
+                (data.ids || []).forEach((id, i) => {
+                    if (id && cards[i]) cards[i].dataset.destinationId = id;
+                });
                 showNotification('Itinerary saved successfully!', 'success');
                 
                 // Update route visualization if available
@@ -79,6 +79,34 @@ class GlobeTrotterMaps {
         return marker;
     }
 
+    // Add a numbered marker for a server-side cluster; clicking zooms in until it splits
+    addClusterMarker(cluster) {
+        const size = Math.min(64, 28 + Math.round(Math.log10(cluster.count) * 12));
+        const marker = new google.maps.Marker({
+            position: { lat: cluster.coordinates.lat, lng: cluster.coordinates.lng },
+            map: this.map,
+            title: `${cluster.count} cities`,
+            label: { text: String(cluster.count), color: 'white', fontWeight: 'bold' },
+            icon: {
+                path: google.maps.SymbolPath.CIRCLE,
+                scale: size / 2,
+                fillColor: '#667eea',
+                fillOpacity: 0.85,
+                strokeColor: 'white',
+                strokeWeight: 2
+            },
+            zIndex: cluster.count
+        });
+
+        marker.addListener('click', () => {
+            this.map.setCenter(marker.getPosition());
+            this.map.setZoom(cluster.expansionZoom);
+        });
+
+        this.markers.push(marker);
+        return marker;
+    }
+
     // Get marker icon based on cost index
     getCityMarkerIcon(costIndex) {
         const icons = {
@@ -0,0 +1,123 @@
+/**
+ * Live notifications
+ * Keeps the navbar bell's unread badge and open list current from
+ * /api/notifications/stream (server-sent events) instead of polling.
+ */
+
+class NotificationStream {
+    // Backoff after the server refuses a stream (503 when its workers are full)
+    static MIN_RETRY_MS = 5000;
+    static MAX_RETRY_MS = 300000;
+
+    constructor(button, list) {
+        this.button = button;
+        this.list = list;
+        this.unread = 0;
+        this.lastEventId = null;
+        this.source = null;
+        this.retryTimer = null;
+        this.retryDelay = NotificationStream.MIN_RETRY_MS;
+
+        // Hidden tabs give their stream back to the server and resume when shown
+        document.addEventListener('visibilitychange', () => {
+            if (document.hidden) {
+                this.close();
+            } else {
+                this.open();
+            }
+        });
+        this.open();
+    }
+
+    open() {
+        clearTimeout(this.retryTimer);
+        this.retryTimer = null;
+        if (this.source) return;
+        // The browser only sends Last-Event-ID on its own reconnects
+        const query = this.lastEventId ? `?last_event_id=${encodeURIComponent(this.lastEventId)}` : '';
+        this.source = new EventSource(`/api/notifications/stream${query}`);
+
+        this.source.addEventListener('ready', (e) => {
+            this.retryDelay = NotificationStream.MIN_RETRY_MS;
+            this.remember(e);
+            this.setUnread(JSON.parse(e.data).unread);
+        });
+        this.source.addEventListener('resync', (e) => {
+            this.remember(e);
+            this.setUnread(JSON.parse(e.data).unread);
+            if (this.list) this.list.innerHTML = '';  // Refetched when the menu opens
+        });
+        this.source.addEventListener('notification', (e) => {
+            this.remember(e);
+            const item = JSON.parse(e.data);
+            if (!item.is_read) this.setUnread(this.unread + 1);
+            this.prepend(item);
+        });
+        this.source.addEventListener('error', () => {
+            // CLOSED means the server refused (e.g. 503 when busy) and the
+            // browser gave up; try again later. The menu still fetches
+            // /api/notifications when opened.
+            if (this.source && this.source.readyState === EventSource.CLOSED) {
+                this.source = null;
+                this.retryLater();
+            }
+        });
+    }
+
+    retryLater() {
+        if (this.retryTimer || document.hidden) return;
+        // Jitter keeps refused tabs from coming back all at once
+        const delay = this.retryDelay * (0.5 + Math.random() / 2);
+        this.retryDelay = Math.min(this.retryDelay * 2, NotificationStream.MAX_RETRY_MS);
+        this.retryTimer = setTimeout(() => this.open(), delay);
+    }
+
+    close() {
+        clearTimeout(this.retryTimer);
+        this.retryTimer = null;
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+    }
+
+    remember(e) {
+        if (e.lastEventId) this.lastEventId = e.lastEventId;
+    }
+
+    setUnread(count) {
+        this.unread = count;
+        let badge = this.button.querySelector('span');
+        if (!count) {
+            badge?.remove();
+            return;
+        }
+        if (!badge) {
+            badge = document.createElement('span');
+            badge.className = 'absolute -top-1 -right-1 min-w-[0.75rem] h-3 px-1 bg-red-500 text-white text-[10px] leading-3 rounded-full flex items-center justify-center';
+            this.button.appendChild(badge);
+        }
+        badge.textContent = count;
+    }
+
+    prepend(item) {
+        if (!this.list || !this.list.children.length) return;  // Not loaded yet
+        const row = document.createElement('div');
+        row.className = 'p-3 hover:bg-gray-50';
+        const message = document.createElement('div');
+        message.className = 'text-sm text-gray-900 font-medium';
+        message.textContent = item.message;
+        const time = document.createElement('div');
+        time.className = 'text-xs text-gray-400 mt-1';
+        time.textContent = new Date(item.created_at).toLocaleString();
+        row.append(message, time);
+        this.list.prepend(row);
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const button = document.getElementById('notifBtn');
+    if (button && window.EventSource) {
+        window.notificationStream = new NotificationStream(button, document.getElementById('notifList'));
+    }
+});
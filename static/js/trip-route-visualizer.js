@@ -336,7 +336,7 @@ class TripRouteVisualizer {
         }
     }
 
-    optimizeRoute() {
+    async optimizeRoute() {
         if (this.tripCities.length < 3) {
             alert('Need at least 3 cities to optimize route');
             return;
@@ -348,15 +348,40 @@ class TripRouteVisualizer {
         optimizeBtn.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i>Optimizing...';
         optimizeBtn.disabled = true;
 
-        // Simulate route optimization (in real app, this would call Google's optimization)
-        setTimeout(() => {
-            // Reset button
+        try {
+            // Keep the first stop where the traveller starts
+            const start = this.tripCities[0]?.id;
+            const response = await fetch(`/api/trips/${this.tripId}/route/optimize?start=${encodeURIComponent(start)}`);
+            const data = await response.json();
+            if (!data.ok) {
+                throw new Error(data.error || 'Optimization failed');
+            }
+
+            const byId = new Map(this.tripCities.map(city => [city.id, city]));
+            this.tripCities = data.order.map(stop => ({
+                ...byId.get(stop.id),
+                coordinates: stop.coordinates,
+                order_index: stop.order_index
+            }));
+            this.displayTripRoute();
+
+            const totalDistance = document.getElementById('total-distance');
+            if (totalDistance) {
+                totalDistance.textContent = `${data.optimized_distance_km} km`;
+            }
+            this.showNotification(
+                data.saved_km > 0
+                    ? `Suggested order saves ${data.saved_km} km (${data.current_distance_km} → ${data.optimized_distance_km} km)`
+                    : 'Your route is already the shortest one',
+                'success'
+            );
+        } catch (error) {
+            console.error('Route optimization failed:', error);
+            this.showNotification('Could not optimize the route', 'error');
+        } finally {
             optimizeBtn.innerHTML = originalText;
             optimizeBtn.disabled = false;
-            
-            // Show success message
-            this.showNotification('Route optimized for minimum travel time!', 'success');
-        }, 2000);
+        }
     }
 
     toggleSatelliteView() {
@@ -1,6 +1,8 @@
-from app import app, db, User
+from app import create_app, db, User
 import json
 
+app = create_app()
+
 app.app_context().push()
 client = app.test_client()
 
@@ -3,12 +3,14 @@
 Complete OTP system test including email verification
 """
 
-from app import app, db, send_otp_email
+from app import create_app, db, send_otp_email
 from models import User
 from flask import url_for
 import requests
 import time
 
+app = create_app()
+
 def test_complete_otp_flow():
     """Test the complete OTP verification flow"""
     print("=== Testing Complete OTP Flow ===\n")
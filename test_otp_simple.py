@@ -3,11 +3,13 @@
 Simple OTP verification test
 """
 
-from app import app, db
+from app import create_app, db
 from models import User
 from datetime import datetime
 import sqlite3
 
+app = create_app()
+
 def test_otp_basic():
     """Test basic OTP functionality"""
     print("=== Testing OTP System ===\n")
@@ -23,7 +25,7 @@ def test_otp_basic():
         print(f"✅ OTP columns exist: {has_otp_columns}")
         
         if not has_otp_columns:
-            print("❌ Missing OTP columns. Run: python migrate_otp_verification.py")
+            print("❌ Missing OTP columns. Run: python -m migrations upgrade")
             return False
         
         # Test user creation and OTP generation
@@ -25,7 +25,7 @@ def test_otp_system():
         
         if missing_columns:
             print(f"❌ Missing columns: {missing_columns}")
-            print("Please run: python migrate_otp_verification.py")
+            print("Please run: python -m migrations upgrade")
             return False
         
         print("✅ Database schema includes OTP verification fields")
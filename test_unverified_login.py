@@ -3,9 +3,11 @@
 Test login flow for unverified users
 """
 
-from app import app
+from app import create_app
 from flask import session
 
+app = create_app()
+
 def test_unverified_user_login():
     """Test what happens when unverified user tries to login"""
     with app.test_client() as client:
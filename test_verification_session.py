@@ -3,9 +3,11 @@
 Test the verification flow by setting up the session properly
 """
 
-from app import app
+from app import create_app
 from flask import session
 
+app = create_app()
+
 def test_verification_with_session():
     """Test verification with proper session setup"""
     with app.test_client() as client:
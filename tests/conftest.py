@@ -0,0 +1,13 @@
+import os
+import shutil
+import tempfile
+
+# Point the app at an in-memory database before app.py reads its config
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# Rendered fragments must not leak between test runs
+os.environ.setdefault("FRAGMENT_CACHE_DIR", tempfile.mkdtemp(prefix="globetrotter-fragments-"))
+# Budget lookups rewrite the cached cost/rate files; keep them out of data/
+_data_dir = tempfile.mkdtemp(prefix="globetrotter-data-")
+shutil.copy(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "city_costs.json"),
+            _data_dir)
+os.environ.setdefault("TRAVEL_DATA_DIR", _data_dir)
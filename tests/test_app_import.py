@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestAppImport(unittest.TestCase):
+    def test_import_does_not_configure_or_load_optional_deps(self):
+        check = ('import sys, app; '
+                 'print("sqlalchemy" in app.app.extensions, "flask_dance" in sys.modules, "numpy" in sys.modules); '
+                 'app.create_app(); print("sqlalchemy" in app.app.extensions, "flask_dance" in sys.modules)')
+        env = dict(os.environ, DATABASE_URL='sqlite://', GOOGLE_CLIENT_ID='id', GOOGLE_CLIENT_SECRET='secret')
+        output = subprocess.run([sys.executable, '-c', check], cwd=ROOT, env=env, check=True,
+                                capture_output=True, text=True).stdout.split('\n')
+        self.assertEqual(output[-3:-1], ['False False False', 'True False'])
+
+    def test_google_login_builds_the_consumer_on_first_use(self):
+        from app import create_app
+
+        client = create_app().test_client()
+        response = client.get('/login/google')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('accounts.google.com', response.headers['Location'])
+        self.assertIn('redirect_uri=http%3A%2F%2Flocalhost%3A5000%2Flogin%2Fgoogle%2Fauthorized',
+                      response.headers['Location'])
+
+
+if __name__ == '__main__':
+    unittest.main()
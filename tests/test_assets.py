@@ -0,0 +1,79 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from flask import Flask, render_template_string
+
+from assets import accepted_encodings, build, init_assets
+
+
+class TestAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, 'static')
+        os.makedirs(os.path.join(self.static, 'js'))
+        os.makedirs(os.path.join(self.static, 'css'))
+        with open(os.path.join(self.static, 'js', 'app.js'), 'w') as f:
+            f.write('// comment\nfunction add(first, second) {\n    return first + second;\n}\n')
+        with open(os.path.join(self.static, 'css', 'app.css'), 'w') as f:
+            f.write('/* comment */\nbody {\n    color: red;\n}\n')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_app(self):
+        app = Flask(__name__, static_folder=self.static)
+        init_assets(app)
+        return app
+
+    def test_build_minifies_hashes_and_compresses(self):
+        manifest = build(self.static, log=lambda *a: None)
+        hashed = manifest['js/app.js']
+        self.assertRegex(hashed, r'^dist/js/app\.[0-9a-f]{12}\.js$')
+        with open(os.path.join(self.static, hashed), 'rb') as f:
+            minified = f.read()
+        self.assertNotIn(b'comment', minified)
+        with open(os.path.join(self.static, hashed + '.gz'), 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), minified)
+        # Same content, same name
+        self.assertEqual(build(self.static, log=lambda *a: None), manifest)
+
+    def test_hashed_urls_and_precompressed_responses(self):
+        manifest = build(self.static, log=lambda *a: None)
+        app = self.make_app()
+        with app.test_request_context():
+            html = render_template_string(
+                "{{ url_for('static', filename='js/app.js') }} {{ asset_url('css/app.css') }}")
+        self.assertEqual(html, f"/static/{manifest['js/app.js']} /static/{manifest['css/app.css']}")
+
+        client = app.test_client()
+        url = f"/static/{manifest['js/app.js']}"
+        response = client.get(url, headers={'Accept-Encoding': 'gzip;q=0.8, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertTrue(response.content_type.startswith('text/javascript'))
+        response.close()
+
+        response = client.get(url)
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn(b'function add', response.data)
+        response.close()
+
+    def test_without_manifest_original_files_are_served(self):
+        app = self.make_app()
+        with app.test_request_context():
+            self.assertEqual(render_template_string("{{ asset_url('js/app.js') }}"), '/static/js/app.js')
+        response = app.test_client().get('/static/js/app.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response.headers.get('Cache-Control', ''))
+        response.close()
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('br;q=1.0, gzip;q=0.5, identity;q=0'), {'br', 'gzip'})
+        self.assertEqual(accepted_encodings(''), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from benchmarks.http_bench import compare, summarize
+
+
+class TestBenchmarkRegressions(unittest.TestCase):
+    def report(self, p95, queries):
+        return {"results": {"test_client": {"dashboard": {"p95_ms": p95, "queries": queries}}}}
+
+    def test_summarize_percentiles(self):
+        result = summarize([i / 1000 for i in range(1, 101)], [3, 4, 3], [200])
+        self.assertEqual((result["p50_ms"], result["p95_ms"], result["p99_ms"]), (51.0, 96.0, 100.0))
+        self.assertEqual(result["queries"], 4)
+
+    def test_flags_slower_p95_and_extra_queries(self):
+        baseline = self.report(40.0, 12)
+        self.assertEqual(compare(self.report(48.0, 12), baseline, 0.25), [])
+        self.assertEqual(len(compare(self.report(52.0, 12), baseline, 0.25)), 1)
+        # Small absolute changes are jitter, whatever the ratio
+        self.assertEqual(compare(self.report(4.0, 12), self.report(2.0, 12), 0.25), [])
+        self.assertEqual(compare(self.report(39.0, 13), baseline, 0.25),
+                         ["test_client/dashboard: queries 12 -> 13"])
+
+
+if __name__ == '__main__':
+    unittest.main()
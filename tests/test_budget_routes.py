@@ -1,8 +1,10 @@
 import unittest
-from app import app
+from app import create_app
 from models import db, User, Trip
 import json
 
+app = create_app()
+
 class TestBudgetRoutes(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
@@ -0,0 +1,111 @@
+import gzip
+import json
+import unittest
+
+from flask import Flask, Response, jsonify
+
+import compression
+from app import create_app
+from compression import init_compression
+from models import db, User, Trip
+
+main_app = create_app()
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route('/big')
+    def big():
+        return jsonify(items=[{'id': i, 'title': f'Trip {i}'} for i in range(200)])
+
+    @app.route('/small')
+    def small():
+        return jsonify(ok=True)
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'row {i}\n' for i in range(5000)), mimetype='text/csv')
+
+    @app.route('/events')
+    def events():
+        return Response(iter(['data: hi\n\n']), mimetype='text/event-stream')
+
+    init_compression(app)
+    return app
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.client = make_app().test_client()
+
+    def test_gzip_above_threshold_only(self):
+        response = self.client.get('/big', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.data))['items']), 200)
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+
+        response = self.client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        response = self.client.get('/big')
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    @unittest.skipIf(compression.brotli is None, 'brotli not installed')
+    def test_brotli_preferred(self):
+        response = self.client.get('/big', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(compression.brotli.decompress(response.data))['items']), 200)
+
+    def test_streamed_bodies_compressed_incrementally(self):
+        response = self.client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertTrue(gzip.decompress(response.data).startswith(b'row 0\nrow 1\n'))
+        self.assertNotIn('ETag', response.headers)
+
+        response = self.client.get('/events', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_weak_etag_and_304(self):
+        response = self.client.get('/big', headers={'Accept-Encoding': 'gzip'})
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+
+        # Weak comparison: the identity and gzip representations share the tag
+        response = self.client.get('/big', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+
+class TestApiConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        main_app.config['TESTING'] = True
+        self.client = main_app.test_client()
+        with main_app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            db.session.add(Trip(user_id=user.id, title='Goa trip', status='planned'))
+            db.session.commit()
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        with main_app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_search_revalidates_with_304(self):
+        response = self.client.get('/api/search/trips?q=goa')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/search/trips?q=goa', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
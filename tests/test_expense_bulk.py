@@ -0,0 +1,118 @@
+import io
+import unittest
+
+from app import create_app
+from expense_service import clear_summary_cache
+from models import db, User, Trip, TripExpense
+
+app = create_app()
+
+
+class TestExpenseBulk(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            trip = Trip(user_id=user.id, title='Test Trip', status='planned')
+            db.session.add(trip)
+            db.session.commit()
+            self.trip_id = trip.id
+
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        # Trip ids and expense versions repeat across tests on a fresh database
+        clear_summary_cache()
+
+    def url(self, query=''):
+        return f'/api/trips/{self.trip_id}/expenses/bulk{query}'
+
+    def count(self):
+        with app.app_context():
+            return TripExpense.query.filter_by(trip_id=self.trip_id).count()
+
+    def test_json_array_inserts_and_returns_summary(self):
+        rows = [{'category': 'meals', 'amount': 100 + i, 'expense_date': '2025-01-0%d' % (1 + i % 3)}
+                for i in range(1200)]
+        response = self.client.post(self.url(), json=rows)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['inserted'], 1200)
+        self.assertEqual(data['summary']['num_expenses'], 1200)
+        self.assertEqual(data['summary']['num_days'], 3)
+        self.assertEqual(self.count(), 1200)
+
+    def test_invalid_rows_roll_back_unless_skipped(self):
+        rows = [
+            {'category': 'meals', 'amount': 10, 'expense_date': '2025-01-01'},
+            {'category': 'spa', 'amount': 10, 'expense_date': '2025-01-01'},
+            {'category': 'meals', 'amount': 'ten', 'expense_date': '2025-01-01'},
+            {'category': 'meals', 'amount': '0', 'expense_date': '2025-01-01'},
+            {'category': 'meals', 'amount': 10, 'expense_date': '2025-01-01', 'description': ['Lunch']},
+        ]
+        response = self.client.post(self.url(), json=rows)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['errors'], [
+            {'row': 2, 'error': 'Invalid category'},
+            {'row': 3, 'error': 'Invalid amount format'},
+            {'row': 4, 'error': 'Amount must be a positive number'},
+            {'row': 5, 'error': 'Description must be text'},
+        ])
+        self.assertEqual(self.count(), 0)
+
+        response = self.client.post(self.url('?skip_invalid=1'), json={'expenses': rows})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['inserted'], 1)
+        self.assertEqual(self.count(), 1)
+
+    def test_csv_upload(self):
+        body = 'Category,Amount,Date,Description\nmeals,250,2025-02-01,Lunch\ntransport,90.5,2025-02-02,Cab\n'
+        response = self.client.post(self.url(), data=body.encode(), content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['summary']['total_amount'], 340.5)
+
+        response = self.client.post(self.url(), data={'file': (io.BytesIO(body.encode()), 'statement.csv')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.count(), 4)
+
+        # Excel's "CSV UTF-8" starts with a byte order mark
+        response = self.client.post(self.url(), data=b'\xef\xbb\xbf' + body.encode(), content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.count(), 6)
+
+
+    def test_summary_is_paginated_and_invalidated_on_writes(self):
+        rows = [{'category': 'meals' if i % 2 else 'transport', 'amount': 10, 'expense_date': '2025-03-0%d' % (1 + i % 2)}
+                for i in range(7)]
+        self.client.post(self.url(), json=rows)
+
+        data = self.client.get(f'/api/trips/{self.trip_id}/expenses?per_page=5&page=2').get_json()
+        self.assertEqual(len(data['expenses']), 2)
+        self.assertEqual(data['pagination'], {'page': 2, 'per_page': 5, 'total': 7, 'pages': 2})
+        self.assertEqual(data['summary']['category_breakdown'], {'meals': 30, 'transport': 40})
+        self.assertEqual(data['summary']['daily_totals'], {'2025-03-01': 40, '2025-03-02': 30})
+
+        response = self.client.post(f'/api/trips/{self.trip_id}/expenses',
+                                    json={'category': 'shopping', 'amount': 5, 'expense_date': '2025-03-03'})
+        expense_id = response.get_json()['expense']['id']
+        summary = self.client.get(f'/api/trips/{self.trip_id}/expenses/summary').get_json()['summary']
+        self.assertEqual((summary['total_amount'], summary['num_expenses'], summary['num_days']), (75, 8, 3))
+
+        self.client.delete(f'/api/trips/{self.trip_id}/expenses/{expense_id}')
+        summary = self.client.get(f'/api/trips/{self.trip_id}/expenses/summary').get_json()['summary']
+        self.assertEqual(summary['total_amount'], 70)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+from datetime import date
+
+import export_service
+from app import create_app
+from models import db, User, Trip, TripExpense
+
+app = create_app()
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            other = User(email='other@test.com', first_name='Other', last_name='User')
+            other.set_password('password')
+            db.session.add_all([user, other])
+            db.session.commit()
+            trip = Trip(user_id=user.id, title='Goa, "beach" trip', status='planned', start_date=date(2025, 3, 1))
+            db.session.add_all([trip, Trip(user_id=other.id, title='Not mine', status='planned')])
+            db.session.commit()
+            db.session.add_all([
+                TripExpense(trip_id=trip.id, category='meals', amount=10 + i, expense_date=date(2025, 3, 1))
+                for i in range(1200)
+            ])
+            db.session.commit()
+            self.trip_id = trip.id
+
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_trips_csv_only_has_own_trips(self):
+        response = self.client.get('/api/export/trips')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertIn('attachment; filename="trips-', response.headers['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([(r['title'], r['start_date']) for r in rows], [('Goa, "beach" trip', '2025-03-01')])
+
+    def test_expenses_ndjson_streams_in_chunks(self):
+        response = self.client.get(f'/api/trips/{self.trip_id}/expenses/export?format=ndjson')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        chunks = list(response.response)
+        self.assertGreater(len(chunks), 1200 // export_service.CHUNK_ROWS)
+        lines = b''.join(chunks).decode().splitlines()
+        self.assertEqual(len(lines), 1200)
+        self.assertEqual(json.loads(lines[0])['category'], 'meals')
+
+    def test_gzip_download(self):
+        response = self.client.get('/api/export/trips?gzip=1')
+        self.assertEqual(response.mimetype, 'application/gzip')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('.csv.gz"', response.headers['Content-Disposition'])
+        self.assertTrue(gzip.decompress(response.data).startswith(b'id,title,status'))
+
+    def test_bad_format_and_foreign_trip(self):
+        self.assertEqual(self.client.get('/api/export/trips?format=xml').status_code, 400)
+        with app.app_context():
+            foreign = Trip.query.filter_by(title='Not mine').one().id
+        self.assertEqual(self.client.get(f'/api/trips/{foreign}/expenses/export').status_code, 404)
+
+    def test_admin_export_requires_admin(self):
+        self.assertEqual(self.client.get('/admin/export/trips').status_code, 302)
+        with app.app_context():
+            User.query.filter_by(email='test@test.com').one().is_admin = True
+            db.session.commit()
+        rows = list(csv.DictReader(io.StringIO(self.client.get('/admin/export/trips').get_data(as_text=True))))
+        self.assertEqual(sorted(r['user_email'] for r in rows), ['other@test.com', 'test@test.com'])
+
+
+if __name__ == '__main__':
+    unittest.main()
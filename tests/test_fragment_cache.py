@@ -0,0 +1,95 @@
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from jinja2 import Environment
+
+from app import create_app
+from fragment_cache import FileCacheStore, FragmentCacheExtension
+from models import db, User, Trip
+
+app = create_app()
+
+
+class TestFragmentCacheExtension(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = Environment(extensions=[FragmentCacheExtension], autoescape=True)
+        self.env.fragment_cache_store = FileCacheStore(self.tmp.name)
+        self.template = self.env.from_string("{% cache ['greeting', stamp], 60 %}<b>{{ name }}</b>{% endcache %}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reuses_fragment_until_key_changes(self):
+        self.assertEqual(self.template.render(stamp=1, name='Ann & Bo'), '<b>Ann &amp; Bo</b>')
+        # Same key: the cached HTML is returned, not re-escaped or re-rendered
+        self.assertEqual(self.template.render(stamp=1, name='Other'), '<b>Ann &amp; Bo</b>')
+        self.assertEqual(self.template.render(stamp=2, name='Other'), '<b>Other</b>')
+        self.assertEqual(self.template.render(stamp=None, name='Uncached'), '<b>Uncached</b>')
+
+    def test_entries_expire(self):
+        store = self.env.fragment_cache_store
+        store.set('key', 'value', ttl=60)
+        self.assertEqual(store.get('key'), 'value')
+        store.set('key', 'value', ttl=-1)
+        self.assertIsNone(store.get('key'))
+        store.prune()
+        self.assertIsNone(store.get('key'))
+
+    @unittest.skipUnless(hasattr(os, 'geteuid'), 'POSIX ownership')
+    def test_directory_is_private(self):
+        directory = os.path.join(self.tmp.name, 'fragments')
+        FileCacheStore(directory)
+        self.assertEqual(stat.S_IMODE(os.stat(directory).st_mode), 0o700)
+
+        os.chmod(directory, 0o777)
+        FileCacheStore(directory)
+        self.assertEqual(stat.S_IMODE(os.stat(directory).st_mode), 0o700)
+
+        with mock.patch('fragment_cache.os.geteuid', return_value=os.geteuid() + 1):
+            with self.assertRaises(RuntimeError):
+                FileCacheStore(directory)
+
+
+class TestTripCardCaching(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        app.jinja_env.fragment_cache_store.clear()
+
+        with app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User', is_email_verified=True)
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            trip = Trip(user_id=user.id, title='Goa Getaway', status='completed')
+            db.session.add(trip)
+            db.session.commit()
+            self.trip_id = trip.id
+
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        app.jinja_env.fragment_cache_store.clear()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_cards_invalidated_by_trip_write(self):
+        self.assertIn(b'Goa Getaway', self.client.get('/dashboard/my-trips').data)
+        self.assertIn(b'Goa Getaway', self.client.get('/dashboard/my-trips').data)
+
+        response = self.client.put(f'/api/trips/{self.trip_id}/update', json={'field': 'title', 'value': 'Kerala Loop'})
+        self.assertEqual(response.status_code, 200)
+        page = self.client.get('/dashboard/my-trips').data
+        self.assertIn(b'Kerala Loop', page)
+        self.assertNotIn(b'Goa Getaway', page)
+
+
+if __name__ == '__main__':
+    unittest.main()
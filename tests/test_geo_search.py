@@ -0,0 +1,129 @@
+import random
+import unittest
+
+import numpy as np
+
+import geo_service
+from app import create_app
+from models import db, City
+
+app = create_app()
+
+CITIES = [
+    ('Delhi', 'India', 28.6139, 77.2090, 'medium', 5),
+    ('Agra', 'India', 27.1767, 78.0081, 'low', 4),
+    ('Jaipur', 'India', 26.9124, 75.7873, 'medium', 5),
+    ('Mumbai', 'India', 19.0760, 72.8777, 'high', 5),
+    ('Kathmandu', 'Nepal', 27.7172, 85.3240, 'low', 4),
+    ('Suva', 'Fiji', -18.1248, 178.4501, 'medium', 2),
+    ('Apia', 'Samoa', -13.8507, -171.7514, 'low', 2),
+]
+
+
+class TestGeoIndex(unittest.TestCase):
+    def test_geohash_matches_reference(self):
+        self.assertEqual(geo_service.encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo_service.encode_geohash(-25.382708, -49.265506, 7), '6gkzwgj')
+
+    def test_prefixes_cover_circle(self):
+        rng = random.Random(5)
+        for radius_km in (1, 40, 300):
+            lat, lng = rng.uniform(-60, 60), rng.uniform(-180, 180)
+            prefixes = geo_service.geohash_prefixes(lat, lng, radius_km)
+            for _ in range(200):
+                # Random points inside the circle (small-angle offsets)
+                distance, bearing = rng.uniform(0, radius_km) / 111.2, rng.uniform(0, 2 * np.pi)
+                plat = lat + distance * np.cos(bearing)
+                plng = lng + distance * np.sin(bearing) / np.cos(np.radians(plat))
+                geohash = geo_service.encode_geohash(plat, (plng + 180) % 360 - 180)
+                self.assertTrue(any(geohash.startswith(p) for p in prefixes), (radius_km, geohash, prefixes))
+
+    def test_kdtree_matches_brute_force(self):
+        rng = np.random.default_rng(11)
+        lats, lngs = rng.uniform(-85, 85, 2000), rng.uniform(-180, 180, 2000)
+        points = geo_service._unit_vectors(lats, lngs)
+        tree = geo_service.KDTree(points)
+        for lat, lng in ((0.0, 179.9), (80.0, -20.0), (12.5, 77.0)):
+            point = geo_service._unit_vectors([lat], [lng])[0]
+            distances = np.linalg.norm(points - point, axis=1)
+            indexes, chords = tree.nearest(point, 7)
+            self.assertEqual(list(indexes), list(np.argsort(distances)[:7]))
+            self.assertTrue(np.all(np.diff(chords) >= 0))
+            found, _ = tree.within(point, 0.1)
+            self.assertEqual(sorted(found), sorted(np.flatnonzero(distances <= 0.1)))
+
+
+class TestCitySearchEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        geo_service.reset_city_index()
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                City(name=name, country=country, latitude=lat, longitude=lng, cost_index=cost, popularity=popularity,
+                     attractions='["Old town"]')
+                for name, country, lat, lng, cost, popularity in CITIES
+            ])
+            db.session.add(City(name='Nowhere', country='India'))
+            db.session.commit()
+
+    def tearDown(self):
+        geo_service.reset_city_index()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def search(self, **params):
+        response = self.client.get('/api/search/cities', query_string=params)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()['cities']
+
+    def test_within_radius_closest_first(self):
+        cities = self.search(lat=28.6, lng=77.2, radius_km=300)
+        self.assertEqual([c['name'] for c in cities], ['Delhi', 'Agra', 'Jaipur'])
+        self.assertLess(cities[0]['distanceKm'], 2)
+        self.assertEqual(cities[0]['attractions'], ['Old town'])
+        self.assertEqual(cities[1]['coordinates'], {'lat': 27.1767, 'lng': 78.0081})
+
+    def test_nearest_k_with_filters(self):
+        self.assertEqual([c['name'] for c in self.search(lat=28.6, lng=77.2, k=2)], ['Delhi', 'Agra'])
+        self.assertEqual([c['name'] for c in self.search(lat=28.6, lng=77.2, k=2, cost_filter='low')],
+                         ['Agra', 'Kathmandu'])
+        # Across the antimeridian
+        self.assertEqual([c['name'] for c in self.search(lat=-16, lng=-179, k=2)], ['Suva', 'Apia'])
+
+    def test_catalog_listing_and_text_filter(self):
+        cities = self.search(limit=100)
+        self.assertEqual(len(cities), 7)
+        self.assertEqual(cities[0]['popularity'], 5)
+        self.assertEqual([c['name'] for c in self.search(query='jai')], ['Jaipur'])
+        self.assertEqual({c['name'] for c in self.search(country='nepal')}, {'Kathmandu'})
+
+    def test_index_follows_catalog_changes(self):
+        self.assertEqual(len(self.search(lat=28.6, lng=77.2, radius_km=20)), 1)
+        with app.app_context():
+            db.session.add(City(name='Gurgaon', country='India', latitude=28.4595, longitude=77.0266))
+            db.session.commit()
+            self.assertEqual(City.query.filter_by(name='Gurgaon').one().geohash,
+                             geo_service.encode_geohash(28.4595, 77.0266))
+        self.assertEqual([c['name'] for c in self.search(lat=28.6, lng=77.2, radius_km=30)], ['Delhi', 'Gurgaon'])
+
+    def test_large_catalog_uses_geohash_query(self):
+        previous = geo_service.CITY_INDEX_MAX_ROWS
+        geo_service.CITY_INDEX_MAX_ROWS = 1
+        try:
+            self.assertEqual([c['name'] for c in self.search(lat=28.6, lng=77.2, radius_km=300)],
+                             ['Delhi', 'Agra', 'Jaipur'])
+            self.assertEqual([c['name'] for c in self.search(lat=28.6, lng=77.2, k=3, cost_filter='low')],
+                             ['Agra', 'Kathmandu', 'Apia'])
+        finally:
+            geo_service.CITY_INDEX_MAX_ROWS = previous
+
+    def test_rejects_bad_coordinates(self):
+        for params in ({'lat': 10}, {'lat': 95, 'lng': 0}, {'radius_km': 10}, {'lat': 1, 'lng': 1, 'radius_km': -1}):
+            self.assertEqual(self.client.get('/api/search/cities', query_string=params).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
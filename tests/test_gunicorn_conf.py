@@ -0,0 +1,53 @@
+import os
+import runpy
+import tempfile
+import unittest
+from unittest import mock
+
+CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+
+def load(**env):
+    with mock.patch.dict(os.environ, env):
+        return runpy.run_path(CONF)
+
+
+class TestGunicornConf(unittest.TestCase):
+    def test_worker_count_bounded_by_cpu_and_memory(self):
+        derive = load()["derive_workers"]
+        self.assertEqual(derive("sync", 4, 16384, 160), 9)
+        self.assertEqual(derive("gthread", 4, 16384, 160), 5)
+        # 512 MB container: only two workers fit
+        self.assertEqual(derive("sync", 8, 512, 160), 2)
+        self.assertEqual(derive("gthread", 1, 100, 160), 1)
+
+    def test_profiles(self):
+        conf = load(GUNICORN_PROFILE="gthread", GUNICORN_THREADS="6", WEB_CONCURRENCY="3")
+        self.assertEqual((conf["worker_class"], conf["workers"], conf["threads"]), ("gthread", 3, 6))
+        self.assertTrue(conf["preload_app"])
+        self.assertGreater(conf["max_requests_jitter"], 0)
+
+        conf = load(GUNICORN_PROFILE="sync")
+        self.assertEqual(conf["worker_class"], "sync")
+        self.assertNotIn("threads", conf)
+
+        with self.assertRaises(RuntimeError):
+            load(GUNICORN_PROFILE="eventlet")
+
+    def test_metrics_dir_is_never_wiped_on_load(self):
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            keep = os.path.join(metrics_dir, 'notes.txt')
+            stale = os.path.join(metrics_dir, 'counter_123.db')
+            for path in (keep, stale):
+                open(path, 'w').close()
+
+            conf = load(PROMETHEUS_MULTIPROC_DIR=metrics_dir)
+            self.assertEqual(conf['METRICS_DIR'], metrics_dir)
+            self.assertTrue(os.path.exists(stale))  # A reload keeps the live workers' files
+
+            conf['on_starting'](None)
+            self.assertEqual(os.listdir(metrics_dir), ['notes.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
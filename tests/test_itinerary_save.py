@@ -0,0 +1,90 @@
+import unittest
+from datetime import date
+
+from app import create_app
+from models import db, User, Trip, TripDestination, TripExpense
+
+app = create_app()
+
+
+class TestItinerarySave(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            trip = Trip(user_id=user.id, title='Test Trip', status='planned')
+            db.session.add(trip)
+            db.session.commit()
+            self.trip_id = trip.id
+
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def save(self, sections):
+        response = self.client.post(f'/api/trips/{self.trip_id}/itinerary', json={'sections': sections})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def section(self, city, order, **extra):
+        return {'city': city, 'order': order, 'dateRange': '', 'budget': 0, 'activities': [], **extra}
+
+    def destinations(self):
+        with app.app_context():
+            rows = TripDestination.query.filter_by(trip_id=self.trip_id).order_by(TripDestination.order_index).all()
+            return [(r.id, r.name, r.order_index, r.budget) for r in rows]
+
+    def test_first_save_inserts_and_returns_ids(self):
+        data = self.save([self.section('Goa', 1), self.section('', 2), self.section('Delhi', 3)])
+        self.assertEqual(data['inserted'], 2)
+        self.assertIsNone(data['ids'][1])
+        self.assertEqual([d[0] for d in self.destinations()], [data['ids'][0], data['ids'][2]])
+
+    def test_unchanged_save_is_noop(self):
+        ids = self.save([self.section('Goa', 1), self.section('Delhi', 2)])['ids']
+        data = self.save([self.section('Goa', 1, id=ids[0]), self.section('Delhi', 2, id=ids[1])])
+        self.assertTrue(data['unchanged'])
+        self.assertEqual(data['ids'], ids)
+
+    def test_reorder_and_edit_keep_primary_keys(self):
+        goa, delhi = self.save([self.section('Goa', 1), self.section('Delhi', 2)])['ids']
+        data = self.save([self.section('Delhi', 1, id=delhi), self.section('Goa', 2, id=goa, budget=500)])
+        self.assertEqual(data['updated'], 2)
+        self.assertEqual(data['inserted'], 0)
+        self.assertEqual(self.destinations(), [(delhi, 'Delhi', 0, 0), (goa, 'Goa', 1, 500)])
+
+    def test_removed_section_detaches_expenses(self):
+        goa, delhi = self.save([self.section('Goa', 1), self.section('Delhi', 2)])['ids']
+        with app.app_context():
+            db.session.add(TripExpense(trip_id=self.trip_id, category='meals', amount=100,
+                                       expense_date=date(2024, 1, 1), destination_id=delhi))
+            db.session.commit()
+        data = self.save([self.section('Goa', 1, id=goa)])
+        self.assertEqual(data['deleted'], 1)
+        self.assertEqual([d[0] for d in self.destinations()], [goa])
+        with app.app_context():
+            self.assertIsNone(TripExpense.query.one().destination_id)
+
+    def test_activities_and_dates_round_trip(self):
+        activities = [{'name': 'Beach', 'cost': 0, 'id': 'tmp-1'}, 'Fort Aguada', {'location': 'nameless'}]
+        self.save([self.section('Goa', 1, dateRange='2025-03-01 to 2025-03-04', activities=activities)])
+        data = self.client.get(f'/api/trips/{self.trip_id}/itinerary').get_json()
+        section = data['sections'][0]
+        self.assertEqual(section['activities'], [{'name': 'Beach', 'cost': 0}, {'name': 'Fort Aguada'}])
+        self.assertEqual((section['startDate'], section['endDate']), ('2025-03-01', '2025-03-04'))
+        with app.app_context():
+            self.assertEqual(TripDestination.query.one().duration_days, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import cluster_service
+import geo_service
+from app import create_app
+from models import db, User, Trip, TripDestination, City
+
+app = create_app()
+
+CITIES = {
+    'Delhi': (28.6139, 77.2090),
+    'Gurgaon': (28.4595, 77.0266),
+    'Agra': (27.1767, 78.0081),
+    'Mumbai': (19.0760, 72.8777),
+    'Pune': (18.5204, 73.8567),
+    'Suva': (-18.1248, 178.4501),
+}
+WORLD = '-180,-85,180,85'
+
+
+class TestMapClusters(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        geo_service.reset_city_index()
+        cluster_service.reset_cluster_index()
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([City(name=name, country='India', latitude=lat, longitude=lng, cost_index='low')
+                                for name, (lat, lng) in CITIES.items()])
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            trip = Trip(user_id=user.id, title='North', status='planned')
+            db.session.add(trip)
+            db.session.commit()
+            for position, name in enumerate(['Delhi', 'agra ', 'Delhi', 'Atlantis']):
+                db.session.add(TripDestination(trip_id=trip.id, name=name, city=name, order_index=position,
+                                               sequence=position + 1))
+            db.session.commit()
+
+    def tearDown(self):
+        geo_service.reset_city_index()
+        cluster_service.reset_cluster_index()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def features(self, bbox=WORLD, zoom=0):
+        response = self.client.get('/api/map/clusters', query_string={'bbox': bbox, 'zoom': zoom})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()['features']
+
+    def test_world_view_clusters_everything(self):
+        features = self.features(zoom=0)
+        clusters = [f for f in features if f['type'] == 'cluster']
+        self.assertEqual(sum(f['count'] if f['type'] == 'cluster' else 1 for f in features), len(CITIES))
+        india = max(clusters, key=lambda f: f['count'])
+        self.assertEqual(india['count'], 5)
+        self.assertEqual(india['destinations'], 3)
+        self.assertGreater(india['expansionZoom'], 0)
+        self.assertEqual([f['name'] for f in features if f['type'] == 'city'], ['Suva'])
+
+    # A cell viewed at its expansion zoom can span more than MAX_TILES tiles;
+    # serve it at that zoom instead of a coarser one
+    @mock.patch.object(cluster_service, 'MAX_TILES', 1024)
+    def test_expansion_zoom_splits_cluster(self):
+        for zoom in range(3):  # The whole world fits in MAX_TILES up to zoom 2
+            for cluster in self.features(zoom=zoom):
+                if cluster['type'] != 'cluster':
+                    continue
+                # Viewport = the cluster's grid cell
+                _, cx, cy = map(int, cluster['id'].split('/'))
+                cells = 2 ** zoom * cluster_service.CELLS_PER_TILE
+                lats, lngs = cluster_service.unproject([cx / cells, (cx + 1) / cells], [(cy + 1) / cells, cy / cells])
+                bbox = f'{lngs[0]},{lats[0]},{lngs[1]},{lats[1]}'
+
+                def inside(zoom):
+                    # Whole tiles are returned; keep what lies in the cell
+                    return [f for f in self.features(bbox, zoom)
+                            if lats[0] <= f['coordinates']['lat'] <= lats[1]
+                            and lngs[0] <= f['coordinates']['lng'] <= lngs[1]]
+                expanded = inside(cluster['expansionZoom'])
+                self.assertGreater(len(expanded), 1, (zoom, cluster))
+                self.assertEqual(sum(f.get('count', 1) for f in expanded), cluster['count'])
+                if cluster['expansionZoom'] > zoom + 1:
+                    self.assertEqual(len(inside(cluster['expansionZoom'] - 1)), 1)
+
+    def test_zoomed_in_returns_cities_in_bbox(self):
+        features = self.features('76.5,28,77.5,29', 10)
+        self.assertEqual(sorted(f['name'] for f in features), ['Delhi', 'Gurgaon'])
+        delhi = next(f for f in features if f['name'] == 'Delhi')
+        self.assertEqual((delhi['destinations'], delhi['costIndex']), (2, 'low'))
+
+    def test_antimeridian_bbox(self):
+        names = [f.get('name') for f in self.features('170,-30,-170,0', 4)]
+        self.assertEqual(names, ['Suva'])
+
+    def test_rejects_bad_viewports(self):
+        for params in ({'zoom': 3}, {'bbox': '1,2,3', 'zoom': 3}, {'bbox': WORLD}, {'bbox': '0,10,5,5', 'zoom': 2}):
+            self.assertEqual(self.client.get('/api/map/clusters', query_string=params).status_code, 400)
+
+    def test_large_viewport_is_served_at_a_coarser_zoom(self):
+        data = self.client.get('/api/map/clusters', query_string={'bbox': WORLD, 'zoom': 12}).get_json()
+        self.assertEqual(data['zoom'], 2)
+        self.assertLessEqual(len(data['features']),
+                             cluster_service.MAX_TILES * cluster_service.CELLS_PER_TILE ** 2)
+        self.assertEqual(data['features'], self.features(zoom=2))
+
+    def test_hierarchy_is_consistent(self):
+        rng = np.random.default_rng(4)
+        with app.app_context():
+            db.session.add_all([City(name=f'C{i}', country='X', latitude=lat, longitude=lng)
+                                for i, (lat, lng) in enumerate(zip(rng.uniform(-60, 70, 500), rng.uniform(-180, 180, 500)))])
+            db.session.commit()
+            geo_service.reset_city_index()
+            index = cluster_service.cluster_index()
+        for level in index.levels:
+            self.assertEqual(int(level['count'].sum()), len(CITIES) + 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from app import create_app
+from models import db, User, Trip
+
+app = create_app()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            trip = Trip(user_id=user.id, title='Test Trip', status='planned')
+            db.session.add(trip)
+            db.session.commit()
+            self.trip_id = trip.id
+
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_latency_histogram_and_cache_counters(self):
+        self.client.get(f'/api/trips/{self.trip_id}/expenses/summary')
+        self.client.get(f'/api/trips/{self.trip_id}/expenses/summary')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+        self.assertIn('globetrotter_http_request_duration_seconds_bucket{le="0.005",method="GET",'
+                      'route="/api/trips/<int:trip_id>/expenses/summary",status="200"}', body)
+        self.assertIn('globetrotter_cache_requests_total{cache="expense_summary",result="hit"}', body)
+        self.assertNotIn('route="/metrics"', body)
+
+    def test_token_required_when_configured(self):
+        with mock.patch.dict(os.environ, {'METRICS_TOKEN': 'secret'}):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+            self.assertEqual(response.status_code, 200)
+
+    def test_multiprocess_values_are_merged(self):
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=metrics_dir)
+            worker = 'import metrics; metrics.record_cache("city_details", hit=True)'
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', worker], cwd=ROOT, env=env, check=True)
+            scrape = 'import metrics; print(metrics.render_metrics()[0].decode())'
+            output = subprocess.run([sys.executable, '-c', scrape], cwd=ROOT, env=env, check=True,
+                                    capture_output=True, text=True).stdout
+        self.assertIn('globetrotter_cache_requests_total{cache="city_details",result="hit"} 2.0', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
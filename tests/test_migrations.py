@@ -0,0 +1,206 @@
+import ast
+import inspect
+import os
+import unittest
+
+import sqlalchemy as sa
+
+from migrations import MigrationRunner, load_migrations
+
+
+class TestMigrationRunner(unittest.TestCase):
+    def setUp(self):
+        self.engine = sa.create_engine("sqlite://")
+        self.log = []
+        self.runner = MigrationRunner(self.engine, log=self.log.append)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_versions_are_unique_and_ordered(self):
+        versions = [m.VERSION for m in load_migrations()]
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_upgrade_fresh_database(self):
+        applied = self.runner.upgrade()
+        self.assertEqual(applied, [m.VERSION for m in load_migrations()])
+        inspector = sa.inspect(self.engine)
+        for table in ("user", "trips", "trip_destinations", "trip_expenses", "cities", "schema_version"):
+            self.assertTrue(inspector.has_table(table), table)
+        index_names = {i["name"] for i in inspector.get_indexes("trips")}
+        self.assertIn("ix_trips_user_status", index_names)
+        with self.engine.connect() as conn:
+            self.assertGreater(conn.execute(sa.text("SELECT COUNT(*) FROM cities")).scalar(), 0)
+
+    def test_upgrade_is_idempotent(self):
+        self.runner.upgrade()
+        self.assertEqual(self.runner.upgrade(), [])
+        self.assertEqual(self.runner.pending(), [])
+
+    def test_upgrade_legacy_database_adds_missing_columns(self):
+        with self.engine.begin() as conn:
+            conn.execute(sa.text(
+                "CREATE TABLE user (id INTEGER PRIMARY KEY, first_name VARCHAR(80) NOT NULL, "
+                "last_name VARCHAR(80) NOT NULL, email VARCHAR(255) NOT NULL, password_hash VARCHAR(255) NOT NULL, "
+                "created_at DATETIME NOT NULL)"
+            ))
+            conn.execute(sa.text(
+                "INSERT INTO user (id, first_name, last_name, email, password_hash, created_at) "
+                "VALUES (1, 'A', 'B', 'a@b.c', 'x', '2024-01-01 00:00:00')"
+            ))
+        self.runner.upgrade()
+        columns = {c["name"] for c in sa.inspect(self.engine).get_columns("user")}
+        self.assertTrue({"is_admin", "is_active", "is_email_verified", "otp_code"} <= columns)
+        with self.engine.connect() as conn:
+            row = conn.execute(sa.text("SELECT is_admin, is_active FROM user WHERE id = 1")).one()
+        self.assertEqual((row.is_admin, row.is_active), (0, 1))
+
+    def test_dry_run_changes_nothing(self):
+        self.runner.upgrade(dry_run=True)
+        self.assertFalse(sa.inspect(self.engine).has_table("trips"))
+        self.assertTrue(any("CREATE TABLE" in line for line in self.log))
+        self.assertEqual(len(self.runner.pending()), len(load_migrations()))
+
+    def test_destination_activities_are_backfilled(self):
+        from migrations import Operations
+
+        self.runner.upgrade()
+        with self.engine.begin() as conn:
+            conn.execute(sa.text(
+                "INSERT INTO trip_destinations (id, trip_id, name, order_index, sequence, date_range, notes) VALUES "
+                "(1, 1, 'Paris', 0, 1, '2025-03-04 to 2025-03-01', '[{\"name\": \"Louvre\", \"cost\": 20}, \"Seine walk\"]'), "
+                "(2, 1, 'Rome', 1, 2, 'soon', 'Bring an umbrella')"
+            ))
+        migration = next(m for m in load_migrations() if m.VERSION == 10)
+        with self.engine.begin() as conn:
+            migration.upgrade(Operations(conn, log=self.log.append))
+            rows = conn.execute(sa.select(migration.destinations).order_by(sa.text("id"))).all()
+        self.assertEqual(rows[0].activities, [{"name": "Louvre", "cost": 20}, {"name": "Seine walk"}])
+        self.assertIsNone(rows[0].notes)
+        self.assertEqual((str(rows[0].start_date), str(rows[0].end_date)), ("2025-03-01", "2025-03-04"))
+        self.assertEqual((rows[1].activities, rows[1].notes), ([], "Bring an umbrella"))
+        self.assertIsNone(rows[1].start_date)
+
+    def test_place_id_is_added_with_foreign_key(self):
+        from migrations import Operations
+
+        with self.engine.begin() as conn:
+            conn.execute(sa.text(
+                "CREATE TABLE trip_destinations (id INTEGER PRIMARY KEY, trip_id INTEGER NOT NULL, "
+                "name VARCHAR(200) NOT NULL, city VARCHAR(120), country VARCHAR(120), city_id INTEGER)"
+            ))
+            migration = next(m for m in load_migrations() if m.VERSION == 17)
+            migration.upgrade(Operations(conn, log=self.log.append))
+        foreign_keys = sa.inspect(self.engine).get_foreign_keys("trip_destinations")
+        self.assertEqual([(fk["constrained_columns"], fk["referred_table"], fk["referred_columns"]) for fk in foreign_keys],
+                         [(["place_id"], "places", ["id"])])
+
+    def test_popularity_is_seeded_from_existing_rows(self):
+        from migrations import Operations
+
+        self.runner.upgrade()
+        migration = next(m for m in load_migrations() if m.VERSION == 16)
+        with self.engine.begin() as conn:
+            conn.execute(sa.text("DROP TABLE destination_popularity"))
+            conn.execute(sa.text(
+                "INSERT INTO trips (id, user_id, title, status, priority, created_at) "
+                "VALUES (1, 1, 'T', 'planned', 'medium', '2025-01-01 00:00:00')"
+            ))
+            conn.execute(sa.text(
+                "INSERT INTO trip_destinations (id, trip_id, name, order_index, sequence, city) "
+                "VALUES (1, 1, 'Stop', 0, 1, ' Goa'), (2, 1, 'goa', 1, 2, NULL)"
+            ))
+            conn.execute(sa.text(
+                "INSERT INTO wishlist_items (id, user_id, title, city, rating, created_at) "
+                "VALUES (1, 1, 'Beach', 'GOA', 5, '2025-01-01 00:00:00')"
+            ))
+            migration.upgrade(Operations(conn, log=self.log.append))
+            rows = conn.execute(sa.text("SELECT key, name, score, trips, wishlists FROM destination_popularity")).all()
+        self.assertEqual(rows, [("goa", "Goa", 2.5, 2, 1)])
+
+    def test_existing_stops_are_resolved_to_places(self):
+        self.runner.upgrade()
+        migration = next(m for m in load_migrations() if m.VERSION == 17)
+        with self.engine.begin() as conn:
+            conn.execute(sa.text(
+                "INSERT INTO trip_destinations (id, trip_id, name, order_index, sequence, city, country, city_id) "
+                "VALUES (1, 1, 'Goa', 0, 1, NULL, NULL, NULL), (2, 1, 'goa.', 1, 2, NULL, 'India', NULL), "
+                "(3, 1, 'Stop', 2, 3, 'Goa', 'Portugal', 99), (4, 1, '...', 3, 4, NULL, NULL, NULL)"
+            ))
+            migration.backfill(conn, batch_size=2)
+            rows = conn.execute(sa.text("SELECT place_id, city_id FROM trip_destinations ORDER BY id")).all()
+        self.assertEqual(rows[0], rows[1])
+        self.assertNotEqual(rows[2][0], rows[0][0])
+        self.assertEqual(rows[2][1], 99)  # An explicit city is kept
+        self.assertEqual(rows[3], (None, None))
+
+    def test_fresh_database_matches_models(self):
+        from models import db
+
+        self.runner.upgrade()
+        migrated = sa.inspect(self.engine)
+        for table in db.metadata.sorted_tables:
+            columns = {c["name"]: c for c in migrated.get_columns(table.name)}
+            for column in table.columns:
+                self.assertIn(column.name, columns, table.name)
+                self.assertEqual(columns[column.name]["nullable"], column.nullable, f"{table.name}.{column.name}")
+                self.assertEqual(columns[column.name]["type"]._type_affinity, column.type._type_affinity,
+                                 f"{table.name}.{column.name}")
+            foreign_keys = {(tuple(fk["constrained_columns"]), fk["referred_table"])
+                            for fk in migrated.get_foreign_keys(table.name)}
+            for fk in table.foreign_keys:
+                self.assertIn(((fk.parent.name,), fk.column.table.name), foreign_keys, table.name)
+            indexes = {(tuple(i["column_names"]), bool(i["unique"])) for i in migrated.get_indexes(table.name)}
+            for index in table.indexes:
+                self.assertIn((tuple(c.name for c in index.columns), bool(index.unique)), indexes, index.name)
+
+    def test_migrations_do_not_import_models(self):
+        # A migration must create the tables of its own time, not today's models
+        for migration in load_migrations():
+            self.assertFalse(hasattr(migration, "db") or any(
+                getattr(value, "__module__", None) == "models" for value in vars(migration).values()
+            ), migration.__name__)
+
+    def test_migrations_import_no_application_modules(self):
+        # Helpers a migration needs are copied into it, frozen at its version
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        local = {name[:-3] for name in os.listdir(root) if name.endswith(".py")}
+        local |= {name for name in os.listdir(root) if os.path.isfile(os.path.join(root, name, "__init__.py"))}
+        for migration in load_migrations():
+            tree = ast.parse(inspect.getsource(migration))
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    names = [alias.name for alias in node.names]
+                elif isinstance(node, ast.ImportFrom):
+                    names = [node.module or ""]
+                else:
+                    continue
+                for name in names:
+                    self.assertNotIn(name.split(".")[0], local, migration.__name__)
+
+    def test_seeded_cities_get_geohashes(self):
+        from geo_service import encode_geohash
+
+        self.runner.upgrade()
+        with self.engine.begin() as conn:
+            rows = conn.execute(sa.text("SELECT latitude, longitude, geohash FROM cities")).all()
+        self.assertTrue(rows)
+        for lat, lng, geohash in rows:
+            self.assertEqual(geohash, encode_geohash(lat, lng))
+
+    def test_postgres_indexes_are_created_concurrently(self):
+        from migrations import Operations
+        from sqlalchemy.dialects import postgresql
+
+        class FakeConnection:
+            dialect = postgresql.dialect()
+
+        op = Operations(FakeConnection(), log=self.log.append)
+        op.has_index = lambda table, name: False
+        op.create_index("ix_trips_user_status", "trips", ["user_id", "status"])
+        self.assertEqual(len(op.deferred), 1)
+        self.assertIn("CREATE INDEX CONCURRENTLY IF NOT EXISTS", op.deferred[0][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
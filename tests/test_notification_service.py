@@ -0,0 +1,126 @@
+import unittest
+from datetime import date, datetime, timedelta
+
+import notification_service
+from app import create_app
+from models import db, User, Notification, Trip, WishlistItem
+
+app = create_app()
+
+
+class TestNotificationService(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        notification_service.clear_unread_cache()
+
+        with app.app_context():
+            db.create_all()
+            users = []
+            for email in ('test@test.com', 'other@test.com'):
+                user = User(email=email, first_name='Test', last_name='User')
+                user.set_password('password')
+                users.append(user)
+            db.session.add_all(users)
+            db.session.commit()
+            self.user_id, self.other_id = users[0].id, users[1].id
+            db.session.add_all([Notification(user_id=self.user_id, message=f'n{i}') for i in range(3)])
+            db.session.add(Notification(user_id=self.other_id, message='theirs'))
+            db.session.commit()
+
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        notification_service.clear_unread_cache()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def unread(self, user_id):
+        with app.app_context():
+            return Notification.query.filter_by(user_id=user_id, is_read=False).count()
+
+    def test_mark_read_by_ids_and_all(self):
+        with app.app_context():
+            first = Notification.query.filter_by(user_id=self.user_id).order_by(Notification.id).first().id
+            theirs = Notification.query.filter_by(user_id=self.other_id).one().id
+        data = self.client.post('/api/notifications/mark-read', json={'ids': [first, theirs]}).get_json()
+        self.assertEqual(data, {'ok': True, 'updated': 1})
+        self.assertEqual(self.unread(self.user_id), 2)
+
+        data = self.client.post('/api/notifications/mark-read', json={}).get_json()
+        self.assertEqual(data['updated'], 2)
+        self.assertEqual((self.unread(self.user_id), self.unread(self.other_id)), (0, 1))
+
+    def test_mark_read_requires_an_existing_user(self):
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'deleted@test.com'
+        response = self.client.post('/api/notifications/mark-read', json={})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.unread(self.user_id), 3)
+
+    def test_unread_count_cached_until_mark_read(self):
+        with app.app_context():
+            self.assertEqual(notification_service.unread_count(self.user_id), 3)
+            db.session.add(Notification(user_id=self.user_id, message='late'))
+            db.session.commit()
+            self.assertEqual(notification_service.unread_count(self.user_id), 3)
+
+            notification_service.mark_read(self.user_id)
+            db.session.commit()
+            self.assertEqual(notification_service.unread_count(self.user_id), 0)
+
+    def test_purge_deletes_only_old_read_rows_in_batches(self):
+        old = datetime.utcnow() - timedelta(days=120)
+        with app.app_context():
+            db.session.add_all([Notification(user_id=self.user_id, message='old read', is_read=True, created_at=old)
+                                for _ in range(5)])
+            db.session.add(Notification(user_id=self.user_id, message='old unread', created_at=old))
+            db.session.add(Notification(user_id=self.user_id, message='recent read', is_read=True))
+            db.session.commit()
+
+            self.assertEqual(notification_service.purge_read(days=90, batch_size=2), 5)
+            messages = {n.message for n in Notification.query.all()}
+        self.assertIn('old unread', messages)
+        self.assertIn('recent read', messages)
+        self.assertNotIn('old read', messages)
+
+    def test_broadcast_dedupes_and_chunks(self):
+        with app.app_context():
+            tomorrow = date.today() + timedelta(days=1)
+            db.session.add_all([
+                Trip(user_id=self.user_id, title='A', start_date=tomorrow),
+                Trip(user_id=self.user_id, title='B', start_date=tomorrow),
+                Trip(user_id=self.other_id, title='C', start_date=tomorrow, status='completed'),
+                WishlistItem(user_id=self.user_id, title='Beach', city='Goa'),
+                WishlistItem(user_id=self.other_id, title='Forts', city='goa '),
+            ])
+            db.session.commit()
+            self.assertEqual(notification_service.unread_count(self.user_id), 3)
+
+            self.assertEqual(notification_service.send_trip_reminders(), 1)
+            self.assertEqual(notification_service.send_trip_reminders(), 0)
+            sent = notification_service.broadcast(
+                notification_service.wishlist_city_audience('GOA'), 'Goa deals', kind='deal', key='goa', chunk_size=1
+            )
+            self.assertEqual(sent, 2)
+            db.session.commit()
+            self.assertEqual(notification_service.broadcast(
+                notification_service.wishlist_city_audience('Goa'), 'Goa deals', kind='deal', key='goa'), 0)
+            self.assertEqual(notification_service.unread_count(self.user_id), 5)
+            self.assertEqual(Notification.query.filter_by(kind='trip_reminder').count(), 1)
+
+    def test_racing_broadcast_rows_are_ignored(self):
+        with app.app_context():
+            row = {'user_id': self.user_id, 'message': 'Goa deals', 'kind': 'deal', 'dedupe_key': 'goa',
+                   'is_read': False, 'created_at': datetime.utcnow()}
+            # Both schedulers passed the "already sent" check before either inserted
+            db.session.execute(notification_service._insert_ignoring_duplicates(), [row])
+            db.session.execute(notification_service._insert_ignoring_duplicates(), [row])
+            db.session.commit()
+            self.assertEqual(Notification.query.filter_by(kind='deal', dedupe_key='goa').count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import json
+import threading
+import unittest
+
+from app import create_app
+from models import db, User, Notification
+from notification_stream import NotificationStreams
+
+app = create_app()
+
+
+class IdleBackend:
+    """Never wakes the dispatcher thread; tests call dispatch() themselves"""
+
+    interval = None
+
+    def __init__(self, engine):
+        pass
+
+    def wait(self, timeout):
+        threading.Event().wait()
+
+
+def parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if not line.startswith(":"))
+    if "data" in fields:
+        fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+class TestNotificationStream(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.previous = app.extensions["notification_stream"]
+        self.streams = self.make_streams()
+
+        with app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+            db.session.add(Notification(user_id=user.id, message='Welcome'))
+            db.session.commit()
+
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        app.extensions["notification_stream"] = self.previous
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def make_streams(self, limit=5):
+        app.config['NOTIFICATION_STREAMS_PER_WORKER'] = limit
+        try:
+            streams = NotificationStreams(app)
+        finally:
+            app.config.pop('NOTIFICATION_STREAMS_PER_WORKER')
+        streams.dispatcher.backend_class = IdleBackend
+        streams.heartbeat = 0.05
+        streams.max_seconds = 5
+        app.extensions["notification_stream"] = streams
+        return streams
+
+    def notify(self, message, notification_id=None):
+        with app.app_context():
+            db.session.add(Notification(id=notification_id, user_id=self.user_id, message=message))
+            db.session.commit()
+            self.streams.dispatcher.dispatch(db.engine)
+
+    def open(self, **headers):
+        response = self.client.get('/api/notifications/stream', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = (chunk.decode() for chunk in response.response)
+        self.assertTrue(next(events).startswith('retry:'))
+        return response, events
+
+    def test_ready_then_live_events_and_heartbeat(self):
+        response, events = self.open()
+        ready = parse(next(events))
+        self.assertEqual((ready['event'], ready['data']), ('ready', {'unread': 1}))
+
+        self.notify('Trip starts tomorrow')
+        event = parse(next(events))
+        self.assertEqual(event['event'], 'notification')
+        self.assertEqual(event['data']['message'], 'Trip starts tomorrow')
+        self.assertGreater(int(event['id']), int(ready['id']))
+
+        self.assertEqual(next(events), ': ping\n\n')
+        response.close()
+        self.assertEqual(len(self.streams.broker), 0)
+
+    def test_resume_replays_missed_events(self):
+        response, events = self.open()
+        last_id = parse(next(events))['id']
+        response.close()
+
+        self.notify('Missed one')
+        self.notify('Missed two')
+        response, events = self.open(**{'Last-Event-ID': last_id})
+        self.assertEqual(parse(next(events))['event'], 'ready')
+        self.assertEqual([parse(next(events))['data']['message'] for _ in range(2)], ['Missed one', 'Missed two'])
+        response.close()
+
+    def test_stream_limit_per_worker(self):
+        self.make_streams(limit=1)
+        response, _ = self.open()
+        busy = self.client.get('/api/notifications/stream')
+        self.assertEqual(busy.status_code, 503)
+        self.assertIn('Retry-After', busy.headers)
+        response.close()
+        self.open()[0].close()
+
+    def test_late_committed_lower_id_is_delivered_once(self):
+        response, events = self.open()
+        next(events)
+        self.notify('Committed first', notification_id=50)
+        self.assertEqual(parse(next(events))['data']['id'], 50)
+
+        # Got its id before 50 but committed after the dispatcher read 50
+        self.notify('Committed late', notification_id=40)
+        event = parse(next(events))
+        self.assertEqual((event['data']['id'], event['id']), (40, '50'))
+
+        with app.app_context():
+            self.streams.dispatcher.dispatch(db.engine)
+        self.assertEqual(next(events), ': ping\n\n')
+        response.close()
+
+    def test_unread_body_gives_slot_back(self):
+        self.make_streams(limit=1)
+        response = self.client.get('/api/notifications/stream')
+        self.assertEqual(response.status_code, 200)
+        response.close()  # Client went away before the first byte was sent
+        self.assertEqual(len(self.streams.broker), 0)
+        self.open()[0].close()
+
+    def test_head_does_not_take_a_slot(self):
+        self.make_streams(limit=1)
+        for _ in range(2):
+            response = self.client.head('/api/notifications/stream')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(len(self.streams.broker), 0)
+        self.open()[0].close()
+
+    def test_requires_login(self):
+        with self.client.session_transaction() as session:
+            session.clear()
+        self.assertEqual(self.client.get('/api/notifications/stream').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
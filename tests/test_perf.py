@@ -0,0 +1,80 @@
+import unittest
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from models import db, User, Trip
+from perf import _start_request, current_timings, endpoint_stats
+
+app = create_app()
+
+
+class TestPerfInstrumentation(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        endpoint_stats.reset()
+
+        with app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            admin = User(email='admin@test.com', first_name='Admin', last_name='User', is_admin=True)
+            admin.set_password('password')
+            db.session.add_all([user, admin])
+            db.session.commit()
+            trip = Trip(user_id=user.id, title='Test Trip', status='planned')
+            db.session.add(trip)
+            db.session.commit()
+            self.trip_id = trip.id
+
+    def tearDown(self):
+        endpoint_stats.reset()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def login(self, email):
+        with self.client.session_transaction() as session:
+            session['user_email'] = email
+
+    def test_server_timing_counts_queries(self):
+        self.login('test@test.com')
+        response = self.client.get(f'/api/trips/{self.trip_id}')
+        self.assertEqual(response.status_code, 200)
+        timing = response.headers['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('total;dur=', timing)
+        queries = int(timing.split('desc="')[1].split(' ')[0])
+        self.assertGreater(queries, 0)
+
+        rows = {row['endpoint']: row for row in endpoint_stats.slowest()}
+        self.assertEqual(rows['get_trip_details']['count'], 1)
+        self.assertEqual(rows['get_trip_details']['avg_queries'], queries)
+
+    def test_failed_query_is_timed_once(self):
+        with app.test_request_context('/'):
+            _start_request()
+            with db.engine.connect() as conn:
+                with self.assertRaises(OperationalError):
+                    conn.execute(text('SELECT * FROM no_such_table'))
+                conn.execute(text('SELECT 1'))
+                self.assertNotIn('perf_query_start', conn.info)
+            self.assertEqual(current_timings().db_queries, 2)
+
+    def test_perf_page_is_admin_only(self):
+        self.login('test@test.com')
+        response = self.client.get('/admin/perf')
+        self.assertEqual(response.status_code, 302)
+
+        self.client.get(f'/api/trips/{self.trip_id}')
+        self.login('admin@test.com')
+        response = self.client.get('/admin/perf')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'get_trip_details', response.data)
+        self.assertIn('tpl;dur=', response.headers['Server-Timing'])
+
+
+if __name__ == '__main__':
+    unittest.main()
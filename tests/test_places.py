@@ -0,0 +1,102 @@
+import unittest
+
+import place_service
+from app import create_app
+from models import db, User, Trip, TripDestination, City, Place
+
+app = create_app()
+
+
+class TestPlaces(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            db.session.add(City(name='Goa', country='India', cost_index='low'))
+            user = User(email='test@test.com', first_name='Test', last_name='User', is_email_verified=True)
+            user.set_password('password')
+            db.session.add(user)
+            db.session.flush()
+            self.user_id = user.id
+            trip = Trip(user_id=user.id, title='Trip', status='planned')
+            db.session.add(trip)
+            db.session.commit()
+            self.trip_id = trip.id
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def add_stops(self, *stops):
+        with app.app_context():
+            rows = [TripDestination(trip_id=self.trip_id, name=name, city=name, country=country,
+                                    order_index=i, sequence=i + 1) for i, (name, country) in enumerate(stops)]
+            db.session.add_all(rows)
+            db.session.commit()
+            return [(row.place_id, row.city_id) for row in rows]
+
+    def test_normalize_and_split(self):
+        self.assertEqual(place_service.normalize('  São  Paulo. '), 'sao paulo')
+        self.assertEqual(place_service.split_place('Goa,  India'), ('Goa', 'India'))
+        self.assertEqual(place_service.split_place('Paris, Île-de-France, France', None), ('Paris', 'France'))
+        self.assertEqual(place_service.split_place('Goa, India', 'IN'), ('Goa', 'IN'))
+        self.assertEqual(place_service.place_key('Goa', ' india'), 'goa|india')
+
+    def test_spellings_share_one_place(self):
+        resolved = self.add_stops(('Goa', None), ('goa ', None), ('Goa, India', None), ('GOA', 'India'))
+        self.assertEqual(len(set(resolved)), 1)
+        with app.app_context():
+            place = db.session.get(Place, resolved[0][0])
+            catalog = City.query.filter_by(name='Goa').one()
+            self.assertEqual((place.name, place.country, place.city_id), ('Goa', 'India', catalog.id))
+            self.assertEqual(place_service.places_visited(self.user_id), 1)
+
+    def test_countries_keep_places_apart(self):
+        paris, bare, texas = self.add_stops(('Paris, France', None), ('paris', None), ('Paris', 'Texas'))
+        self.assertEqual(paris, bare)
+        self.assertNotEqual(paris[0], texas[0])
+        self.assertIsNone(paris[1])
+        with app.app_context():
+            self.assertEqual(place_service.places_visited(self.user_id), 2)
+
+    def test_itinerary_rename_moves_place(self):
+        response = self.client.post(f'/api/trips/{self.trip_id}/itinerary', json={'sections': [{'city': 'Pune'}]})
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        with app.app_context():
+            row = TripDestination.query.filter_by(trip_id=self.trip_id).one()
+            pune = row.place_id
+        self.client.post(f'/api/trips/{self.trip_id}/itinerary',
+                         json={'sections': [{'id': row.id, 'city': 'Goa, India'}]})
+        with app.app_context():
+            row = db.session.get(TripDestination, row.id)
+            self.assertNotEqual(row.place_id, pune)
+            self.assertEqual(db.session.get(Place, row.place_id).name, 'Goa')
+            self.assertIsNotNone(row.city_id)
+
+    def test_backfill_resolves_existing_rows(self):
+        table = TripDestination.__table__
+        with app.app_context():
+            # Written without the ORM, as rows from before the dictionary were
+            db.session.execute(table.insert(), [
+                {'trip_id': self.trip_id, 'name': name, 'city': name, 'order_index': i, 'sequence': i + 1,
+                 'city_id': city_id}
+                for i, (name, city_id) in enumerate([('Goa', None), ('goa.', 99), ('Kochi', None), ('  ', None)])
+            ])
+            db.session.commit()
+            self.assertEqual(place_service.backfill(db.session.connection(), batch_size=2), 3)
+            db.session.commit()
+            rows = db.session.execute(db.select(table.c.name, table.c.place_id, table.c.city_id)
+                                      .order_by(table.c.id)).all()
+        goa, goa_dot, kochi, blank = rows
+        self.assertEqual(goa.place_id, goa_dot.place_id)
+        self.assertEqual(goa_dot.city_id, 99)
+        self.assertNotEqual(kochi.place_id, goa.place_id)
+        self.assertIsNone(blank.place_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from datetime import datetime, timedelta
+
+import popularity_service
+from app import create_app
+from models import db, User, Trip, TripDestination, WishlistItem, DestinationPopularity
+
+app = create_app()
+
+
+class TestPopularity(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.flush()
+            self.user_id = user.id
+            self.trip = self.add_trip(['Paris', 'paris ', 'Rome'])
+            db.session.add(WishlistItem(user_id=user.id, title='Food', city='Rome', country='Italy'))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def add_trip(self, cities, created_at=None):
+        trip = Trip(user_id=self.user_id, title='Trip', status='planned', created_at=created_at or datetime.utcnow())
+        db.session.add(trip)
+        db.session.flush()
+        for position, city in enumerate(cities):
+            db.session.add(TripDestination(trip_id=trip.id, name=city, city=city, order_index=position,
+                                           sequence=position + 1))
+        db.session.flush()
+        return trip.id
+
+    def leaderboard(self):
+        with app.app_context():
+            return {row.key: (row.trips, row.wishlists) for row in DestinationPopularity.query}
+
+    def test_writes_update_scores_incrementally(self):
+        self.assertEqual(self.leaderboard(), {'paris': (2, 0), 'rome': (1, 1)})
+        with app.app_context():
+            top = [popularity_service.entry(row) for row in popularity_service.top_destinations(2)]
+        self.assertEqual([row['name'] for row in top], ['Paris', 'Rome'])
+        self.assertAlmostEqual(top[0]['score'], 2.0, places=2)
+        self.assertAlmostEqual(top[1]['score'], 1.5, places=2)
+        self.assertEqual(top[1]['country'], 'Italy')
+
+    def test_old_interest_decays(self):
+        with app.app_context():
+            long_ago = datetime.utcnow() - timedelta(days=popularity_service.HALF_LIFE_DAYS * 3)
+            self.add_trip(['Lisbon'] * 4, created_at=long_ago)
+            db.session.commit()
+            self.assertEqual(popularity_service.rebuild(db.session.connection()), 3)
+            db.session.commit()
+            scores = {row.key: popularity_service.entry(row)['score'] for row in DestinationPopularity.query}
+        # Four stops three half-lives ago weigh half a stop today
+        self.assertAlmostEqual(scores['lisbon'], 0.5, places=2)
+        self.assertAlmostEqual(scores['paris'], 2.0, places=2)
+        self.assertEqual(self.leaderboard()['lisbon'], (4, 0))
+
+    def test_renamed_stop_counts_for_new_destination(self):
+        with app.app_context():
+            stops = TripDestination.query.filter_by(trip_id=self.trip).order_by(TripDestination.id).all()
+            stops[0].name = stops[0].city = 'Lisbon'
+            stops[1].city = 'Paris'  # Same destination, respelled
+            stops[2].budget = 100.0
+            db.session.commit()
+        self.assertEqual(self.leaderboard(), {'paris': (2, 0), 'rome': (1, 1), 'lisbon': (1, 0)})
+
+    def test_rebuild_matches_incremental(self):
+        before = self.leaderboard()
+        with app.app_context():
+            db.session.query(DestinationPopularity).delete()
+            popularity_service.rebuild(db.session.connection())
+            db.session.commit()
+        self.assertEqual(self.leaderboard(), before)
+
+    def test_popular_endpoint(self):
+        response = self.client.get('/api/destinations/popular', query_string={'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([d['key'] for d in response.get_json()['destinations']], ['paris'])
+        response = self.client.get('/api/destinations/popular', query_string={'country': 'italy'})
+        self.assertEqual([d['key'] for d in response.get_json()['destinations']], ['rome'])
+        self.assertEqual(self.client.get('/api/destinations/popular?limit=0').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
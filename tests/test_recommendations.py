@@ -0,0 +1,96 @@
+import json
+import unittest
+
+import recommendation_service
+from app import create_app
+from models import db, User, Trip, TripDestination, WishlistItem, UserRecommendation, DestinationPair
+
+app = create_app()
+
+BASKETS = {
+    'a@test.com': ['Delhi', 'Agra', 'Jaipur'],
+    'b@test.com': ['Delhi', 'Agra'],
+    'c@test.com': ['Goa', 'Gokarna'],
+    'd@test.com': ['Goa', 'Gokarna', 'Delhi'],
+    'me@test.com': ['Delhi'],
+}
+
+
+class TestRecommendations(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            self.ids = {}
+            for email, cities in BASKETS.items():
+                user = User(email=email, first_name='Test', last_name='User', is_email_verified=True)
+                user.set_password('password')
+                db.session.add(user)
+                db.session.flush()
+                self.ids[email] = user.id
+                trip = Trip(user_id=user.id, title='Trip', status='planned')
+                db.session.add(trip)
+                db.session.flush()
+                for position, city in enumerate(cities):
+                    db.session.add(TripDestination(trip_id=trip.id, name=city, city=city, country='India',
+                                                   order_index=position, sequence=position + 1))
+            db.session.add(WishlistItem(user_id=self.ids['c@test.com'], title='Beaches', city='Goa ',
+                                        tags=json.dumps(['beach'])))
+            db.session.get(User, self.ids['c@test.com']).travel_preferences = json.dumps(['beach'])
+            db.session.commit()
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'me@test.com'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def suggestions(self, email):
+        with app.app_context():
+            return [(r.destination, r.reason) for r in
+                    UserRecommendation.query.filter_by(user_id=self.ids[email]).order_by(UserRecommendation.rank)]
+
+    def test_build_ranks_co_occurring_destinations(self):
+        with app.app_context():
+            written = recommendation_service.build(top_k=3)
+            self.assertEqual(written['destinations'], 5)
+            pair = DestinationPair.query.filter_by(destination='delhi', other='agra').one()
+            self.assertEqual(pair.count, 2)
+            self.assertAlmostEqual(pair.weight, 2 / (4 * 2) ** 0.5, places=5)
+
+        suggestions = self.suggestions('me@test.com')
+        # delhi-agra 2/sqrt(4*2), delhi-jaipur 1/sqrt(4*1), delhi-goa and delhi-gokarna 1/sqrt(4*2)
+        self.assertEqual([key for key, _ in suggestions], ['agra', 'jaipur', 'goa'])
+        self.assertEqual(suggestions[0][1], 'Often combined with Delhi')
+        # Nothing the user already has
+        self.assertNotIn('delhi', [key for key, _ in suggestions])
+
+    def test_preferences_add_affinity(self):
+        with app.app_context():
+            recommendation_service.build()
+            db.session.get(User, self.ids['me@test.com']).travel_preferences = json.dumps(['beach'])
+            recommendation_service.refresh_user(self.ids['me@test.com'])
+            db.session.commit()
+        suggestions = self.suggestions('me@test.com')
+        # The beach affinity lifts goa and gokarna level with agra, above jaipur
+        self.assertEqual([key for key, _ in suggestions], ['agra', 'goa', 'gokarna', 'jaipur'])
+
+    def test_saving_trip_refreshes_suggestions(self):
+        with app.app_context():
+            recommendation_service.build()
+            trip = Trip.query.filter_by(user_id=self.ids['me@test.com']).one()
+        response = self.client.post(f'/api/trips/{trip.id}/itinerary',
+                                    json={'sections': [{'city': 'Delhi'}, {'city': 'Goa'}]})
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        keys = [key for key, _ in self.suggestions('me@test.com')]
+        self.assertEqual(keys[0], 'gokarna')
+        self.assertNotIn('goa', keys)
+
+        dashboard = self.client.get('/dashboard')
+        self.assertIn(b'Often combined with', dashboard.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import itertools
+import random
+import unittest
+
+import route_service
+from app import create_app
+from models import db, User, Trip, TripDestination, City
+
+app = create_app()
+
+CITIES = {
+    'Delhi': (28.6139, 77.2090),
+    'Mumbai': (19.0760, 72.8777),
+    'Jaipur': (26.9124, 75.7873),
+    'Goa': (15.2993, 74.1240),
+    'Agra': (27.1767, 78.0081),
+}
+
+
+def brute_force(matrix, start=None, end=None):
+    n = len(matrix)
+    return min(
+        route_service.path_length(matrix, order) for order in itertools.permutations(range(n))
+        if (start is None or order[0] == start) and (end is None or order[-1] == end)
+    )
+
+
+class TestRouteOptimizer(unittest.TestCase):
+    def test_haversine_distance(self):
+        matrix = route_service.distance_matrix([CITIES['Delhi'], CITIES['Mumbai']])
+        self.assertAlmostEqual(matrix[0, 1], 1153, delta=5)
+        self.assertEqual(matrix[0, 0], 0)
+        self.assertIs(route_service.distance_matrix([CITIES['Delhi'], CITIES['Mumbai']]), matrix)
+
+    def test_exact_matches_brute_force(self):
+        rng = random.Random(7)
+        for n in (3, 5, 7):
+            points = [(rng.uniform(8, 32), rng.uniform(68, 90)) for _ in range(n)]
+            matrix = route_service.distance_matrix(points)
+            for start, end in ((None, None), (0, None), (None, 1), (0, 1)):
+                order, length, method = route_service.optimize_route(points, start, end)
+                self.assertEqual(method, 'exact')
+                self.assertEqual(sorted(order), list(range(n)))
+                self.assertAlmostEqual(length, brute_force(matrix, start, end), places=6)
+
+    def test_heuristic_keeps_fixed_ends_and_beats_input_order(self):
+        rng = random.Random(3)
+        points = [(rng.uniform(8, 32), rng.uniform(68, 90)) for _ in range(30)]
+        order, length, method = route_service.optimize_route(points, start=4, end=9)
+        self.assertEqual(method, 'heuristic')
+        self.assertEqual(sorted(order), list(range(30)))
+        self.assertEqual((order[0], order[-1]), (4, 9))
+        matrix = route_service.distance_matrix(points)
+        self.assertLess(length, route_service.path_length(matrix, list(range(30))) / 2)
+
+
+class TestRouteEndpoint(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.add_all([City(name=name, country='India', latitude=lat, longitude=lng)
+                                for name, (lat, lng) in CITIES.items()])
+            db.session.commit()
+            trip = Trip(user_id=user.id, title='Zig-zag', status='planned')
+            db.session.add(trip)
+            db.session.commit()
+            for position, name in enumerate(['Delhi', 'Goa', 'Agra', 'Mumbai', 'Jaipur', 'Atlantis']):
+                db.session.add(TripDestination(trip_id=trip.id, name=name, city=name, order_index=position,
+                                               sequence=position + 1))
+            db.session.commit()
+            self.trip_id = trip.id
+            self.delhi = TripDestination.query.filter_by(name='Delhi').one().id
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_proposes_shorter_order(self):
+        response = self.client.get(f'/api/trips/{self.trip_id}/route/optimize?start={self.delhi}')
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([s['name'] for s in data['order']], ['Delhi', 'Agra', 'Jaipur', 'Mumbai', 'Goa', 'Atlantis'])
+        self.assertEqual([s['order_index'] for s in data['order']], list(range(6)))
+        self.assertEqual(data['unresolved'], ['Atlantis'])
+        self.assertGreater(data['saved_km'], 0)
+        self.assertAlmostEqual(data['current_distance_km'] - data['optimized_distance_km'], data['saved_km'], delta=0.2)
+
+        etag = response.headers['ETag']
+        cached = self.client.get(f'/api/trips/{self.trip_id}/route/optimize?start={self.delhi}',
+                                 headers={'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+
+        # Moving a catalog city changes the answer without touching the trip
+        with app.app_context():
+            City.query.filter_by(name='Goa').one().latitude = 28.0
+            db.session.commit()
+        moved = self.client.get(f'/api/trips/{self.trip_id}/route/optimize?start={self.delhi}',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(moved.status_code, 200)
+        self.assertNotEqual(moved.headers['ETag'], etag)
+
+    def test_unknown_fixed_stop(self):
+        with app.app_context():
+            atlantis = TripDestination.query.filter_by(name='Atlantis').one().id
+        response = self.client.get(f'/api/trips/{self.trip_id}/route/optimize?end={atlantis}')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from datetime import datetime, timedelta
+
+import session_store
+from app import create_app
+from models import db, User, UserSession
+
+app = create_app()
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.cookie_interface = app.session_interface
+        app.session_interface = session_store.DatabaseSessionInterface()
+        self.client = app.test_client()
+        self.admin_client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            self.ids = {}
+            for email, is_admin in (('test@test.com', False), ('admin@test.com', True)):
+                user = User(email=email, first_name='Test', last_name='User', is_email_verified=True,
+                            is_admin=is_admin)
+                user.set_password('password')
+                db.session.add(user)
+                db.session.flush()
+                self.ids[email] = user.id
+            db.session.commit()
+        self.log_in(self.client, 'test@test.com')
+        self.log_in(self.admin_client, 'admin@test.com')
+
+    def tearDown(self):
+        app.session_interface = self.cookie_interface
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def log_in(self, client, email):
+        with client.session_transaction() as session:
+            session['user_email'] = email
+            session['user_id'] = self.ids[email]
+
+    def sid(self, client):
+        return client.get_cookie(app.config['SESSION_COOKIE_NAME']).value
+
+    def stored(self):
+        with app.app_context():
+            return {row.user_id: row for row in UserSession.query}
+
+    def test_cookie_holds_only_an_id(self):
+        sid = self.sid(self.client)
+        self.assertLessEqual(len(sid), session_store.MAX_SID_LENGTH)
+        self.assertNotIn('test', sid)
+        row = self.stored()[self.ids['test@test.com']]
+        self.assertEqual(row.id, session_store._hash(sid))
+
+        self.assertEqual(self.client.get('/dashboard').status_code, 200)
+        # Reading the session does not rewrite it
+        self.assertEqual(self.stored()[self.ids['test@test.com']].updated_at, row.updated_at)
+
+    def test_logout_issues_new_id(self):
+        before = self.sid(self.client)
+        self.client.get('/logout')
+        self.assertNotEqual(self.sid(self.client), before)
+        self.assertNotIn(self.ids['test@test.com'], self.stored())
+        self.assertEqual(self.client.get('/dashboard').status_code, 302)
+
+    def test_deactivating_user_revokes_sessions(self):
+        response = self.admin_client.post(f"/admin/api/user/{self.ids['test@test.com']}/toggle-status")
+        self.assertFalse(response.get_json()['is_active'])
+        self.assertEqual(list(self.stored()), [self.ids['admin@test.com']])
+        self.assertEqual(self.client.get('/dashboard').status_code, 302)
+
+    def test_sweep_removes_expired(self):
+        with app.app_context():
+            later = datetime.utcnow() + app.permanent_session_lifetime + timedelta(minutes=1)
+            self.assertEqual(session_store.sweep(datetime.utcnow(), batch_size=1), 0)
+            self.assertEqual(session_store.sweep(later, batch_size=1), 2)
+            self.assertEqual(UserSession.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import create_app
+from models import db, User, Trip
+
+app = create_app()
+
+
+class TestTripConcurrency(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            user = User(email='test@test.com', first_name='Test', last_name='User')
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            trip = Trip(user_id=user.id, title='Test Trip', status='planned')
+            db.session.add(trip)
+            db.session.commit()
+            self.trip_id = trip.id
+
+        with self.client.session_transaction() as session:
+            session['user_email'] = 'test@test.com'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def update(self, value, etag=None):
+        headers = {'If-Match': etag} if etag else {}
+        return self.client.put(f'/api/trips/{self.trip_id}/update',
+                               json={'field': 'title', 'value': value}, headers=headers)
+
+    def test_get_returns_etag_and_304_when_unchanged(self):
+        response = self.client.get(f'/api/trips/{self.trip_id}')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertEqual(etag, f'"trip-{self.trip_id}-v1"')
+
+        cities_etag = self.client.get(f'/api/trips/{self.trip_id}/cities').headers['ETag']
+        self.assertTrue(cities_etag.startswith(f'"trip-{self.trip_id}-v1-'))
+        response = self.client.get(f'/api/trips/{self.trip_id}/cities', headers={'If-None-Match': cities_etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.update('Renamed')
+        response = self.client.get(f'/api/trips/{self.trip_id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['trip']['title'], 'Renamed')
+
+    def test_stale_if_match_is_rejected(self):
+        etag = self.client.get(f'/api/trips/{self.trip_id}').headers['ETag']
+
+        first = self.update('From tab one', etag)
+        self.assertEqual(first.status_code, 200)
+        self.assertNotEqual(first.headers['ETag'], etag)
+
+        second = self.client.post(f'/api/trips/{self.trip_id}/itinerary',
+                                  json={'sections': [{'city': 'Goa', 'order': 1}]},
+                                  headers={'If-Match': etag})
+        self.assertEqual(second.status_code, 412)
+        self.assertEqual(second.get_json()['error'], 'conflict')
+
+        third = self.client.post(f'/api/trips/{self.trip_id}/itinerary',
+                                 json={'sections': [{'city': 'Goa', 'order': 1}]},
+                                 headers={'If-Match': first.headers['ETag']})
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(third.get_json()['version'], 3)
+
+        itinerary = self.client.get(f'/api/trips/{self.trip_id}/itinerary')
+        self.assertEqual(itinerary.headers['ETag'], third.headers['ETag'])
+        self.assertEqual([s['city'] for s in itinerary.get_json()['sections']], ['Goa'])
+
+    def test_concurrent_write_raises_stale_data(self):
+        with app.app_context():
+            trip = db.session.get(Trip, self.trip_id)
+            # Another writer commits after we loaded the trip
+            db.session.execute(db.update(Trip).where(Trip.id == self.trip_id).values(version=Trip.version + 1)
+                               .execution_options(synchronize_session=False))
+            trip.title = 'Mine'
+            with self.assertRaises(StaleDataError):
+                db.session.commit()
+            db.session.rollback()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,24 +14,27 @@ logger = logging.getLogger(__name__)
 NUMBEO_API_KEY = os.getenv('NUMBEO_API_KEY', 'your_numbeo_api_key')
 EXCHANGE_RATE_API_KEY = os.getenv('EXCHANGE_RATE_API_KEY', 'your_exchange_rate_api_key')
 AMADEUS_API_KEY = os.getenv('AMADEUS_API_KEY', 'your_amadeus_api_key')
+# Cached cost/rate files; tests and benchmarks point this at a scratch copy
+DATA_DIR = os.getenv('TRAVEL_DATA_DIR', 'data')
 
 class TravelDataService:
     """Service to fetch and process travel-related data from various APIs"""
     
-    def __init__(self):
+    def __init__(self, data_dir=None):
         self.base_currency = 'INR'
+        self.data_dir = data_dir or DATA_DIR
         self._load_cached_data()
 
     def _load_cached_data(self):
         """Load cached data from JSON files if they exist"""
         try:
-            with open('data/city_costs.json', 'r') as f:
+            with open(os.path.join(self.data_dir, 'city_costs.json'), 'r') as f:
                 self.city_costs = json.load(f)
         except FileNotFoundError:
             self.city_costs = {}
             
         try:
-            with open('data/exchange_rates.json', 'r') as f:
+            with open(os.path.join(self.data_dir, 'exchange_rates.json'), 'r') as f:
                 self.exchange_rates = json.load(f)
         except FileNotFoundError:
             self.exchange_rates = {}
@@ -171,13 +174,13 @@ class TravelDataService:
 
     def _save_cached_data(self):
         """Save cached data to JSON files"""
-        os.makedirs('data', exist_ok=True)
+        os.makedirs(self.data_dir, exist_ok=True)
         
-        with open('data/city_costs.json', 'w') as f:
-            json.dump(self.city_costs, f)
+        with open(os.path.join(self.data_dir, 'city_costs.json'), 'w') as f:
+            json.dump(self.city_costs, f, indent=2)
             
-        with open('data/exchange_rates.json', 'w') as f:
-            json.dump(self.exchange_rates, f)
+        with open(os.path.join(self.data_dir, 'exchange_rates.json'), 'w') as f:
+            json.dump(self.exchange_rates, f, indent=2)
 
 # Example usage
 if __name__ == "__main__":